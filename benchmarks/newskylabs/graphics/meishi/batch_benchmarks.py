@@ -0,0 +1,181 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""benchmarks/newskylabs/graphics/meishi/batch_benchmarks.py:
+
+Memory benchmarks of the streaming batch mode.
+
+The cards of rosters of different sizes are rendered with
+`MeishiBatch.render(..., stream=True)' in a fresh Python process
+and the peak memory (maximum resident set size) of the process is
+recorded:
+
+  - stream:       every card is saved in its own directory.  The
+                  peak memory has to stay below MEMORY_CEILING for
+                  every roster size - otherwise the benchmark fails;
+
+  - stream_merge: all cards are combined into a single pdf.  The pdf
+                  keeps the compressed content of all pages until it
+                  is saved - the peak memory grows with the roster
+                  and is only recorded.
+
+The cards are rendered by a single process (jobs=1) so that the
+whole memory is measured.  The streaming peak memory has been checked
+for rosters of up to 5000 people only: it stayed at 46MB (45.9MB for
+1000 and 46.1MB for 5000 cards, about 5 cards per second).  Larger
+rosters are expected to stay below the ceiling as well but have not
+been measured - use `--sizes' to check them:
+
+  PYTHONPATH=. python benchmarks/newskylabs/graphics/meishi/batch_benchmarks.py \\
+    --sizes 1000,50000 -o results.json
+
+Note that rendering 50000 cards takes hours and needs some GB of disk
+space in the temporary directory.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/13"
+
+import os, sys, json, shutil, tempfile, subprocess
+
+from newskylabs.graphics.utils.benchmarks import main, settings
+from newskylabs.graphics.utils.general import get_package_dir
+
+# The default roster sizes of these benchmarks
+settings['sizes'] = [100, 1000, 5000]
+
+# The maximal peak memory of streaming a roster
+MEMORY_CEILING = 128 * 1024 * 1024
+
+# Render a roster in a fresh process
+# and print the summary including the peak memory
+RENDER_CODE = '''
+import sys, json, resource
+from newskylabs.graphics.meishi.batch import MeishiBatch
+design, roster, outdir, merge = sys.argv[1:]
+batch = MeishiBatch(design, jobs=1, verbose=False)
+summary = batch.render(roster, outdir or None, merge=merge or None, stream=True)
+# ru_maxrss is given in bytes on macOS and in kB on Linux
+factor = 1 if sys.platform == 'darwin' else 1024
+summary['max_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * factor
+print(json.dumps(summary))
+'''
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def get_design_file():
+    return os.path.join(get_package_dir(), 'meishi', 'designs', 'default-design.yaml')
+
+def write_roster(rosterfile, size):
+    """Write a NDJSON roster of 'size' different people."""
+
+    with open(rosterfile, 'w') as fh:
+        for n in range(size):
+            entry = {
+                'name': {
+                    'family': 'Family{}'.format(n),
+                    'given':  'Given{}'.format(n),
+                },
+                'contact': {
+                    'work': {
+                        'email': 'person{}@some.where'.format(n),
+                        'tel':   '+12-345-67-{:05d}'.format(n),
+                    },
+                },
+            }
+            fh.write(json.dumps(entry) + '\n')
+
+def run_batch(size, merge=False):
+    """Stream a roster of 'size' people in a fresh process.
+
+    Returns the summary of the batch run
+    with the peak memory in bytes as value of 'max_rss'.
+
+    """
+
+    tmpdir = tempfile.mkdtemp(prefix='nsl-meishi-benchmark-')
+    try:
+        rosterfile = os.path.join(tmpdir, 'roster.ndjson')
+        write_roster(rosterfile, size)
+
+        outdir    = '' if merge else os.path.join(tmpdir, 'cards')
+        mergefile = os.path.join(tmpdir, 'cards.pdf') if merge else ''
+
+        command = [sys.executable, '-c', RENDER_CODE,
+                   get_design_file(), rosterfile, outdir, mergefile]
+        process = subprocess.run(command, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE, universal_newlines=True)
+
+        if process.returncode != 0:
+            raise RuntimeError("Benchmark command failed:\n{}".format(process.stderr))
+
+        # The summary is printed last
+        return json.loads(process.stdout.strip().splitlines()[-1])
+
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+def measure_batch(size, merge=False):
+    summary = run_batch(size, merge=merge)
+    return {
+        'items':            size,
+        'seconds':          summary['seconds'],
+        'items_per_second': summary['cards_per_second'],
+        'max_rss':          summary['max_rss'],
+        'max_rss_per_item': summary['max_rss'] / size,
+    }
+
+## =========================================================
+## Benchmarks
+## ---------------------------------------------------------
+
+def batch_benchmark_stream():
+    """Stream the cards into directories - with a memory ceiling."""
+
+    results = {}
+    for size in settings['sizes']:
+        result = measure_batch(size)
+        if result['max_rss'] > MEMORY_CEILING:
+            msg = "Streaming {} cards used {:.1f}MB - more than the ceiling of {:.1f}MB"
+            raise AssertionError(msg.format(size, result['max_rss'] / 2**20,
+                                            MEMORY_CEILING / 2**20))
+        results[str(size)] = result
+
+    return results
+
+def batch_benchmark_stream_merge():
+    """Stream the cards into a single merged pdf."""
+
+    return {str(size): measure_batch(size, merge=True)
+            for size in settings['sizes']}
+
+## =========================================================
+## Main
+## ---------------------------------------------------------
+
+if __name__ == '__main__':
+    main(globals())
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,107 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""benchmarks/newskylabs/graphics/meishi/design_benchmarks.py:
+
+Benchmarks for loading meishi designs.
+
+Usage:
+
+  PYTHONPATH=. python benchmarks/newskylabs/graphics/meishi/design_benchmarks.py [-o results.json]
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/08"
+
+import os, glob, tempfile, yaml
+
+from newskylabs.graphics.utils.benchmarks import main, measure
+from newskylabs.graphics.utils.general import get_package_dir
+
+from newskylabs.graphics.meishi import design
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def get_designs():
+    """The designs bundled with the package."""
+    pattern = os.path.join(get_package_dir(), 'meishi', 'designs', '*.yaml')
+    return sorted(glob.glob(pattern))
+
+def load_pure_python(designfile):
+    with open(designfile) as fh:
+        return yaml.load(fh, Loader=yaml.FullLoader)
+
+def load_c(designfile):
+    with open(designfile) as fh:
+        return design.load_yaml(fh)
+
+## =========================================================
+## Benchmarks
+## ---------------------------------------------------------
+
+def design_benchmark_load():
+    """Load the bundled designs:
+
+    - yaml:         parsed with the pure Python loader (as done before);
+    - yaml_c:       parsed with the C loader;
+    - cold:         load_design_file() with empty caches;
+    - disk_cache:   load_design_file() with a warm disk cache;
+    - memory_cache: load_design_file() loading the design again.
+
+    """
+
+    results = {}
+    for designfile in get_designs():
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+
+            def clear_memory():
+                design._designs.clear()
+
+            def clear_all():
+                clear_memory()
+                for filename in os.listdir(cache_dir):
+                    os.remove(os.path.join(cache_dir, filename))
+
+            results[os.path.basename(designfile)] = {
+                'yaml':         measure(load_pure_python, designfile),
+                'yaml_c':       measure(load_c, designfile),
+                'cold':         measure(design.load_design_file, designfile, cache_dir,
+                                        setup=clear_all),
+                'disk_cache':   measure(design.load_design_file, designfile, cache_dir,
+                                        setup=clear_memory),
+                'memory_cache': measure(design.load_design_file, designfile, cache_dir),
+            }
+
+    return results
+
+## =========================================================
+## Main
+## ---------------------------------------------------------
+
+if __name__ == '__main__':
+    main(globals())
+
+## =========================================================
+## =========================================================
+
+## fin.
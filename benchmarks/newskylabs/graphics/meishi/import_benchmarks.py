@@ -0,0 +1,148 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""benchmarks/newskylabs/graphics/meishi/import_benchmarks.py:
+
+Start-up benchmarks: the time needed to import the meishi package,
+to run `nsl-meishi --help' and to render the SVG code of a meishi
+in a fresh Python process.
+
+Every command is run in a new interpreter with `python -X importtime'
+- the wall time of the whole process and the cumulative import time
+of the modules reported by `-X importtime' are recorded, together
+with the heavy modules (the pdf toolchain) which have been loaded.
+
+Usage:
+
+  PYTHONPATH=. python benchmarks/newskylabs/graphics/meishi/import_benchmarks.py [-o results.json]
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/08"
+
+import os, re, sys, time, subprocess
+
+from newskylabs.graphics.utils.benchmarks import main, settings
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+# Modules which should only be loaded when pdfs are rendered
+HEAVY_MODULES = ['svglib', 'reportlab', 'PyPDF2']
+
+def run_importtime(code):
+    """Run 'code' in a fresh interpreter with -X importtime.
+
+    Returns the wall time in seconds, the total import time in
+    seconds and the heavy modules which have been imported.
+
+    """
+
+    command = [sys.executable, '-X', 'importtime', '-c', code]
+
+    start = time.perf_counter()
+    process = subprocess.run(command, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, universal_newlines=True,
+                             env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'))
+    wall = time.perf_counter() - start
+
+    if process.returncode != 0:
+        raise RuntimeError("Benchmark command failed:\n{}".format(process.stderr))
+
+    # Lines look like:
+    # import time: self [us] | cumulative | imported package
+    total = 0
+    modules = set()
+    for line in process.stderr.splitlines():
+        match = re.match(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)', line)
+        if match:
+            modules.add(match.group(4).split('.')[0])
+            # Only the top-level imports count for the total
+            if len(match.group(3)) == 1:
+                total += int(match.group(2))
+
+    return {
+        'wall':    wall,
+        'imports': total / 1e6,
+        'heavy':   sorted(modules.intersection(HEAVY_MODULES)),
+    }
+
+def measure_startup(code):
+    """Run 'code' repeatedly in fresh interpreters."""
+
+    runs = [run_importtime(code) for _ in range(settings['repeat'])]
+    return {
+        'best_wall':    min(run['wall']    for run in runs),
+        'best_imports': min(run['imports'] for run in runs),
+        'runs':         len(runs),
+        'heavy':        runs[-1]['heavy'],
+    }
+
+## =========================================================
+## Benchmarks
+## ---------------------------------------------------------
+
+def import_benchmark_import():
+    """import newskylabs.graphics.meishi"""
+    return measure_startup('import newskylabs.graphics.meishi')
+
+def import_benchmark_cli_help():
+    """nsl-meishi --help"""
+    code = '\n'.join([
+        'import sys',
+        'from newskylabs.graphics.scripts.meishi import meishi',
+        'sys.argv = ["nsl-meishi", "--help"]',
+        'meishi(standalone_mode=False)',
+    ])
+    return measure_startup(code)
+
+def import_benchmark_svg_only():
+    """Render the SVG code of both sides of the default design."""
+    code = '\n'.join([
+        'from newskylabs.graphics.meishi.meishi import Meishi',
+        'from newskylabs.graphics.scripts.meishi import get_default_design',
+        'meishi = Meishi(datafile=get_default_design(), verbose=False)',
+        'meishi.render("front", "svg")',
+        'meishi.render("back", "svg")',
+    ])
+    return measure_startup(code)
+
+def import_benchmark_pdf():
+    """Render the pdf of the default design - for comparison."""
+    code = '\n'.join([
+        'from newskylabs.graphics.meishi.meishi import Meishi',
+        'from newskylabs.graphics.scripts.meishi import get_default_design',
+        'meishi = Meishi(datafile=get_default_design(), verbose=False)',
+        'meishi.render_merged()',
+    ])
+    return measure_startup(code)
+
+## =========================================================
+## Main
+## ---------------------------------------------------------
+
+if __name__ == '__main__':
+    main(globals())
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,373 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""benchmarks/newskylabs/graphics/meishi/pipeline_benchmarks.py:
+
+End-to-end benchmarks of the meishi pipeline.
+
+Every stage of rendering meishis is measured separately for rosters
+of different sizes (default: 1, 100 and 10000 cards):
+
+  - design_load:       loading and validating the design (once);
+  - roster:            merging and validating the roster entries;
+  - generate_front:    generating the SVG code of the front side;
+  - generate_back:     generating the SVG code of the back side
+                       - for every back-side plugin;
+  - template:          generating both sides from a meishi template;
+  - back_drawing:      converting the back sides generated by a
+                       template to reportlab drawings - with and
+                       without shared pattern, for every back-side
+                       plugin;
+  - vcard:             building and serializing the vCards;
+  - qrcode:            encoding the vCards as QR-Code;
+  - serialize:         serializing the SVG code of both sides;
+  - svg2pdf:           converting both sides to pdf;
+  - pdf_merge:         writing the sides of all cards into one pdf;
+  - precision:         the size of the SVG code of both sides and the
+                       time to serialize and parse it - with numbers
+                       rounded to 2 decimals (0.01 mm) and without,
+                       for every back-side plugin;
+  - optimize:          the size of the SVG code of both sides, the
+                       time to generate and to convert them to pdf
+                       - with and without optimizing the SVG code,
+                       for every back-side plugin;
+  - svgz:              the size of the back side and the time to write
+                       it - as SVG and gzip compressed with the
+                       compression levels 1, 6 and 9, for every
+                       back-side plugin;
+  - memory:            the memory (traced by tracemalloc) retained by
+                       and allocated at most while generating a
+                       ConPat back side and imposing the back sides of
+                       100 ConPat cards made from a template on a
+                       single sheet.
+
+The results (time, throughput in cards per second and peak memory)
+are written as JSON.
+
+Note that a complete run with 10000 cards takes a long time - use
+`--sizes' to select the roster sizes and the names of the stages to
+only run some of them:
+
+  PYTHONPATH=. python benchmarks/newskylabs/graphics/meishi/pipeline_benchmarks.py \\
+    --sizes 1,100 -o results.json
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/09"
+
+import io, os, tracemalloc
+
+from lxml import etree
+
+from newskylabs.graphics.utils.benchmarks import main, measure, measure_sizes, throughput, settings
+from newskylabs.graphics.utils.general import get_package_dir
+
+from newskylabs.graphics.meishi import design as meishi_design
+from newskylabs.graphics.meishi.design import Design, load_design_file
+from newskylabs.graphics.meishi.meishi import Meishi
+from newskylabs.graphics.meishi.template import MeishiTemplate
+from newskylabs.graphics.meishi.batch import merge_roster
+from newskylabs.graphics.meishi.imposition import Imposition
+from newskylabs.graphics.svg.library.vcard import VCard
+from newskylabs.graphics.svg.library.qrcode import QRCode
+
+## =========================================================
+## Test data
+## ---------------------------------------------------------
+
+# The back-side plugins with their parameters
+PLUGINS = {
+    'SimpleBackside': {
+        'class':       'newskylabs.graphics.svg.library.simplebackside.SimpleBackside',
+        'qrcode_size': 45,
+    },
+    'Dots': {
+        'class':       'newskylabs.graphics.svg.library.dots.Dots',
+        'dotsize':     2,
+    },
+    'ConPat': {
+        'class':       'newskylabs.graphics.svg.library.conpat.ConPat',
+        'parents':     4,
+        'strokewidth': 0.3,
+    },
+}
+
+def get_design_file():
+    return os.path.join(get_package_dir(), 'meishi', 'designs', 'default-design.yaml')
+
+def get_design(plugin='SimpleBackside'):
+    """The default design - with the given back-side plugin."""
+
+    data = load_design_file(get_design_file(), cache_dir=False)
+    data['back-side'] = dict(data['back-side'], **PLUGINS[plugin])
+    return data
+
+def make_roster(size):
+    """A roster of 'size' different people."""
+
+    return [
+        {
+            'name': {
+                'family': 'Family{}'.format(n),
+                'given':  'Given{}'.format(n),
+            },
+            'contact': {
+                'work': {
+                    'email': 'person{}@some.where'.format(n),
+                    'tel':   '+12-345-67-{:05d}'.format(n),
+                },
+            },
+        }
+        for n in range(size)
+    ]
+
+def make_contents(size):
+    """The complete content blocks of 'size' different people."""
+    return merge_roster(get_design(), make_roster(size))
+
+def make_meishi(plugin='SimpleBackside', precision=None, optimize=False):
+    """A meishi with both sides rendered
+    - with numbers rounded to 'precision' decimals when given
+    and optimized SVG code when 'optimize' is set."""
+
+    design = get_design(plugin)
+    if precision is not None:
+        design['parameter'] = dict(design['parameter'], precision=precision)
+
+    meishi = Meishi(datafile=design, verbose=False, optimize=optimize)
+    meishi.get_svg('front')
+    meishi.get_svg('back')
+    return meishi
+
+def traced_memory(fn, *args):
+    """The memory in bytes retained by the result of 'fn(*args)'
+    and allocated at most while calling it - traced by tracemalloc."""
+
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'retained': retained, 'peak': peak}
+
+## =========================================================
+## Stages
+## ---------------------------------------------------------
+
+def load_design():
+    meishi_design._designs.clear()
+    Design(load_design_file(get_design_file(), cache_dir=False))
+
+def generate_front(meishi, contents):
+    for content in contents:
+        meishi.set_content(content)
+        meishi.generate_front()
+
+def generate_back(meishi, contents):
+    for content in contents:
+        meishi.set_content(content)
+        meishi.generate_back()
+
+def generate_template(template, contents):
+    for content in contents:
+        meishi = template.meishi(content)
+        meishi.get_svg('front')
+        meishi.get_svg('back')
+
+def convert_back(template, contents):
+    for content in contents:
+        template.meishi(content).get_drawing('back')
+
+def generate_sides(meishi):
+    meishi.generate_front()
+    meishi.generate_back()
+
+def build_vcards(contents):
+    for content in contents:
+        VCard(content).serialize()
+
+def encode_qrcodes(vcards):
+    for vcard in vcards:
+        QRCode(vcard).to_SVGElement(width=45, height=45)
+
+def serialize(meishi, size):
+    front = meishi.get_svg('front')
+    back  = meishi.get_svg('back')
+    for _ in range(size):
+        front.tostring()
+        back.tostring()
+
+def parse(svgs):
+    for svg in svgs:
+        etree.fromstring(svg)
+
+def convert_to_pdf(meishi, size):
+    from newskylabs.graphics.pdf.pdf import svg2pdf
+    front = meishi.get_svg('front')
+    back  = meishi.get_svg('back')
+    for _ in range(size):
+        svg2pdf(front)
+        svg2pdf(back)
+
+def write_svg(svg, compresslevel):
+    svg.write(io.BytesIO(), compresslevel=compresslevel)
+
+def merge_pdf(drawings, size):
+    from newskylabs.graphics.pdf.pdf import PDFWriter
+    with PDFWriter(io.BytesIO()) as writer:
+        for _ in range(size):
+            for drawing in drawings:
+                writer.add_page(drawing)
+
+## =========================================================
+## Benchmarks
+## ---------------------------------------------------------
+
+def pipeline_benchmark_design_load():
+    result = measure(load_design, memory=settings['memory'])
+    return throughput(result, 1)
+
+def pipeline_benchmark_roster():
+    design = get_design()
+    return measure_sizes(merge_roster, lambda size: (design, make_roster(size)))
+
+def pipeline_benchmark_generate_front():
+    meishi = Meishi(datafile=get_design(), verbose=False)
+    return measure_sizes(generate_front, lambda size: (meishi, make_contents(size)))
+
+def pipeline_benchmark_generate_back():
+    results = {}
+    for plugin in PLUGINS:
+        meishi = Meishi(datafile=get_design(plugin), verbose=False)
+        results[plugin] = measure_sizes(generate_back, 
+                                        lambda size: (meishi, make_contents(size)))
+    return results
+
+def pipeline_benchmark_template():
+    template = MeishiTemplate(get_design())
+    return measure_sizes(generate_template, lambda size: (template, make_contents(size)))
+
+def pipeline_benchmark_back_drawing():
+    results = {}
+    for plugin in PLUGINS:
+        for share in (False, True):
+            template = MeishiTemplate(get_design(plugin), share=share)
+            name = '{}{}'.format(plugin, '-shared' if share else '')
+            results[name] = measure_sizes(convert_back,
+                                          lambda size: (template, make_contents(size)))
+    return results
+
+def pipeline_benchmark_vcard():
+    return measure_sizes(build_vcards, lambda size: (make_contents(size),))
+
+def pipeline_benchmark_qrcode():
+    def prepare(size):
+        return ([VCard(content).serialize() for content in make_contents(size)],)
+    return measure_sizes(encode_qrcodes, prepare)
+
+def pipeline_benchmark_serialize():
+    meishi = make_meishi()
+    return measure_sizes(serialize, lambda size: (meishi, size))
+
+def pipeline_benchmark_svg2pdf():
+    meishi = make_meishi()
+    return measure_sizes(convert_to_pdf, lambda size: (meishi, size))
+
+def pipeline_benchmark_pdf_merge():
+    meishi = make_meishi()
+    drawings = meishi.get_drawing('front'), meishi.get_drawing('back')
+    return measure_sizes(merge_pdf, lambda size: (drawings, size))
+
+def pipeline_benchmark_precision():
+    results = {}
+    for plugin in PLUGINS:
+        for precision in (None, 2):
+            meishi = make_meishi(plugin, precision)
+            svgs = [meishi.get_svg(side).tobytes() for side in ('front', 'back')]
+            name = '{}{}'.format(plugin, '-precision-{}'.format(precision) if precision else '')
+            results[name] = {
+                'bytes':     sum(len(svg) for svg in svgs),
+                'serialize': measure(serialize, meishi, 1),
+                'parse':     measure(parse, svgs),
+            }
+    return results
+
+def pipeline_benchmark_optimize():
+    results = {}
+    for plugin in PLUGINS:
+        for optimize in (False, True):
+            meishi = make_meishi(plugin, optimize=optimize)
+            svgs = [meishi.get_svg(side).tobytes() for side in ('front', 'back')]
+            name = '{}{}'.format(plugin, '-optimized' if optimize else '')
+            results[name] = {
+                'bytes':    sum(len(svg) for svg in svgs),
+                'generate': measure(generate_sides, meishi),
+                'svg2pdf':  measure(convert_to_pdf, meishi, 1),
+            }
+    return results
+
+def pipeline_benchmark_svgz():
+    results = {}
+    for plugin in PLUGINS:
+        svg = make_meishi(plugin).get_svg('back')
+        for compresslevel in (None, 1, 6, 9):
+            buffer = io.BytesIO()
+            svg.write(buffer, compresslevel=compresslevel)
+            name = '{}-{}'.format(plugin, 'svg' if compresslevel is None
+                                  else 'svgz-{}'.format(compresslevel))
+            result = throughput(measure(write_svg, svg, compresslevel), 1)
+            result['bytes'] = len(buffer.getvalue())
+            results[name] = result
+    return results
+
+def pipeline_benchmark_memory():
+
+    # A ConPat back side
+    meishi = Meishi(datafile=get_design('ConPat'), verbose=False)
+    meishi.set_content(make_contents(1)[0])
+    conpat_back = traced_memory(meishi.generate_back)
+
+    # The back sides of 100 ConPat cards imposed on a single sheet
+    # - large enough for all of them
+    template = MeishiTemplate(get_design('ConPat'))
+    meishis = [template.meishi(content) for content in make_contents(100)]
+    for meishi in meishis:
+        meishi.get_svg('back')
+    imposition = Imposition.from_design(get_design('ConPat'), sheet='1000x600')
+    imposed_sheet = traced_memory(imposition.sheet, meishis, 'back')
+
+    return {
+        'ConPat-back':   conpat_back,
+        'imposed-sheet': imposed_sheet,
+    }
+
+## =========================================================
+## Main
+## ---------------------------------------------------------
+
+if __name__ == '__main__':
+    main(globals())
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,224 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+
+"""benchmarks/newskylabs/graphics/svg/svg_benchmarks.py:
+
+Benchmarks for assembling SVG documents.
+
+Usage:
+
+  PYTHONPATH=. python benchmarks/newskylabs/graphics/svg/svg_benchmarks.py [-o results.json]
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/14"
+
+import math
+from array import array
+
+from newskylabs.graphics.utils.benchmarks import main, measure_sizes
+
+from newskylabs.graphics.svg.svg import SVGElement
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def make_polyline(size):
+    """A polyline with 'size' points - as list of points."""
+    return [(i * 0.1, 50 + 25 * math.sin(i * 0.1)) for i in range(size)]
+
+def format_path_concat(path):
+    """The path data assembled point by point
+    - as SVGElement.formatPath() did before."""
+
+    p = path[0]
+    pathstr = 'M{} {}'.format(p[0], p[1])
+    for p in path[1:]:
+        pathstr += ' L{} {}'.format(p[0], p[1])
+
+    return pathstr
+
+## =========================================================
+## Benchmarks
+## ---------------------------------------------------------
+
+def svg_benchmark_path():
+    """Add a polyline with 'size' points as path:
+
+    - concat:    the path data assembled point by point (as before);
+    - points:    addPath() with a list of points;
+    - flat:      addPath() with a flat coordinate buffer;
+    - precision: addPath() with a list of points rounded to 0.01;
+    - subpaths:  addPaths() with the polyline split into
+                 segments of 10 points.
+
+    """
+
+    def prepare(size):
+        return (make_polyline(size),)
+
+    def prepare_flat(size):
+        path = make_polyline(size)
+        return (array('d', [c for point in path for c in point]),)
+
+    def concat(path):
+        SVGElement('g').addElement('path', d=format_path_concat(path))
+
+    def add_path(path):
+        SVGElement('g').addPath(path)
+
+    def precision(path):
+        SVGElement('g').addPath(path, precision=2)
+
+    def subpaths(path):
+        SVGElement('g').addPaths([path[i:i+10] for i in range(0, len(path), 10)])
+
+    return {
+        'concat':    measure_sizes(concat,    prepare),
+        'points':    measure_sizes(add_path,  prepare),
+        'flat':      measure_sizes(add_path,  prepare_flat),
+        'precision': measure_sizes(precision, prepare),
+        'subpaths':  measure_sizes(subpaths,  prepare),
+    }
+
+def svg_benchmark_circles():
+    """Add 'size' circles (like the vertices of Dots):
+
+    - loop:  addCircle() for every circle;
+    - bulk:  a single addCircles() call;
+    - radii: addCircles() with a radius for every circle.
+
+    """
+
+    def prepare(size):
+        return (make_polyline(size),)
+
+    def loop(centers):
+        e = SVGElement('g')
+        for x, y in centers:
+            e.addCircle(cx=x, cy=y, r=0.5, fill='black')
+
+    def bulk(centers):
+        SVGElement('g').addCircles(centers, r=0.5, fill='black')
+
+    def radii(centers):
+        SVGElement('g').addCircles(centers, r=[0.5] * len(centers), fill='black')
+
+    return {
+        'loop':  measure_sizes(loop,  prepare),
+        'bulk':  measure_sizes(bulk,  prepare),
+        'radii': measure_sizes(radii, prepare),
+    }
+
+def svg_benchmark_rects():
+    """Add 'size' rectangles:
+
+    - loop: addRect() for every rectangle;
+    - bulk: a single addRects() call.
+
+    """
+
+    def prepare(size):
+        return ([(x, y, 0.5, 0.25) for x, y in make_polyline(size)],)
+
+    def loop(rects):
+        e = SVGElement('g')
+        for x, y, width, height in rects:
+            e.addRect(x=x, y=y, width=width, height=height, fill='gray')
+
+    def bulk(rects):
+        SVGElement('g').addRects(rects, fill='gray')
+
+    return {
+        'loop': measure_sizes(loop, prepare),
+        'bulk': measure_sizes(bulk, prepare),
+    }
+
+def svg_benchmark_builder():
+    """Add 'size' line segments as paths (like the edges of ConPat):
+
+    - wrapped:   addElement() - an SVGElement is made for every path;
+    - unwrapped: addLeaf() - the paths are made as lxml elements.
+
+    """
+
+    def prepare(size):
+        points = make_polyline(size + 1)
+        return (['M{} {} L{} {}'.format(*points[i], *points[i+1]) for i in range(size)],)
+
+    def wrapped(segments):
+        e = SVGElement('g')
+        for d in segments:
+            e.addElement('path', d=d, stroke='black', stroke_width=0.1)
+
+    def unwrapped(segments):
+        e = SVGElement('g')
+        for d in segments:
+            e.addLeaf('path', d=d, stroke='black', stroke_width=0.1)
+
+    return {
+        'wrapped':   measure_sizes(wrapped,   prepare),
+        'unwrapped': measure_sizes(unwrapped, prepare),
+    }
+
+def svg_benchmark_dispatch():
+    """Add 'size' rectangles:
+
+    - method:   addRect() - defined as method of SVGElement;
+    - getattr:  addRect() as made by SVGElement.__getattr__() for
+                elements without own add* method;
+    - element:  addElement('rect') - without add* method.
+
+    """
+
+    def method(size):
+        e = SVGElement('g')
+        for _ in range(size):
+            e.addRect(width=1, height=1)
+
+    def getattr_(size):
+        e = SVGElement('g')
+        for _ in range(size):
+            SVGElement.__getattr__(e, 'addRect')(width=1, height=1)
+
+    def element(size):
+        e = SVGElement('g')
+        for _ in range(size):
+            e.addElement('rect', width=1, height=1)
+
+    return {
+        'method':  measure_sizes(method),
+        'getattr': measure_sizes(getattr_),
+        'element': measure_sizes(element),
+    }
+
+## =========================================================
+## Main
+## ---------------------------------------------------------
+
+if __name__ == '__main__':
+    main(globals())
+
+## =========================================================
+## =========================================================
+
+## fin.
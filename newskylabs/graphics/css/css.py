@@ -18,6 +18,11 @@
 
 A class for adding CSS style sections to SVG files.
 
+A Stylesheet collects the CSS rules of a style section.  It is
+compiled once - the rules are deduplicated and serialized (optionally
+minified) a single time - and can then be added to any number of SVG
+documents (see SVGElement.addStylesheet()).
+
 """
 
 __author__      = "Dietrich Bollmann"
@@ -91,6 +96,11 @@ class CSSRule(object):
 
         return addAttr
 
+    def key(self):
+        """The selector and declarations of the rule
+        - equal for equal rules."""
+        return (self._selector, tuple(self._attrs.items()))
+
     def tostring(self, level):
 
         indent = ' ' * (2 * level)
@@ -106,6 +116,91 @@ class CSSRule(object):
 
         return css
 
+    def tominified(self):
+        """The rule without any unnecessary whitespace."""
+
+        declarations = ';'.join('{}:{}'.format(key, value)
+                                for key, value in self._attrs.items())
+        return '{}{{{}}}'.format(self._selector, declarations)
+
+## =========================================================
+## class Stylesheet
+## ---------------------------------------------------------
+
+class Stylesheet(object):
+    """The CSS rules of a style section - compiled once:
+
+      stylesheet = Stylesheet()
+      stylesheet.addRule('.name', font_size='5.75px', fill='black')
+      ...
+      for card in cards:
+          card.addStylesheet(stylesheet)
+
+    Repeated rules (with the same selector and declarations) are
+    only kept once - at the place of their last occurrence, which
+    leaves the cascade unchanged.  The serialized rules are cached
+    - rules should not be changed any more after the stylesheet has
+    been added to a document.
+
+    """
+
+    def __init__(self, minify=False, debug=False):
+
+        self._minify = minify
+        self._debug = debug
+        self._rules = []
+        self._strings = {}
+
+    def addRule(self, selector, *args, **kwargs):
+        """Add a CSS rule (see CSSRule) and return it."""
+
+        rule = CSSRule(selector, *args, debug=self._debug, **kwargs)
+        self._rules.append(rule)
+
+        # Serialize again
+        self._strings.clear()
+
+        return rule
+
+    def rules(self):
+        """The deduplicated rules."""
+
+        rules = {}
+        for rule in self._rules:
+            key = rule.key()
+            # Move repeated rules to their last place
+            rules.pop(key, None)
+            rules[key] = rule
+
+        return list(rules.values())
+
+    def tostring(self, level=0):
+        """The text of a <style> element at depth 'level'
+        - formatted like the rules added with SVGElement.addCSSRule().
+
+        """
+
+        try:
+            return self._strings[level]
+
+        except KeyError:
+            pass
+
+        rules = self.rules()
+
+        if not rules:
+            css = None
+
+        elif self._minify:
+            css = ''.join(rule.tominified() for rule in rules)
+
+        else:
+            css = '\n' + ' ' * (2 * level) \
+                + ''.join(rule.tostring(level) for rule in rules)
+
+        self._strings[level] = css
+        return css
+
 ## =========================================================
 ## =========================================================
 
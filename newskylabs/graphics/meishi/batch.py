@@ -0,0 +1,500 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""newskylabs/graphics/meishi/batch.py:
+
+Batch mode: render the meishis (name cards) of a whole roster of
+people with a single design.
+
+The roster is a list of `content' blocks (as found in the design
+files) given as CSV, YAML or NDJSON file.  Every entry of the roster
+is merged into the `content' of the design - so that only the
+information differing from person to person has to be given in the
+roster.
+
+The cards are rendered by a pool of worker processes.  Every worker
+loads the design only once and then renders all the cards it is
+given.
+
+In streaming mode the memory used stays the same however long the
+roster is: CSV and NDJSON rosters are read entry by entry, the roster
+is validated in a separate pass without keeping the merged entries,
+and the SVG trees and drawings of every card are released as soon as
+its files have been written.  Only a merged pdf grows with the roster
+- by the compressed content of its pages.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/04"
+
+import os, csv, json, time, copy, collections
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+
+from newskylabs.graphics.meishi.meishi import Meishi
+from newskylabs.graphics.meishi.template import MeishiTemplate
+from newskylabs.graphics.meishi.design import load_yaml, validate_content, DesignError
+from newskylabs.graphics.meishi.cache import RenderCache
+from newskylabs.graphics.meishi.instrumentation import Instrumentation, NULL_INSTRUMENTATION
+
+## =========================================================
+## Roster
+## ---------------------------------------------------------
+
+def record2content(record):
+    """Convert a flat record with keychains as keys
+    into a nested content block:
+
+    {'name.family': 'Body', 'name.given': 'Some'}
+    => {'name': {'family': 'Body', 'given': 'Some'}}
+
+    Empty fields are ignored.
+
+    """
+    content = {}
+    for keychain, value in record.items():
+
+        # Ignore empty fields
+        if keychain is None or value in (None, ''):
+            continue
+
+        keychain = keychain.strip().split('.')
+        node = content
+        for key in keychain[:-1]:
+            node = node.setdefault(key, {})
+        node[keychain[-1]] = value
+
+    return content
+
+def merge_content(defaults, content):
+    """Merge a (partial) content block recursively into 'defaults'.
+
+    Returns a new dictionary - 'defaults' is left untouched.
+
+    """
+    merged = copy.deepcopy(defaults) if defaults else {}
+    for key, value in content.items():
+        if isinstance(value, dict) \
+           and isinstance(merged.get(key), dict):
+            merged[key] = merge_content(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def _unwrap(entry):
+    """Unwrap entries given as {'content': {...}}."""
+    return entry['content'] if isinstance(entry, dict) and 'content' in entry else entry
+
+def iter_roster(rosterfile):
+    """Read a roster entry by entry.
+
+    CSV and NDJSON files are read lazily one line at a time - so that
+    rosters of any length can be streamed.  YAML files are loaded as a
+    whole (see load_roster()).
+
+    Generates the content blocks of the roster.
+
+    """
+
+    _, ext = os.path.splitext(rosterfile)
+    ext = ext.lower()
+
+    if ext == '.csv':
+        with open(rosterfile, newline='') as fh:
+            for record in csv.DictReader(fh):
+                yield record2content(record)
+
+    elif ext in ('.ndjson', '.jsonl'):
+        with open(rosterfile) as fh:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield _unwrap(json.loads(line))
+
+    else:
+        for content in load_roster(rosterfile):
+            yield content
+
+def load_roster(rosterfile):
+    """Load a roster from a CSV, YAML or NDJSON file.
+
+    - CSV:    one person per row;
+              the column names are keychains like 'name.family'
+              or 'contact.work.adr.street';
+
+    - YAML:   a list of content blocks
+              (or a mapping with such a list as value of 'roster');
+
+    - NDJSON: one content block (JSON object) per line.
+
+    In YAML and NDJSON files an entry can also be given as mapping
+    with the content block as value of 'content'.
+
+    Returns a list of content blocks.
+
+    """
+
+    _, ext = os.path.splitext(rosterfile)
+    ext = ext.lower()
+
+    if ext in ('.csv', '.ndjson', '.jsonl'):
+        return list(iter_roster(rosterfile))
+
+    elif ext in ('.yaml', '.yml'):
+        with open(rosterfile) as fh:
+            roster = load_yaml(fh)
+        if isinstance(roster, dict):
+            roster = roster['roster']
+
+    else:
+        msg = "Unknown roster format '{}' " \
+            + "(expected a .csv, .yaml, .yml, .ndjson or .jsonl file)"
+        raise ValueError(msg.format(ext))
+
+    if not isinstance(roster, list):
+        msg = "The roster {} should contain a list of content blocks, got {}"
+        raise ValueError(msg.format(rosterfile, type(roster).__name__))
+
+    # Unwrap entries given as {'content': {...}}
+    return [_unwrap(entry) for entry in roster]
+
+## =========================================================
+## Workers
+## ---------------------------------------------------------
+
+# The design and template used by the current worker process
+_design = None
+_template = None
+_cache = None
+
+def load_design(datafile):
+    """Load and validate a meishi design.
+
+    Raises a DesignError (a ValueError) when the design is invalid.
+
+    """
+
+    if not os.path.isfile(datafile):
+        raise ValueError("The design file {} does not exist".format(datafile))
+
+    try:
+        meishi = Meishi(datafile=datafile, verbose=False)
+
+    except DesignError as error:
+        raise DesignError("Invalid design {}: {}".format(datafile, error))
+
+    return meishi._data
+
+def merge_roster(design, roster):
+    """Merge every entry of the roster into the content of the design
+    and validate the result.
+
+    Raises a DesignError naming the first invalid entry
+    - before any rendering work is spent.
+
+    """
+
+    return list(iter_merged(design, roster))
+
+def iter_merged(design, roster):
+    """Like merge_roster() - but generate the merged entries one by
+    one.  An invalid entry is only noticed when it is reached."""
+
+    for index, content in enumerate(roster):
+        keychain = 'roster[{}]'.format(index)
+
+        # Entries like strings or null can not be merged
+        if not isinstance(content, dict):
+            msg = "{}: expected a content block (a mapping), got {!r} ({})"
+            raise DesignError(msg.format(keychain, content, type(content).__name__))
+
+        content = merge_content(design['content'], content)
+        validate_content(content, keychain)
+        yield content
+
+def iter_meishis(design, roster):
+    """Generate a meishi for every entry of the roster.
+
+    The design is compiled into a template once,
+    the meishis are created lazily one by one.
+    The roster is validated before the first meishi is made.
+
+    """
+
+    roster = merge_roster(design, roster)
+    template = MeishiTemplate(design)
+    for content in roster:
+        yield template.meishi(content)
+
+def _init_worker(datafile, cache_dir=None, cache_size=None, optimize=False):
+    """Load the design and compile it once per worker process."""
+    global _design, _template, _cache
+    _design = load_design(datafile)
+    _template = MeishiTemplate(_design, optimize=optimize)
+    _cache = RenderCache(cache_dir, max_size=cache_size) if cache_dir else None
+
+def _render_card(job):
+    """Render a single card.
+
+    The files of the card are saved into its own directory; when the
+    card is going to be added to a merged pdf, its drawings are
+    returned.
+
+    """
+
+    index, content, directory, svg, merge, instrument = job
+
+    # Measure the stages of rendering the card?
+    instrumentation = Instrumentation() if instrument else None
+
+    # The content has been merged and validated already
+    meishi = _template.meishi(content, cache=_cache, instrumentation=instrumentation)
+
+    # Count the cache hits and misses of this card
+    before = _cache.stats() if _cache else None
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        meishi.save(show=False, directory=directory, svg=svg, release=not merge)
+
+    result = {'index': index, 'hits': 0, 'misses': 0, 'drawings': None, 'report': None}
+
+    if _cache:
+        after = _cache.stats()
+        result['hits']   = after['hits']   - before['hits']
+        result['misses'] = after['misses'] - before['misses']
+
+    if merge:
+        result['drawings'] = meishi.get_drawing('front'), meishi.get_drawing('back')
+        meishi.release()
+
+    if instrument:
+        result['report'] = meishi.report()
+
+    return result
+
+def _imap(executor, fn, jobs, window):
+    """Like executor.map() - but with at most 'window' jobs in flight.
+
+    This way the results do not pile up in memory
+    when they are consumed slower than they are produced.
+
+    """
+
+    pending = collections.deque()
+    for job in jobs:
+        pending.append(executor.submit(fn, job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+## =========================================================
+## MeishiBatch
+## ---------------------------------------------------------
+
+class MeishiBatch:
+    """Render the meishis of all people in a roster."""
+
+    def __init__(self, datafile, jobs=None, verbose=True,
+                 cache_dir=None, cache_size=None, instrumentation=None,
+                 optimize=False):
+        """
+        - datafile:        the design;
+        - jobs:            the number of worker processes;
+        - cache_dir:       when given, the directory of a render cache
+                           reusing the files of unchanged cards;
+        - cache_size:      the maximal size of the render cache in bytes;
+        - instrumentation: an Instrumentation (or True) to measure the
+                           stages of rendering.  The stages of the
+                           cards are measured in the worker processes
+                           and added when a card is finished;
+        - optimize:        optimize the SVG code of the cards
+                           (see newskylabs.graphics.svg.optimize).
+
+        """
+        self._datafile = datafile
+        self._jobs = jobs or os.cpu_count() or 1
+        self._verbose = verbose
+        self._cache_args = (cache_dir, cache_size)
+        self._optimize = optimize
+
+        if instrumentation is True:
+            instrumentation = Instrumentation()
+        self._instrumentation = instrumentation or NULL_INSTRUMENTATION
+
+    def report(self):
+        """The measurements of the instrumentation
+        (see Instrumentation.report())."""
+        return self._instrumentation.report()
+
+    def card_directory(self, outdir, index):
+        """The directory the files of the 'index'-th card are saved in."""
+        return os.path.join(outdir, 'card-{:05d}'.format(index + 1))
+
+    def _results(self, jobs):
+        """Render the jobs and generate the results in order."""
+
+        if self._jobs == 1:
+            # Render in the current process
+            _init_worker(self._datafile, *self._cache_args, self._optimize)
+            for job in jobs:
+                yield _render_card(job)
+
+        else:
+            with ProcessPoolExecutor(max_workers=self._jobs,
+                                     initializer=_init_worker,
+                                     initargs=(self._datafile,) + self._cache_args
+                                              + (self._optimize,)) as executor:
+                window = 4 * self._jobs
+                for result in _imap(executor, _render_card, jobs, window):
+                    yield result
+
+    def render(self, roster, outdir=None, merge=None, svg=False, stream=False):
+        """Render every card of the roster.
+
+        - roster: a list of content blocks
+                  or the path of a roster file;
+        - outdir: the directory to save the cards in
+                  (one sub-directory per card);
+        - merge:  the file name of a single pdf combining all cards;
+        - svg:    also save the SVG code of the cards
+                  (by default only pdf files are written)
+                  - gzip compressed as .svgz files with 'svgz';
+        - stream: streaming mode - render rosters of any length
+                  with bounded memory.  Roster files and lists are
+                  read twice: once for validating and once for
+                  rendering.  Other iterables (like generators) can
+                  only be read once - their entries are validated
+                  while rendering.
+
+        At least one of 'outdir' and 'merge' has to be given.
+        The merged pdf is written page by page in a single pass.
+
+        Returns a summary of the run.
+
+        """
+
+        if not outdir and not merge:
+            raise ValueError("Neither an output directory nor a merged pdf file given")
+
+        instrumentation = self._instrumentation
+
+        # Fail early on invalid designs and roster entries
+        # - before any rendering work is spent
+        with instrumentation.stage('roster'):
+            design = load_design(self._datafile)
+
+            if stream and not isinstance(roster, str) and iter(roster) is roster:
+                # An iterator can only be read once
+                # - the entries are validated while rendering
+                roster = iter_merged(design, roster)
+
+            elif stream:
+                rosterfile = roster if isinstance(roster, str) else None
+
+                # Validate in a first pass
+                # - without keeping the merged entries
+                entries = iter_roster(rosterfile) if rosterfile else roster
+                for _ in iter_merged(design, entries):
+                    pass
+
+                # ...and merge the entries again one by one while rendering
+                entries = iter_roster(rosterfile) if rosterfile else roster
+                roster = iter_merged(design, entries)
+
+            else:
+                if isinstance(roster, str):
+                    roster = load_roster(roster)
+
+                roster = merge_roster(design, roster)
+
+        jobs = ((index, 
+                 content, 
+                 self.card_directory(outdir, index) if outdir else None, 
+                 svg, 
+                 bool(merge),
+                 bool(instrumentation))
+                for index, content in enumerate(roster))
+
+        start = time.perf_counter()
+
+        cards = hits = misses = 0
+        with ExitStack() as stack:
+
+            # The merged pdf is only saved when all cards have been
+            # rendered - it is discarded when rendering fails
+            writer = None
+            if merge:
+                from newskylabs.graphics.pdf.pdf import PDFWriter
+                writer = stack.enter_context(PDFWriter(merge))
+
+            for result in self._results(jobs):
+
+                cards  += 1
+                hits   += result['hits']
+                misses += result['misses']
+
+                if result['report']:
+                    instrumentation.merge(result['report'])
+
+                # Add the card to the merged pdf 
+                # - and forget its drawings
+                if writer:
+                    with instrumentation.stage('pdf_merge'):
+                        for drawing in result['drawings']:
+                            writer.add_page(drawing)
+
+            if writer:
+                with instrumentation.stage('pdf_merge'):
+                    writer.close()
+
+        seconds = time.perf_counter() - start
+
+        summary = {
+            'cards':            cards,
+            'jobs':             self._jobs,
+            'seconds':          seconds,
+            'cards_per_second': cards / seconds if seconds > 0 else 0.0,
+            'output':           outdir,
+            'merged':           merge,
+        }
+
+        if self._cache_args[0]:
+            summary['cache_hits']   = hits
+            summary['cache_misses'] = misses
+
+        if instrumentation:
+            summary['stages'] = instrumentation.report()
+
+        if self._verbose:
+            print("Rendered {cards} cards in {seconds:.2f}s "
+                  "({cards_per_second:.1f} cards/sec, {jobs} jobs)".format(**summary))
+            if 'cache_hits' in summary:
+                print("Render cache: {cache_hits} hits, {cache_misses} misses"\
+                      .format(**summary))
+
+        return summary
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,326 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""newskylabs/graphics/meishi/cache.py:
+
+A content-addressed on-disk cache for rendered meishis (name cards).
+
+The rendered files (SVG code, pdfs) of a meishi are stored under a
+key calculated as hash over the resolved design data - including the
+personal data written on the meishi - and the version of this
+library.  When nothing changed, a meishi is not rendered again but
+taken from the cache.
+
+The cache is limited in size: when it grows larger than its maximal
+size, the least recently used files are removed.
+
+Raster previews (thumbnails) which are requested again and again -
+like the previews of a web page - are in addition kept in memory by a
+ThumbnailCache, optionally backed by a RenderCache on disk.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/08"
+
+import os, json, hashlib, tempfile, threading, collections
+
+from newskylabs.graphics.__about__ import __version__
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def data_hash(*data):
+    """Canonical hash over JSON-like data.
+
+    Dictionaries are hashed independently of the order of their keys.
+
+    """
+
+    string = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(string.encode('utf-8')).hexdigest()
+
+## =========================================================
+## class RenderCache
+## ---------------------------------------------------------
+
+class RenderCache:
+    """A size-limited on-disk cache for rendered files."""
+
+    # Default maximal size: 256MB
+    _default_max_size = 256 * 1024 * 1024
+
+    # After an eviction the cache is filled to 90% of its maximal size
+    _low_water_mark = 0.9
+
+    def __init__(self, directory, max_size=None, version=__version__):
+
+        self._directory = directory
+        self._max_size  = max_size or self._default_max_size
+        self._version   = version
+
+        # The size of the cache - calculated when needed
+        self._size = None
+
+        # Statistics
+        self._hits      = 0
+        self._misses    = 0
+        self._evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, data):
+        """The key of the files rendered from 'data'."""
+        return data_hash(data, self._version)
+
+    def _path(self, key, name):
+        return os.path.join(self._directory, key[:2], key, name)
+
+    def has(self, key, name):
+        """Is the file 'name' cached under 'key'?
+
+        Does neither read the file nor count as hit or miss.
+
+        """
+        return os.path.isfile(self._path(key, name))
+
+    def get(self, key, name):
+        """Get the file 'name' cached under 'key'.
+
+        Returns the content of the file as bytes or None when the
+        file is not in the cache.
+
+        """
+
+        path = self._path(key, name)
+        try:
+            with open(path, 'rb') as fh:
+                data = fh.read()
+
+        except FileNotFoundError:
+            self._misses += 1
+            return None
+
+        # Remember the last use for the eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        self._hits += 1
+        return data
+
+    def put(self, key, name, data):
+        """Cache the bytes 'data' as file 'name' under 'key'."""
+
+        path = self._path(key, name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # The size of the file replaced
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+
+        # Write atomically - other processes might read the file
+        fd, tmpfile = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmpfile, path)
+
+        except BaseException:
+            os.remove(tmpfile)
+            raise
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += len(data) - replaced
+
+        if self._size > self._max_size:
+            self.evict()
+
+    def _entries(self):
+        """All cached files as (mtime, size, path) tuples."""
+
+        entries = []
+        for dirpath, _, filenames in os.walk(self._directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        return entries
+
+    def size(self):
+        """The size of all cached files in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_size=None):
+        """Remove the least recently used files 
+        until the cache is smaller than 90% of 'max_size'."""
+
+        if max_size is None:
+            max_size = self._max_size
+        limit = max_size * self._low_water_mark
+
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+
+        for _, filesize, path in entries:
+            if size <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= filesize
+            self._evictions += 1
+
+            # Remove empty directories
+            for directory in [os.path.dirname(path),
+                              os.path.dirname(os.path.dirname(path))]:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+
+        self._size = size
+
+    def clear(self):
+        """Remove all cached files."""
+        self.evict(max_size=0)
+
+    def stats(self):
+        """Hit and miss counts of this cache object."""
+
+        lookups = self._hits + self._misses
+        return {
+            'hits':      self._hits,
+            'misses':    self._misses,
+            'evictions': self._evictions,
+            'hit_rate':  self._hits / lookups if lookups else 0.0,
+        }
+
+## =========================================================
+## class ThumbnailCache
+## ---------------------------------------------------------
+
+class ThumbnailCache:
+    """A size-limited in-memory cache for raster previews.
+
+    The previews are keyed by a hash over the content they show
+    (see data_hash()).  When a RenderCache is given, the previews are
+    also saved on disk - and survive restarts of the program.
+
+    The cache can be shared by threads.
+
+    """
+
+    # Default maximal size: 32MB
+    _default_max_size = 32 * 1024 * 1024
+
+    def __init__(self, max_size=None, cache=None):
+
+        self._max_size = max_size or self._default_max_size
+        self._cache    = cache
+
+        # key -> image; ordered from least to most recently used
+        self._images = collections.OrderedDict()
+        self._size   = 0
+        self._lock   = threading.Lock()
+
+        # Statistics
+        self._hits      = 0
+        self._misses    = 0
+        self._evictions = 0
+
+    def key(self, *data):
+        """The key of the preview showing 'data'."""
+        return data_hash(__version__, *data)
+
+    def get(self, key):
+        """Get a preview - or None when it is not in the cache."""
+
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self._hits += 1
+                return image
+
+        # Saved on disk?
+        if self._cache:
+            image = self._cache.get(key, 'thumbnail.png')
+            if image is not None:
+                self._put(key, image)
+                with self._lock:
+                    self._hits += 1
+                return image
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(self, key, image):
+        """Cache the preview 'image' (bytes) under 'key'."""
+
+        self._put(key, image)
+        if self._cache:
+            self._cache.put(key, 'thumbnail.png', image)
+
+    def _put(self, key, image):
+
+        with self._lock:
+            if key in self._images:
+                self._size -= len(self._images.pop(key))
+
+            self._images[key] = image
+            self._size += len(image)
+
+            # Forget the least recently used previews
+            while self._size > self._max_size and len(self._images) > 1:
+                _, old = self._images.popitem(last=False)
+                self._size -= len(old)
+                self._evictions += 1
+
+    def stats(self):
+        """Hit and miss counts and the size of the cache."""
+
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits':      self._hits,
+                'misses':    self._misses,
+                'evictions': self._evictions,
+                'hit_rate':  self._hits / lookups if lookups else 0.0,
+                'images':    len(self._images),
+                'size':      self._size,
+            }
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,503 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""newskylabs/graphics/meishi/design.py:
+
+Loading meishi (name card) designs fast.
+
+The YAML files are parsed with the C loader of PyYAML (libyaml) when
+it is available - which is about ten times faster than the pure
+Python loader.
+
+In addition the resolved designs (with all anchors and aliases like
+`*content' and `*parameter' already resolved) are cached:
+
+  - in memory as pickled designs: keyed by the path, the
+    modification time and the size of the design file - so that
+    loading the same design again does not even read the file;
+
+  - on disk as JSON: keyed by a hash over the content of the design
+    file - so that a design is parsed only once over many runs of
+    `nsl-meishi'.  JSON only contains plain data - reading a cache
+    file written by somebody else can not run any code.  Designs
+    which can not be represented in JSON exactly (like designs with
+    dates) are not cached on disk.
+
+Unpickling a design takes a few microseconds.  Every call returns a
+fresh copy of the design - so that the design can be modified (as is
+done when the personal information of a roster entry is filled in)
+without affecting the cached design.
+
+The disk cache is opt-in: it is only used when a cache directory is
+given to the loaders or after enable_disk_cache() has been called -
+as done by `nsl-meishi'.  Its default directory is
+$XDG_CACHE_HOME/nsl-meishi/designs (default: ~/.cache/nsl-meishi/designs).
+It can be relocated with the environment variable
+NSL_MEISHI_DESIGN_CACHE; setting it to an empty string switches the
+disk cache off.
+
+The loaded designs are validated and turned into a design model
+(Design) with the sections and fields of the design as attributes -
+so that the renderer can access 'design.parameter.width' directly
+instead of looking up keychains like 'parameter.width' in nested
+dictionaries.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/08"
+
+import os, json, pickle, hashlib, yaml
+
+from newskylabs.graphics.__about__ import __version__
+
+## =========================================================
+## YAML
+## ---------------------------------------------------------
+
+# Use the C implementation of the loader when available
+YAMLLoader = getattr(yaml, 'CFullLoader', yaml.FullLoader)
+
+def load_yaml(stream):
+    """Parse YAML from a string or stream with the fastest loader."""
+    return yaml.load(stream, Loader=YAMLLoader)
+
+## =========================================================
+## Design cache
+## ---------------------------------------------------------
+
+# In-memory cache: (path, mtime, size) -> pickled design
+# - pickle is only used for designs parsed by this process
+_designs = {}
+
+# The directory of the disk cache used by default
+# - None until enable_disk_cache() is called
+_default_cache_dir = None
+
+def get_design_cache_dir():
+    """The directory of the disk cache or None when switched off."""
+
+    directory = os.environ.get('NSL_MEISHI_DESIGN_CACHE')
+    if directory is not None:
+        return directory or None
+
+    cache_home = os.environ.get('XDG_CACHE_HOME') \
+        or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'nsl-meishi', 'designs')
+
+def enable_disk_cache(cache_dir=True):
+    """Use a disk cache when loading designs
+    without explicit 'cache_dir'.
+
+    - cache_dir: the directory of the disk cache;
+                 True:  use the default directory
+                        (see get_design_cache_dir());
+                 None:  switch the disk cache off again.
+
+    """
+
+    global _default_cache_dir
+
+    if cache_dir is True:
+        cache_dir = get_design_cache_dir()
+    _default_cache_dir = cache_dir
+
+def _get_cache_dir(cache_dir):
+    """The directory of the disk cache to use - None when switched off."""
+
+    if cache_dir is None:
+        return _default_cache_dir
+    if cache_dir is True:
+        return get_design_cache_dir()
+    return cache_dir or None
+
+def _cache_path(directory, source):
+    """The path of the cached design parsed from 'source'."""
+
+    # The version of the package and the loader are part of the key:
+    # a new version might resolve the designs differently
+    sha = hashlib.sha256()
+    sha.update('{} {}\n'.format(__version__, YAMLLoader.__name__).encode('utf-8'))
+    sha.update(source)
+    return os.path.join(directory, sha.hexdigest() + '.json')
+
+def _read_cache(path):
+    """Read a cached design - None when it is not cached
+    (or the cache file is broken)."""
+
+    try:
+        with open(path, 'rb') as fh:
+            return json.loads(fh.read())
+
+    except (OSError, ValueError):
+        return None
+
+def _write_cache(path, design):
+    """Save a design as JSON atomically - errors are ignored,
+    the cache is an optimization only.
+
+    Designs which would not be read back exactly - like designs with
+    dates or numbers as keys - are not cached.
+
+    """
+
+    try:
+        data = json.dumps(design, separators=(',', ':'), allow_nan=False)
+        if json.loads(data) != design:
+            return
+
+    except (TypeError, ValueError):
+        return
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmpfile = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmpfile, 'w') as fh:
+            fh.write(data)
+        os.replace(tmpfile, path)
+
+    except OSError:
+        pass
+
+def parse_design(source, cache_dir=None):
+    """Parse the YAML code of a design given as bytes.
+
+    The parsed design is taken from the disk cache
+    in 'cache_dir' when possible.
+
+    Returns the pickled design.
+
+    """
+
+    path = _cache_path(cache_dir, source) if cache_dir else None
+
+    # Cached on disk?
+    design = _read_cache(path) if path else None
+
+    if design is None:
+        design = load_yaml(source)
+
+        if path:
+            _write_cache(path, design)
+
+    # Pickle the resolved design.
+    # Objects shared by YAML anchors and aliases
+    # are pickled only once and stay shared.
+    return pickle.dumps(design, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_design_file(designfile, cache_dir=None):
+    """Load a design file.
+
+    - cache_dir: the directory of the disk cache;
+                 None:  use the disk cache only when enabled
+                        (see enable_disk_cache());
+                 True:  use the default directory
+                        (see get_design_cache_dir());
+                 False: do not use a disk cache.
+
+    Returns a fresh copy of the design.
+
+    """
+
+    cache_dir = _get_cache_dir(cache_dir)
+
+    # Loaded before?
+    stat = os.stat(designfile)
+    key = (os.path.abspath(designfile), stat.st_mtime_ns, stat.st_size)
+    pickled = _designs.get(key)
+
+    if pickled is None:
+        with open(designfile, 'rb') as fh:
+            source = fh.read()
+        pickled = parse_design(source, cache_dir)
+        _designs[key] = pickled
+
+    return pickle.loads(pickled)
+
+def load_design_stream(stream, cache_dir=None):
+    """Load a design from a stream (like an opened file).
+
+    'cache_dir' is the directory of the disk cache
+    (see load_design_file()).
+
+    Returns a fresh copy of the design.
+
+    """
+
+    cache_dir = _get_cache_dir(cache_dir)
+
+    source = stream.read()
+    if isinstance(source, str):
+        source = source.encode('utf-8')
+
+    return pickle.loads(parse_design(source, cache_dir))
+
+## =========================================================
+## Design model
+## ---------------------------------------------------------
+
+class DesignError(ValueError):
+    """An invalid design or content block."""
+
+class Model:
+    """Base class of the design model.
+
+    A model is built from a (nested) dictionary as found in the
+    design files.  Every field is validated and converted when the
+    model is built - so that errors surface when a design is loaded
+    rather than in the middle of rendering - and can be accessed as
+    attribute afterwards.
+
+    The fields are given in '_fields' as tuples 
+
+      (attribute, key, kind, default)
+
+    where 'kind' is either a Model subclass for nested sections or
+    one of the kinds in '_kinds'.  Fields without default
+    (default=REQUIRED) have to be given.
+
+    """
+
+    __slots__ = ()
+    _fields = ()
+
+    def __init__(self, data, path=''):
+
+        if not isinstance(data, dict):
+            msg = "{}: expected a mapping, got {}"
+            raise DesignError(msg.format(path or 'design', _describe(data)))
+
+        for attribute, key, kind, default in self._fields:
+
+            keychain = '{}.{}'.format(path, key) if path else key
+
+            if key in data:
+                value = data[key]
+                if isinstance(kind, type):
+                    value = kind(value, keychain)
+                else:
+                    value = _kinds[kind](value, keychain)
+
+            elif default is REQUIRED:
+                raise DesignError("{}: missing".format(keychain))
+
+            elif isinstance(kind, type):
+                value = kind({} if default is None else default, keychain)
+
+            else:
+                value = default
+
+            setattr(self, attribute, value)
+
+    def __repr__(self):
+        fields = ', '.join('{}={!r}'.format(attribute, getattr(self, attribute))
+                           for attribute, _, _, _ in self._fields)
+        return '{}({})'.format(type(self).__name__, fields)
+
+# Marks required fields
+REQUIRED = object()
+
+def _describe(value):
+    return '{!r} ({})'.format(value, type(value).__name__)
+
+def _text(value, keychain):
+    """Texts written on the meishi - numbers like postal codes
+    or telephone numbers are converted to strings."""
+
+    if isinstance(value, bool) \
+       or not isinstance(value, (str, int, float)):
+        msg = "{}: expected a text, got {}"
+        raise DesignError(msg.format(keychain, _describe(value)))
+
+    return str(value)
+
+def _number(value, keychain):
+
+    if isinstance(value, bool) \
+       or not isinstance(value, (int, float)):
+        msg = "{}: expected a number, got {}"
+        raise DesignError(msg.format(keychain, _describe(value)))
+
+    return value
+
+def _integer(value, keychain):
+
+    if isinstance(value, bool) \
+       or not isinstance(value, int):
+        msg = "{}: expected an integer, got {}"
+        raise DesignError(msg.format(keychain, _describe(value)))
+
+    return value
+
+def _plugin(value, keychain):
+    """A plugin specification: a mapping with the path of the
+    plugin class as 'class'.  The parameters are checked by the
+    plugin itself."""
+
+    if not isinstance(value, dict) \
+       or not isinstance(value.get('class'), str):
+        msg = "{}: expected a plugin with a 'class', got {}"
+        raise DesignError(msg.format(keychain, _describe(value)))
+
+    return value
+
+_kinds = {
+    'text':    _text,
+    'number':  _number,
+    'integer': _integer,
+    'plugin':  _plugin,
+}
+
+class Name(Model):
+    __slots__ = ('family', 'given', 'suffix')
+    _fields = (
+        ('family', 'family', 'text', REQUIRED),
+        ('given',  'given',  'text', REQUIRED),
+        ('suffix', 'suffix', 'text', ''),
+    )
+
+class Organization(Model):
+    __slots__ = ('name', 'unit')
+    _fields = (
+        ('name', 'name', 'text', REQUIRED),
+        ('unit', 'unit', 'text', REQUIRED),
+    )
+
+class Address(Model):
+    __slots__ = ('street', 'city', 'code', 'country')
+    _fields = (
+        ('street',  'street',  'text', REQUIRED),
+        ('city',    'city',    'text', REQUIRED),
+        ('code',    'code',    'text', REQUIRED),
+        ('country', 'country', 'text', REQUIRED),
+    )
+
+class Work(Model):
+    __slots__ = ('email', 'url', 'tel', 'adr')
+    _fields = (
+        ('email', 'email', 'text',  REQUIRED),
+        ('url',   'url',   'text',  REQUIRED),
+        ('tel',   'tel',   'text',  REQUIRED),
+        ('adr',   'adr',   Address, REQUIRED),
+    )
+
+class Contact(Model):
+    __slots__ = ('work',)
+    _fields = (
+        ('work', 'work', Work, REQUIRED),
+    )
+
+class Content(Model):
+    """The personal information written on a meishi."""
+    __slots__ = ('name', 'title', 'org', 'contact')
+    _fields = (
+        ('name',    'name',    Name,         REQUIRED),
+        ('title',   'title',   'text',       REQUIRED),
+        ('org',     'org',     Organization, REQUIRED),
+        ('contact', 'contact', Contact,      REQUIRED),
+    )
+
+class Parameter(Model):
+    __slots__ = ('width', 'height', 'margin', 'color', 'background', 'precision')
+    _fields = (
+        ('width',      'width',      'number',  REQUIRED),
+        ('height',     'height',     'number',  REQUIRED),
+        ('margin',     'margin',     'number',  REQUIRED),
+        ('color',      'color',      'text',    REQUIRED),
+        ('background', 'background', 'text',    REQUIRED),
+        ('precision',  'precision',  'integer', None),
+    )
+
+class Debug(Model):
+    __slots__ = ('level', 'margin')
+    _fields = (
+        ('level',  'level',  'integer', 0),
+        ('margin', 'margin', 'number',  20),
+    )
+
+class Files(Model):
+    __slots__ = ('front', 'back', 'merged')
+    _fields = (
+        ('front',  'front',  'text', REQUIRED),
+        ('back',   'back',   'text', REQUIRED),
+        ('merged', 'merged', 'text', None),
+    )
+
+class Design(Model):
+    """A meishi design.
+
+    The design model is used by the renderer for fast attribute
+    access like 'design.content.contact.work.adr.street'.  The
+    original dictionary is kept as 'data' - it is handed over to the
+    plugins and to Meishi.get_data().
+
+    """
+
+    __slots__ = ('data', 'debug', 'content', 'svgfile', 'pdffile',
+                 'parameter', 'icon', 'back_side')
+    _fields = (
+        ('debug',     'debug',     Debug,     None),
+        ('content',   'content',   Content,   REQUIRED),
+        ('svgfile',   'svgfile',   Files,     REQUIRED),
+        ('pdffile',   'pdffile',   Files,     REQUIRED),
+        ('parameter', 'parameter', Parameter, REQUIRED),
+        ('icon',      'icon',      'plugin',  None),
+        ('back_side', 'back-side', 'plugin',  REQUIRED),
+    )
+
+    def __init__(self, data, path=''):
+        super().__init__(data, path)
+        self.data = data
+
+    def copy(self):
+        """A copy of the design with its own (shallow copied) data
+        - as used by meishis sharing a design."""
+
+        design = Design.__new__(Design)
+        for attribute in self.__slots__:
+            setattr(design, attribute, getattr(self, attribute))
+        design.data = dict(self.data)
+        return design
+
+    def set_content(self, content):
+        """Replace the content of the design.
+
+        The content is used both by the front side and the back-side
+        plugin (which encodes it as QR-Code).  It is validated before
+        anything is changed.
+
+        """
+
+        self.content = Content(content, 'content')
+        self.back_side = dict(self.back_side, content=content)
+        self.data['content'] = content
+        self.data['back-side'] = self.back_side
+
+def validate_content(content, path='content'):
+    """Validate a content block.
+
+    Returns the Content model - or raises a DesignError.
+
+    """
+    return Content(content, path)
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,521 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""newskylabs/graphics/meishi/imposition.py:
+
+N-up imposition: placing many meishis (name cards) on print-ready
+sheets.
+
+The front sides of the cards are placed in a grid on a front sheet
+and the back sides on a back sheet.  The grid of the back sheet is
+mirrored so that the front and back side of every card are aligned
+when the sheets are printed duplex:
+
+  - flip 'long-edge':  the columns are mirrored;
+  - flip 'short-edge': the rows are mirrored.
+
+Every card is placed with its bleed (the margin around the card
+given as 'parameter.margin' in the design) and clipped to it.  Crop
+marks at the trim lines of the cards are drawn around the grid.
+
+The sheets are generated one by one - so that only the cards of a
+single sheet are kept in memory at any time.  SVG sheets are even
+written card by card.
+
+Definitions shared by the cards (like the pattern of the back side
+defined once by a meishi template) are added to every SVG sheet only
+once.  In the pdf the cards are placed as layers of the page - the
+shared pattern is drawn once as form XObject for all cards of all
+sheets.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/06"
+
+import re
+
+from newskylabs.graphics.svg.svg import SVGElement, SVGWriter
+from newskylabs.graphics.utils.general import formatNumber
+
+## =========================================================
+## Sheet sizes
+## ---------------------------------------------------------
+
+# Sheet sizes in mm (portrait)
+SHEET_SIZES = {
+    'A5':     (148, 210),
+    'A4':     (210, 297),
+    'A3':     (297, 420),
+    'SRA4':   (225, 320),
+    'SRA3':   (320, 450),
+    'letter': (215.9, 279.4),
+    'legal':  (215.9, 355.6),
+}
+
+def get_sheet_size(sheet):
+    """Get the size of a sheet in mm.
+
+    'sheet' is either the name of a sheet size like 'A4' or 'SRA3',
+    a string like '320x450' or a (width, height) tuple.
+
+    """
+
+    if isinstance(sheet, (tuple, list)):
+        width, height = sheet
+        return float(width), float(height)
+
+    for name, size in SHEET_SIZES.items():
+        if sheet.lower() == name.lower():
+            return size
+
+    match = re.match(r'^\s*([0-9.]+)\s*[xX]\s*([0-9.]+)\s*(mm)?\s*$', sheet)
+    if match:
+        return float(match.group(1)), float(match.group(2))
+
+    msg = "Unknown sheet size '{}' (expected one of {} or WIDTHxHEIGHT in mm)"
+    raise ValueError(msg.format(sheet, ', '.join(SHEET_SIZES)))
+
+## =========================================================
+## class Imposition
+## ---------------------------------------------------------
+
+class Imposition:
+    """Place the front and back sides of many meishis on sheets."""
+
+    def __init__(self,
+                 width            = 85,
+                 height           = 55,
+                 bleed            = 1,
+                 margin           = None,
+                 sheet            = 'A4',
+                 orientation      = 'auto',
+                 sheet_margin     = 10,
+                 gutter           = 0,
+                 crop_marks       = True,
+                 crop_mark_length = 3,
+                 crop_mark_offset = 1,
+                 flip             = 'long-edge',
+                 debug            = 0
+    ):
+        """
+        - width, height:    the (trimmed) size of a card;
+        - bleed:            the bleed placed around every card;
+        - margin:           the margin around the cards in the
+                            SVG code of the meishis (default: bleed);
+        - sheet:            the sheet size (see get_sheet_size());
+        - orientation:      'portrait', 'landscape' or 'auto'
+                            (the orientation fitting more cards);
+        - sheet_margin:     the minimal non-printable margin of the sheet;
+        - gutter:           the space between the cards;
+        - crop_marks:       draw crop marks?
+        - flip:             'long-edge' or 'short-edge' duplex printing.
+
+        """
+
+        if not flip in ('long-edge', 'short-edge'):
+            msg = "Unknown flip '{}' (expected 'long-edge' or 'short-edge')"
+            raise ValueError(msg.format(flip))
+
+        self._width            = width
+        self._height           = height
+        self._bleed            = bleed
+        self._margin           = bleed if margin is None else margin
+        self._gutter           = gutter
+        self._crop_marks       = crop_marks
+        self._crop_mark_length = crop_mark_length
+        self._crop_mark_offset = crop_mark_offset
+        self._flip             = flip
+        self._debug            = debug
+
+        # The size of a card including its bleed
+        self._card_width  = width  + 2 * bleed
+        self._card_height = height + 2 * bleed
+
+        # Find the orientation fitting the most cards on a sheet
+        sheet_width, sheet_height = get_sheet_size(sheet)
+        portrait  = self._grid(sheet_width, sheet_height, sheet_margin)
+        landscape = self._grid(sheet_height, sheet_width, sheet_margin)
+
+        if orientation == 'portrait' \
+           or (orientation == 'auto'
+               and portrait[0] * portrait[1] >= landscape[0] * landscape[1]):
+            self._sheet_size = sheet_width, sheet_height
+            self._cols, self._rows = portrait
+
+        else: # orientation == 'landscape'
+            self._sheet_size = sheet_height, sheet_width
+            self._cols, self._rows = landscape
+
+        if self._cols * self._rows == 0:
+            msg = "A card of {}x{}mm (with a bleed of {}mm) " \
+                + "does not fit on a sheet of {}x{}mm"
+            raise ValueError(msg.format(width, height, bleed,
+                                        sheet_width, sheet_height))
+
+        # Center the grid of cards on the sheet
+        block_width  = self._cols * self._card_width  + (self._cols - 1) * gutter
+        block_height = self._rows * self._card_height + (self._rows - 1) * gutter
+        self._x0 = (self._sheet_size[0] - block_width)  / 2
+        self._y0 = (self._sheet_size[1] - block_height) / 2
+        self._block_size = block_width, block_height
+
+        # DEBUG
+        if debug > 0:
+            print("DEBUG Imposition:")
+            print("  - sheet:       {} x {}".format(*self._sheet_size))
+            print("  - grid:        {} x {}".format(self._cols, self._rows))
+            print("  - card:        {} x {}".format(self._card_width, self._card_height))
+            print("  - origin:      {}, {}".format(self._x0, self._y0))
+
+    def _grid(self, sheet_width, sheet_height, sheet_margin):
+        """Number of columns and rows fitting on a sheet."""
+
+        gutter = self._gutter
+        cols = int((sheet_width  - 2 * sheet_margin + gutter) \
+                   // (self._card_width  + gutter))
+        rows = int((sheet_height - 2 * sheet_margin + gutter) \
+                   // (self._card_height + gutter))
+        return max(cols, 0), max(rows, 0)
+
+    @classmethod
+    def from_design(cls, data, **kwargs):
+        """Make an imposition for the cards of a design.
+
+        The card size and bleed are taken from the 'parameter'
+        section of the design unless given in kwargs.
+
+        """
+
+        parameter = data['parameter']
+        for key, param in [('width',  'width'),
+                           ('height', 'height'),
+                           ('bleed',  'margin')]:
+            if kwargs.get(key) is None:
+                kwargs[key] = parameter[param]
+
+        # The margin the cards are rendered with
+        margin = parameter['margin']
+        if 'debug' in data and data['debug']['level'] > 0:
+            margin = data['debug']['margin']
+        kwargs['margin'] = margin
+
+        return cls(**kwargs)
+
+    @property
+    def cards_per_sheet(self):
+        return self._cols * self._rows
+
+    @property
+    def sheet_size(self):
+        return self._sheet_size
+
+    def position(self, index, side='front'):
+        """The position of the 'index'-th card on a sheet.
+
+        On the back sheet the grid is mirrored
+        according to the way the sheets are flipped.
+
+        """
+
+        row, col = divmod(index, self._cols)
+
+        if side == 'back':
+            if self._flip == 'long-edge':
+                col = self._cols - 1 - col
+            else: # self._flip == 'short-edge'
+                row = self._rows - 1 - row
+
+        x = self._x0 + col * (self._card_width  + self._gutter)
+        y = self._y0 + row * (self._card_height + self._gutter)
+
+        return x, y
+
+    def sheet(self, meishis, side='front'):
+        """Assemble a sheet with a side of the given meishis.
+
+        Note that the SVG elements of the meishis are moved to the
+        sheet - the meishis should not be used any more afterwards.
+
+        """
+
+        sheet_width, sheet_height = self._sheet_size
+        root = SVGElement.root(width=sheet_width, height=sheet_height, absolute=True)
+
+        # All definitions are collected in the first defs element
+        defs = None
+        for part in self.sheet_parts(meishis, side):
+            if defs is not None and part._xml.tag == defs._xml.tag:
+                for definition in list(part._xml):
+                    defs.append(definition)
+            else:
+                root.append(part)
+                if defs is None:
+                    defs = part
+
+        return root
+
+    def write_sheet(self, meishis, stream, side='front', compresslevel=None):
+        """Write a sheet with a side of the given meishis as SVG to a
+        binary stream (or a file given by its name).
+
+        The sheet is written card by card (see SVGWriter) - without
+        assembling the whole sheet in memory.  With 'compresslevel' -
+        and when writing to a .svgz file - it is gzip compressed on
+        the fly.
+
+        """
+
+        sheet_width, sheet_height = self._sheet_size
+        with SVGWriter(stream, compresslevel=compresslevel) as writer:
+            with writer.root(width=sheet_width, height=sheet_height, absolute=True):
+                for part in self.sheet_parts(meishis, side):
+                    writer.write(part)
+
+    def sheet_parts(self, meishis, side='front'):
+        """Generate the parts of a sheet one by one:
+        the definitions, the cards and the crop marks.
+
+        Note that the SVG elements of the meishis are moved to the
+        parts - the meishis should not be used any more afterwards.
+
+        """
+
+        self._check_cards(meishis)
+
+        # All cards are clipped to their size including the bleed
+        defs = SVGElement('defs')
+        clip = defs.addClipPath(id='card')
+        clip.addRect(x=0, y=0, width=self._card_width, height=self._card_height)
+        yield defs
+
+        # The ids of the definitions on the sheet
+        ids = {'card'}
+
+        # The cards have been rendered with a margin
+        # which might differ from the bleed
+        offset = self._bleed - self._margin
+
+        for index, meishi in enumerate(meishis):
+
+            x, y = self.position(index, side)
+            transform = 'translate({}, {})'.format(formatNumber(x), formatNumber(y))
+            card = SVGElement('g', transform=transform)
+            content = card.addElement('g', clip_path='url(#card)')
+            if offset != 0:
+                content = content.addTranslate(offset, offset)
+
+            # Definitions of the card not on the sheet yet
+            defs = SVGElement('defs')
+
+            # Move the content of the card to the sheet
+            svg = meishi.get_svg(side)
+            for element in list(svg._xml):
+
+                # Move every definition only once
+                if element.tag == defs._xml.tag:
+                    for definition in list(element):
+                        if not definition.get('id') in ids:
+                            ids.add(definition.get('id'))
+                            defs.append(definition)
+
+                else:
+                    content.append(element)
+
+            if len(defs._xml) > 0:
+                yield defs
+
+            yield card
+
+        if self._crop_marks:
+            yield self.crop_marks()
+
+    def sheet_drawing(self, meishis, side='front'):
+        """Assemble a sheet with a side of the given meishis as
+        reportlab drawing (see newskylabs.graphics.pdf.pdf).
+
+        The drawing of every card is placed as layer of a
+        LayeredDrawing and clipped to the size of the card including
+        its bleed.  Layers shared by the cards (like the pattern of
+        the back side of meishis made from a template) stay shared:
+        a PDFWriter draws them only once for all cards of all sheets.
+
+        Unlike sheet() the meishis are left untouched.
+
+        """
+
+        from reportlab.lib.units import mm
+        from newskylabs.graphics.pdf.pdf import svg2drawing, LayeredDrawing
+
+        self._check_cards(meishis)
+
+        sheet_width, sheet_height = self._sheet_size
+        page_height = sheet_height * mm
+
+        # The cards have been rendered with a margin
+        # which might differ from the bleed
+        offset = self._bleed - self._margin
+
+        layers = []
+        for index, meishi in enumerate(meishis):
+
+            # SVG coordinates (mm, y pointing down)
+            # -> pdf coordinates (points, y pointing up)
+            x, y = self.position(index, side)
+            drawing = meishi.get_drawing(side)
+            dx = (x + offset) * mm
+            dy = page_height - (y + offset) * mm - drawing.height
+            clip = (x * mm, page_height - (y + self._card_height) * mm,
+                    self._card_width * mm, self._card_height * mm)
+
+            if isinstance(drawing, LayeredDrawing):
+                card_layers = drawing.layers
+            else:
+                card_layers = [(None, drawing)]
+
+            for name, layer, *_ in card_layers:
+                layers.append((name, layer, (dx, dy, clip)))
+
+        if self._crop_marks:
+            marks = SVGElement.root(width=sheet_width, height=sheet_height, absolute=True)
+            marks.append(self.crop_marks())
+            layers.append((None, svg2drawing(marks, copy=False)))
+
+        return LayeredDrawing(sheet_width * mm, page_height, layers)
+
+    def _check_cards(self, meishis):
+        """Make sure that the meishis fit on a sheet."""
+
+        if len(meishis) > self.cards_per_sheet:
+            msg = "{} cards do not fit on a sheet with {} cards"
+            raise ValueError(msg.format(len(meishis), self.cards_per_sheet))
+
+    def add_crop_marks(self, root):
+        """Add crop marks at the trim lines around the grid of cards."""
+        root.append(self.crop_marks())
+
+    def crop_marks(self):
+        """Crop marks at the trim lines around the grid of cards."""
+
+        bleed  = self._bleed
+        length = self._crop_mark_length
+        offset = self._crop_mark_offset
+
+        x0, y0 = self._x0, self._y0
+        block_width, block_height = self._block_size
+        x1 = x0 + block_width
+        y1 = y0 + block_height
+
+        # All marks are drawn as subpaths of a single path
+        paths = []
+
+        # Vertical marks above and below the grid
+        for col in range(self._cols):
+            left = x0 + col * (self._card_width + self._gutter) + bleed
+            for x in (left, left + self._width):
+                paths.append([x, y0 - offset - length, x, y0 - offset])
+                paths.append([x, y1 + offset, x, y1 + offset + length])
+
+        # Horizontal marks left and right of the grid
+        for row in range(self._rows):
+            top = y0 + row * (self._card_height + self._gutter) + bleed
+            for y in (top, top + self._height):
+                paths.append([x0 - offset - length, y, x0 - offset, y])
+                paths.append([x1 + offset, y, x1 + offset + length, y])
+
+        marks = SVGElement('g', stroke='black', stroke_width=0.1, fill='none')
+        marks.addPaths(paths, precision=3)
+
+        return marks
+
+    def sheets(self, meishis):
+        """Generate the sheets for the given meishis.
+
+        'meishis' can be any iterable (like a generator) - only the
+        meishis of a single sheet are taken from it at a time.
+
+        Yields (front, back) pairs of sheets.
+
+        """
+
+        for cards in self.batches(meishis):
+            yield self.sheet(cards, 'front'), self.sheet(cards, 'back')
+
+    def batches(self, meishis):
+        """Split the meishis into lists of the meishis of a sheet."""
+
+        cards = []
+        for meishi in meishis:
+            cards.append(meishi)
+            if len(cards) == self.cards_per_sheet:
+                yield cards
+                cards = []
+
+        if cards:
+            yield cards
+
+    def save(self, meishis, pdffile):
+        """Impose the meishis and save the sheets as a single pdf.
+
+        Every front sheet is followed by its back sheet.
+        The sheets are rendered one by one (see sheet_drawing()).
+
+        Returns the number of sheets.
+
+        """
+
+        from newskylabs.graphics.pdf.pdf import PDFWriter
+
+        nsheets = 0
+        with PDFWriter(pdffile) as writer:
+            for cards in self.batches(meishis):
+                writer.add_page(self.sheet_drawing(cards, 'front'))
+                writer.add_page(self.sheet_drawing(cards, 'back'))
+                nsheets += 1
+
+        return nsheets
+
+    def save_svg(self, meishis, prefix='sheet', compresslevel=None):
+        """Impose the meishis and save every sheet as SVG file.
+
+        The files are named PREFIX-0001-front.svg, PREFIX-0001-back.svg, ...
+        The sheets are written card by card (see write_sheet()).
+
+        With 'compresslevel' (0 to 9) the sheets are saved gzip
+        compressed as PREFIX-0001-front.svgz, ...
+
+        Returns the list of saved files.
+
+        """
+
+        extension = 'svg' if compresslevel is None else 'svgz'
+
+        filenames = []
+        for n, cards in enumerate(self.batches(meishis)):
+            for side in ('front', 'back'):
+                filename = '{}-{:04d}-{}.{}'.format(prefix, n + 1, side, extension)
+                self.write_sheet(cards, filename, side, compresslevel=compresslevel)
+                filenames.append(filename)
+
+        return filenames
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,227 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""newskylabs/graphics/meishi/instrumentation.py:
+
+Instrumentation: where does the time go when rendering meishis?
+
+An Instrumentation records the wall time, the CPU time and the number
+of SVG elements of every stage of rendering a meishi - like
+generating the front side, encoding the QR-Code, converting the SVG
+code with svglib or writing the pdf:
+
+  instrumentation = Instrumentation()
+  meishi = Meishi(datafile, instrumentation=instrumentation)
+  meishi.save()
+  print(format_report(instrumentation.report()))
+
+Callbacks registered with add_callback() are called with the name of
+the stage and its measurements every time a stage is finished.
+
+Stages can be nested (the QR-Code is encoded while generating the
+back side) - the times of nested stages are included in the times of
+the enclosing stages.
+
+Without instrumentation the meishis use NULL_INSTRUMENTATION, whose
+stages do nothing at all - so that disabled instrumentation costs
+only an empty `with' statement per stage.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/10"
+
+import time
+import threading
+
+## =========================================================
+## class Stage
+## ---------------------------------------------------------
+
+class Stage:
+    """A stage being measured - used as context manager."""
+
+    __slots__ = ('_instrumentation', '_name', '_wall', '_cpu', '_elements')
+
+    def __init__(self, instrumentation, name):
+        self._instrumentation = instrumentation
+        self._name = name
+        self._elements = 0
+
+    def count(self, svg):
+        """Count the elements of an SVG tree generated by the stage."""
+        self._elements += sum(1 for _ in svg._xml.iter())
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu  = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self._wall
+        cpu  = time.process_time() - self._cpu
+        self._instrumentation.record(self._name, wall, cpu, self._elements)
+        return False
+
+class NullStage:
+    """A stage of the disabled instrumentation - doing nothing."""
+
+    __slots__ = ()
+
+    def count(self, svg):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+## =========================================================
+## class Instrumentation
+## ---------------------------------------------------------
+
+class Instrumentation:
+    """Record the wall time, CPU time and element counts per stage."""
+
+    def __init__(self, callback=None):
+
+        self._stages = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+        if callback:
+            self.add_callback(callback)
+
+    def __bool__(self):
+        return True
+
+    def add_callback(self, callback):
+        """Register a function called as 'callback(name, measurements)'
+        whenever a stage is finished."""
+        self._callbacks.append(callback)
+
+    def stage(self, name):
+        """Measure a stage:
+
+        with instrumentation.stage('generate_front') as stage:
+            svg = ...
+            stage.count(svg)
+
+        """
+        return Stage(self, name)
+
+    def record(self, name, wall, cpu, elements=0, calls=1):
+        """Record the measurements of a stage."""
+
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {
+                    'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'elements': 0,
+                }
+            stage['calls']    += calls
+            stage['wall']     += wall
+            stage['cpu']      += cpu
+            stage['elements'] += elements
+
+        measurements = {
+            'calls':    calls,
+            'wall':     wall,
+            'cpu':      cpu,
+            'elements': elements,
+        }
+        for callback in self._callbacks:
+            callback(name, measurements)
+
+    def merge(self, report):
+        """Add the report of another instrumentation
+        - like the one of a worker process."""
+
+        for name, stage in report.items():
+            self.record(name, stage['wall'], stage['cpu'],
+                        stage['elements'], stage['calls'])
+
+    def report(self):
+        """The measurements of all stages:
+
+        {stage: {'calls': ..., 'wall': ..., 'cpu': ..., 'elements': ...}}
+
+        The times are given in seconds.
+
+        """
+
+        with self._lock:
+            return {name: dict(stage) for name, stage in self._stages.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+class NullInstrumentation:
+    """The disabled instrumentation."""
+
+    __slots__ = ()
+
+    _stage = NullStage()
+
+    def __bool__(self):
+        return False
+
+    def add_callback(self, callback):
+        raise ValueError("Callbacks can not be added to the disabled instrumentation")
+
+    def stage(self, name):
+        return self._stage
+
+    def record(self, name, wall, cpu, elements=0, calls=1):
+        pass
+
+    def merge(self, report):
+        pass
+
+    def report(self):
+        return {}
+
+    def reset(self):
+        pass
+
+# Used when no instrumentation is given
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+## =========================================================
+## Reports
+## ---------------------------------------------------------
+
+def format_report(report):
+    """Format a report as table."""
+
+    lines = ['{:<16} {:>7} {:>10} {:>10} {:>10}'.format(
+        'stage', 'calls', 'wall [s]', 'cpu [s]', 'elements')]
+
+    for name, stage in sorted(report.items(), key=lambda item: -item[1]['wall']):
+        lines.append('{:<16} {:>7} {:>10.3f} {:>10.3f} {:>10}'.format(
+            name, stage['calls'], stage['wall'], stage['cpu'], stage['elements']))
+
+    return '\n'.join(lines)
+
+## =========================================================
+## =========================================================
+
+## fin.
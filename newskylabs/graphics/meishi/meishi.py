@@ -30,17 +30,195 @@ __copyright__   = "Copyright 2019 Dietrich Bollmann"
 __license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
 __date__        = "2019/12/29"
 
-import os, io, yaml, pprint
+import os, io, pprint
 
-# svg -> pdf
-from svglib.svglib import svg2rlg
-from reportlab.graphics import renderPDF
+from lxml import etree
 
-# Merge pdfs
-from PyPDF2 import PdfFileMerger
+# The pdf toolchain (svglib, reportlab) is imported on first use
+# - so that rendering SVG only does not pay for loading it
 
+from newskylabs.graphics.meishi.design import load_design_file, load_design_stream, Design
+from newskylabs.graphics.meishi.instrumentation import Instrumentation, NULL_INSTRUMENTATION
 from newskylabs.graphics.svg.svg import SVGElement
-from newskylabs.graphics.utils.general import open_file
+from newskylabs.graphics.xml.xml import is_compressed, DEFAULT_COMPRESSLEVEL
+from newskylabs.graphics.css.css import Stylesheet
+from newskylabs.graphics.utils.general import open_file, precision
+
+## =========================================================
+## Executors
+## ---------------------------------------------------------
+
+# The executors rendering the front and back side of a meishi
+# concurrently - shared by all meishis and kept alive, so that
+# re-rendering a card does not pay for starting them again.
+_executors = {}
+
+def get_executor(kind):
+    """Get the shared 'thread' or 'process' executor."""
+
+    if not kind in _executors:
+
+        from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+        if kind == 'thread':
+            _executors[kind] = ThreadPoolExecutor(max_workers=2)
+
+        elif kind == 'process':
+            _executors[kind] = ProcessPoolExecutor(max_workers=2)
+
+        else:
+            msg = "Unknown executor '{}' (expected 'thread' or 'process')"
+            raise ValueError(msg.format(kind))
+
+    return _executors[kind]
+
+def _render_side(data, side, instrument=False, optimize=False):
+    """Render a side of a meishi in a worker process.
+
+    lxml trees can not be pickled - the SVG code is returned
+    serialized together with the reportlab drawing, the slots of the
+    side as paths of child indices (see get_element_path()) and the
+    report of the instrumentation (when 'instrument' is set).
+
+    """
+
+    instrumentation = Instrumentation() if instrument else None
+    meishi = Meishi(datafile=data, verbose=False, instrumentation=instrumentation,
+                    optimize=optimize)
+    svg = meishi.get_svg(side)
+    drawing = meishi.get_drawing(side)
+
+    if side == 'front':
+        slots = {name: get_element_path(svg, element)
+                 for name, element in meishi._front_slots.items()}
+    else:
+        slots = {name: (get_element_path(svg, element), size)
+                 for name, (element, size) in meishi._back_slots.items()}
+
+    return etree.tostring(svg._xml), drawing, slots, meishi.report()
+
+## =========================================================
+## Element paths
+## ---------------------------------------------------------
+
+def get_element_path(root, element):
+    """The path of child indices leading from 'root' to 'element'."""
+
+    root = root._xml
+    element = element._xml
+
+    path = []
+    while element is not root:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+
+    return tuple(reversed(path))
+
+def find_element(root, path):
+    """Follow a path of child indices starting from 'root'."""
+
+    element = root
+    for index in path:
+        element = element[index]
+    return element
+
+## =========================================================
+## Stylesheets
+## ---------------------------------------------------------
+
+# The compiled stylesheets of the front side - by color
+_front_stylesheets = {}
+
+def get_front_stylesheet(color):
+    """The stylesheet of the front side
+    - compiled once for every 'color'."""
+
+    if color in _front_stylesheets:
+        return _front_stylesheets[color]
+
+    # Font family:
+    #| font_family = '"Gill Sans", sans-serif'
+    #| font_family = '"Helvetica Neue", sans-serif';
+    #| font_family = '"Avenir Next"';
+    font_family = "'Helvetica Neue'";
+    font_weight = 200
+    font_style  = 'normal'
+    gray_font   = '#666'
+
+    # Font sizes:
+    header_font_size = '5.16px'
+    about_font_size  = '3.41px'
+    # For some reason the fonts are sized differently on SVGs and pdfs:
+    # Font size for SVG
+    #| name_font_size   = '6.0px'
+    #| role_font_size   = '3.71px'
+    # Font size for pdf
+    name_font_size   = '5.75px'
+    role_font_size   = '3.56px'
+    body_font_size   = about_font_size
+
+    stylesheet = Stylesheet()
+
+    stylesheet.addRule(
+        '.header',
+        font_family = font_family,
+        font_weight = font_weight,
+        font_style  = font_style,
+        font_size   = header_font_size,
+        fill        = gray_font
+    )
+
+    stylesheet.addRule(
+        '.about',
+        font_family = font_family,
+        font_weight = font_weight,
+        font_style  = font_style,
+        font_size   = about_font_size,
+        fill        = gray_font
+    )
+
+    stylesheet.addRule(
+        '.name',
+        font_family = font_family,
+        font_weight = font_weight,
+        font_style  = font_style,
+        font_size   = name_font_size,
+        fill        = color,
+        text_anchor = 'end'
+    )
+
+    stylesheet.addRule(
+        '.role',
+        font_family = font_family,
+        font_weight = font_weight,
+        font_style  = font_style,
+        font_size   = role_font_size,
+        fill        = gray_font,
+        text_anchor = 'end'
+    )
+
+    stylesheet.addRule(
+        '.body-left',
+        font_family = font_family,
+        font_weight = font_weight,
+        font_style  = font_style,
+        font_size   = body_font_size,
+        fill        = gray_font
+    )
+
+    stylesheet.addRule(
+        '.body-right',
+        font_family = font_family,
+        font_weight = font_weight,
+        font_style  = font_style,
+        font_size   = body_font_size,
+        fill        = gray_font,
+        text_anchor = 'end'
+    )
+
+    _front_stylesheets[color] = stylesheet
+    return stylesheet
 
 ## =========================================================
 ## Meishi
@@ -142,26 +320,59 @@ class Meishi:
         'default-data-file': _default_data_file,
     }
     
-    def __init__(self, datafile=None, debug=0):
+    def __init__(self, datafile=None, debug=0, verbose=True,
+                 cache=None, template=None, executor=None,
+                 instrumentation=None, optimize=False):
 
         # State
         self._debug = debug
+        self._verbose = verbose
+        self._cache = cache
+        self._cache_key = None
+        self._optimize = optimize
+        self._template = template
+        self._executor = executor
         self._svg_front = None
         self._svg_back = None
+        self._drawings = {}
+        self._front_slots = {}
+        self._back_slots = {}
         self._saved_front_as = None
         self._saved_back_as = None
 
+        # Measure the stages of rendering?
+        # (see newskylabs.graphics.meishi.instrumentation)
+        if instrumentation is True:
+            instrumentation = Instrumentation()
+        self._instrumentation = instrumentation or NULL_INSTRUMENTATION
+
         # Initialize the meishi data
-        self.init_data(datafile)
+        with self._instrumentation.stage('load_design'):
+            self.init_data(datafile)
 
     def init_data(self, datafile):
 
         # Has a 'datafile' been given?
         if datafile \
+           and isinstance(datafile, Design):
+            # When 'datafile' is an already validated design,
+            # use a copy of it.
+            # This is used by meishi templates.
+            data = datafile
+
+        elif datafile \
+           and isinstance(datafile, dict):
+            # When 'datafile' is a dictionary,
+            # use it directly as meishi data.
+            # This is used by the batch mode 
+            # to share an already loaded design.
+            data = datafile
+
+        elif datafile \
            and isinstance(datafile, io.TextIOWrapper):
             # When 'datafile' is a stream, 
             # try to read the meishi data from it.
-            data = yaml.load(datafile, Loader=yaml.FullLoader)
+            data = load_design_stream(datafile)
             
         elif datafile \
              and isinstance(datafile, str) \
@@ -169,16 +380,14 @@ class Meishi:
             # When 'datafile' is a string, 
             # interpret it as a filepath,
             # open it and try to read the meishi data.
-            with open(datafile) as fh:
-                data = yaml.load(fh, Loader=yaml.FullLoader)
+            data = load_design_file(datafile)
                 
         elif self._default_data_file \
              and os.path.isfile(self._default_data_file):
             # When no data has been given 
             # but the default data file exists
             # use it to read the meishi data
-            with open(self._default_data_file) as fh:
-                data = yaml.load(fh, Loader=yaml.FullLoader)
+            data = load_design_file(self._default_data_file)
 
         else:
             # When no data has been given 
@@ -186,7 +395,14 @@ class Meishi:
             # use the default data
             data = self._default_data
 
-        self._data = data
+        # Validate the design and build the design model
+        # used for fast attribute access while rendering
+        if isinstance(data, Design):
+            self._design = data.copy()
+        else:
+            self._design = Design(data)
+
+        self._data = self._design.data
 
         # DEBUG
         if self._debug > 0:
@@ -201,6 +417,9 @@ class Meishi:
         self.get_data('some.key.chain')
         <= self._data['some']['key']['chain']
 
+        Kept for compatibility - the renderer itself uses the
+        attributes of the design model (self._design) instead.
+
         """
         keychain = keychain.split('.')
         value = self._data
@@ -208,48 +427,81 @@ class Meishi:
             value = value[key]
         return value
 
+    def set_content(self, content):
+        """Replace the personal information written on the meishi.
+
+        The content is used both by the front side and the back-side
+        plugin (which encodes it as QR-Code).
+
+        """
+        self._design.set_content(content)
+
+        # The old SVG code is invalid now
+        self._svg_front = None
+        self._svg_back = None
+        self._drawings = {}
+        self._cache_key = None
+
+    def release(self, sides=('front', 'back')):
+        """Forget the SVG trees and drawings of the given sides.
+
+        Used by the batch mode to release the memory of a card as soon
+        as its files have been written.  The meishi stays usable - the
+        sides are generated again when needed.
+
+        """
+
+        for side in sides:
+            if side == 'front':
+                self._svg_front = None
+                self._front_slots = {}
+
+            else: # side == 'back'
+                self._svg_back = None
+                self._back_slots = {}
+
+            self._drawings.pop(side, None)
+
+    def report(self):
+        """The measurements of the instrumentation of the meishi
+        (see Instrumentation.report()) - empty without instrumentation."""
+        return self._instrumentation.report()
+
+    def message(self, msg):
+        """Print a progress message unless in quiet mode."""
+        if self._verbose:
+            print(msg)
+
     def generate(self):
         self.generate_front()
         self.generate_back()
 
-    def generate_front(self):
+    def front_texts(self):
+        """The texts written on the front side of the meishi.
 
-        width       = self.get_data('parameter.width')
-        height      = self.get_data('parameter.height')
-        margin      = self.get_data('parameter.margin')
-        color       = self.get_data('parameter.color')
-        background  = self.get_data('parameter.background')
+        Returns a dictionary mapping the names of the text slots of
+        the front side to their text.
 
-        debug       = self.get_data('debug.level')
-        if debug > 0:
-            margin = self.get_data('debug.margin')
+        """
 
-        # DEBUG
-        if debug > 0:
-            print("DEBUG Parameters:")
-            print("  - debug level: {}".format(debug))
-            print("  - width:       {}".format(width))
-            print("  - height:      {}".format(height))
-            print("  - margin:      {}  (depends on debug level)".format(margin))
-            print("  - color:       {}".format(color))
-            print("  - background:  {}".format(background))
-            print("")
+        debug = self._design.debug.level
 
-            
         # Get content
-        name_family      = self.get_data('content.name.family')
-        name_given       = self.get_data('content.name.given')
-        name_suffix      = self.get_data('content.name.suffix')
-        title            = self.get_data('content.title')
-        org_name         = self.get_data('content.org.name')
-        org_unit         = self.get_data('content.org.unit')
-        work_email       = self.get_data('content.contact.work.email')
-        work_url         = self.get_data('content.contact.work.url')
-        work_tel         = self.get_data('content.contact.work.tel')
-        work_adr_street  = self.get_data('content.contact.work.adr.street')
-        work_adr_city    = self.get_data('content.contact.work.adr.city')
-        work_adr_code    = self.get_data('content.contact.work.adr.code')
-        work_adr_country = self.get_data('content.contact.work.adr.country')
+        content = self._design.content
+        work    = content.contact.work
+        name_family      = content.name.family
+        name_given       = content.name.given
+        name_suffix      = content.name.suffix
+        title            = content.title
+        org_name         = content.org.name
+        org_unit         = content.org.unit
+        work_email       = work.email
+        work_url         = work.url
+        work_tel         = work.tel
+        work_adr_street  = work.adr.street
+        work_adr_city    = work.adr.city
+        work_adr_code    = work.adr.code
+        work_adr_country = work.adr.country
         
         # DEBUG
         if debug > 0:
@@ -269,26 +521,79 @@ class Meishi:
             print("  - work_adr_country: {}".format(work_adr_country))
             print("")
 
-        # Font family:
-        #| font_family = '"Gill Sans", sans-serif'
-        #| font_family = '"Helvetica Neue", sans-serif';
-        #| font_family = '"Avenir Next"';
-        font_family = "'Helvetica Neue'";
-        font_weight = 200
-        font_style  = 'normal'
-        gray_font   = '#666'
-
-        # Font sizes:
-        header_font_size = '5.16px'
-        about_font_size  = '3.41px'
-        # For some reason the fonts are sized differently on SVGs and pdfs:
-        # Font size for SVG
-        #| name_font_size   = '6.0px'
-        #| role_font_size   = '3.71px'
-        # Font size for pdf
-        name_font_size   = '5.75px'
-        role_font_size   = '3.56px'
-        body_font_size   = about_font_size
+        # GivenName FamilyName [, PhD / Jr / ...]
+        # When the suffix starts with ', ', the suffix is separated 
+        # from the name with a comma o the front side of the meishi:
+        # Example: Some Name, Phd
+        # A suffix without leading comma like 'Jr.' is rendered 
+        # without comma:
+        # Example: Some Name Jr.
+        # Note that the comma is ignored in the QR-Code o the back side.
+        name = '{} {}'.format(name_given, name_family)
+        if name_suffix:
+            # Does the suffix start with a blank or ', '?
+            if name_suffix[0] == ',':
+                name += name_suffix
+            else:
+                name += ' ' + name_suffix
+
+        # Country Code + City
+        city = '{} {}'.format(work_adr_code, work_adr_city)
+
+        return {
+            'org_name': org_name,
+            'org_unit': org_unit,
+            'name':     name,
+            'title':    title,
+            'street':   work_adr_street,
+            'city':     city,
+            'country':  work_adr_country,
+            'tel':      work_tel,
+            'email':    work_email,
+            'url':      work_url,
+        }
+
+    def generate_front(self):
+        with self._instrumentation.stage('generate_front') as stage, \
+             precision(self._design.parameter.precision):
+            self._generate_front()
+            stage.count(self._svg_front)
+
+    def _generate_front(self):
+
+        # A drawing converted from the old SVG code is invalid now
+        self._drawings.pop('front', None)
+
+        # Fill out the precompiled template when given
+        if self._template:
+            self._svg_front = self._template.generate_front(self)
+            return
+
+        parameter   = self._design.parameter
+        width       = parameter.width
+        height      = parameter.height
+        margin      = parameter.margin
+        color       = parameter.color
+        background  = parameter.background
+
+        debug       = self._design.debug.level
+        if debug > 0:
+            margin = self._design.debug.margin
+
+        # DEBUG
+        if debug > 0:
+            print("DEBUG Parameters:")
+            print("  - debug level: {}".format(debug))
+            print("  - width:       {}".format(width))
+            print("  - height:      {}".format(height))
+            print("  - margin:      {}  (depends on debug level)".format(margin))
+            print("  - color:       {}".format(color))
+            print("  - background:  {}".format(background))
+            print("")
+
+            
+        # The texts written on the meishi
+        texts = self.front_texts()
 
         margin_vertical = 4.5
         y = height - margin_vertical
@@ -314,7 +619,7 @@ class Meishi:
         # When in DEBUG mode:
         # A rectangle to visualize the size of the meishi
         if debug > 0:
-            e.addRect(
+            e.addLeaf('rect',
                 width=85, 
                 height=55,
                 stroke='gray',
@@ -325,64 +630,7 @@ class Meishi:
         # ==================
         # Style CSS section
         # ------------------
-        style = e.addStyle()
-        
-        style.addCSSRule(
-            '.header',
-            font_family = font_family,
-            font_weight = font_weight,
-            font_style  = font_style,
-            font_size   = header_font_size,
-            fill        = gray_font
-        )
-        
-        style.addCSSRule(
-            '.about',
-            font_family = font_family,
-            font_weight = font_weight,
-            font_style  = font_style,
-            font_size   = about_font_size,
-            fill        = gray_font
-        )
-          
-        style.addCSSRule(
-            '.name',
-            font_family = font_family,
-            font_weight = font_weight,
-            font_style  = font_style,
-            font_size   = name_font_size,
-            fill        = color,
-            text_anchor = 'end'
-        )
-        
-        style.addCSSRule(
-            '.role',
-            font_family = font_family,
-            font_weight = font_weight,
-            font_style  = font_style,
-            font_size   = role_font_size,
-            fill        = gray_font,
-            text_anchor = 'end'
-        )
-              
-        style.addCSSRule(
-            '.body-left',
-            font_family = font_family,
-            font_weight = font_weight,
-            font_style  = font_style,
-            font_size   = body_font_size,
-            fill        = gray_font
-        )
-              
-        style.addCSSRule(
-            '.body-right',
-            font_family = font_family,
-            font_weight = font_weight,
-            font_style  = font_style,
-            font_size   = body_font_size,
-            fill        = gray_font,
-            text_anchor = 'end'
-        )
+        e.addStylesheet(get_front_stylesheet(color))
         
         # ==================
         # Add the Icon
@@ -393,11 +641,11 @@ class Meishi:
         gicon = e.addTranslate(x, y)
         
         # Add the icon graphics
-        if 'icon' in self._data:
+        if self._design.icon:
 
             # Take icon class and parameters from the settings
             # and render the icon
-            icon = self.get_data('icon')
+            icon = self._design.icon
             gicon.addPlugin(icon)
             
         else:
@@ -420,63 +668,83 @@ class Meishi:
         # with the personal information of its future owner
         # --------------------------------------------------
 
+        # The text elements are remembered as slots
+        # to allow meishi templates to fill them with other texts
+        slots = {}
+
         # Organization Name
-        e.addText(x=21, y=11, className='header').text(org_name)
+        slots['org_name'] = e.addText(x=21, y=11, className='header')
         
         # Organization Unit
-        e.addText(x=21.15, y=15, className='about').text(org_unit)
+        slots['org_unit'] = e.addText(x=21.15, y=15, className='about')
 
         # GivenName FamilyName [, PhD / Jr / ...]
-        # When the suffix starts with ', ', the suffix is separated 
-        # from the name with a comma o the front side of the meishi:
-        # Example: Some Name, Phd
-        # A suffix without leading comma like 'Jr.' is rendered 
-        # without comma:
-        # Example: Some Name Jr.
-        # Note that the comma is ignored in the QR-Code o the back side.
-        name = '{} {}'.format(name_given, name_family)
-        if name_suffix:
-            # Does the suffix start with a blank or ', '?
-            if name_suffix[0] == ',':
-                name += name_suffix
-            else:
-                name += ' ' + name_suffix
-        e.addText(x=xr, y=26.5, className='name').text(name)
+        slots['name'] = e.addText(x=xr, y=26.5, className='name')
     
         # Job Title
-        e.addText(x=xr, y=31, className='role').text(title)
+        slots['title'] = e.addText(x=xr, y=31, className='role')
     
         # Street 123
-        e.addText(x=xl, y=yb1, className='body-left').text(work_adr_street)
+        slots['street'] = e.addText(x=xl, y=yb1, className='body-left')
         
         # Country Code + City
-        city = '{} {}'.format(work_adr_code, work_adr_city)
-        e.addText(x=xl, y=yb2, className='body-left').text(city)
+        slots['city'] = e.addText(x=xl, y=yb2, className='body-left')
     
         # Country
-        e.addText(x=xl, y=yb3, className='body-left').text(work_adr_country)
+        slots['country'] = e.addText(x=xl, y=yb3, className='body-left')
         
         # Telephone number (ex: +12-345-67-89-10)
-        e.addText(x=xr, y=yb1, className='body-right').text(work_tel)
+        slots['tel'] = e.addText(x=xr, y=yb1, className='body-right')
     
         # Email (ex: email@some.where)
-        e.addText(x=xr, y=yb2, className='body-right').text(work_email)
+        slots['email'] = e.addText(x=xr, y=yb2, className='body-right')
         
         # URL of homepage (ex: https://home.page)
-        e.addText(x=xr, y=yb3, className='body-right').text(work_url)
+        slots['url'] = e.addText(x=xr, y=yb3, className='body-right')
+
+        # Fill out the slots
+        for slot, text in texts.items():
+            slots[slot].text(text)
         
         # Save the SVG code of the front side
         self._svg_front = root
+        self._front_slots = slots
+
+        if self._optimize:
+            self.optimize_svg(root, 'front', slots.values())
     
-    def generate_back(self):
+    def generate_back(self, qrcode=True):
+        """Generate the back side.
+
+        When 'qrcode' is False, only the pattern of the back side is
+        generated - without the QR-Code encoding the personal data.
+
+        """
+
+        with self._instrumentation.stage('generate_back') as stage, \
+             precision(self._design.parameter.precision):
+            self._generate_back(qrcode)
+            stage.count(self._svg_back)
+
+    def _generate_back(self, qrcode=True):
+
+        # A drawing converted from the old SVG code is invalid now
+        self._drawings.pop('back', None)
+
+        # Fill out the precompiled template when given
+        if self._template and qrcode:
+            self._svg_back = self._template.generate_back(self)
+            if self._svg_back:
+                return
         
-        debug  = self.get_data('debug.level')
-        width  = self.get_data('parameter.width')
-        height = self.get_data('parameter.height')
-        margin = self.get_data('parameter.margin')
+        parameter = self._design.parameter
+        debug  = self._design.debug.level
+        width  = parameter.width
+        height = parameter.height
+        margin = parameter.margin
 
         if debug > 0:
-            margin = self.get_data('debug.margin')
+            margin = self._design.debug.margin
 
         x = margin
         y = margin
@@ -499,18 +767,55 @@ class Meishi:
         )
         
         # The design of the back side is specified with a back-side plugin:
-        # Add back side plugin
-        back_side_plugin = self.get_data('back-side')
-        back_side.addPlugin(
-            back_side_plugin, 
+        # Load the back side plugin
+        back_side_plugin = SVGElement.loadPlugin(
+            self._design.back_side, 
             x      = x,
             y      = y,
             width  = width, 
             height = height
         )
 
+        slots = {}
+        if hasattr(back_side_plugin, 'toPatternSVG'):
+
+            # Add the pattern of the back side
+            pattern, slot, size = back_side_plugin.toPatternSVG()
+            back_side.append(pattern)
+
+            # The QR-Code is remembered as slot
+            # to allow meishi templates to fill it with another QR-Code
+            slots['qrcode'] = slot, size
+
+            # Add the QR-Code
+            if qrcode:
+                with self._instrumentation.stage('qrcode'):
+                    back_side_plugin.addQRCode(slot, size)
+
+        else:
+            # A plugin without separate QR-Code
+            back_side.append(back_side_plugin.toSVG())
+
         # Save the SVG code of the back side
         self._svg_back = back_side
+        self._back_slots = slots
+
+        if self._optimize:
+            self.optimize_svg(back_side, 'back',
+                              [element for element, size in slots.values()])
+
+    def optimize_svg(self, svg, side, slots=()):
+        """Optimize the SVG code of a side (see
+        newskylabs.graphics.svg.optimize) - the slots stay valid."""
+
+        from newskylabs.graphics.svg.optimize import optimize
+
+        with self._instrumentation.stage('optimize'):
+            report = optimize(svg, report=self._verbose, keep=slots)
+
+        if report:
+            self.message("Optimized the SVG code of the {} side: {} -> {} bytes"\
+                         .format(side, report['before'], report['after']))
     
     def print(self, side='front'):
         """Print SVG code to stdout."""
@@ -539,10 +844,110 @@ class Meishi:
             
         self._svg_back.print()
     
-    def save(self, front=True, back=True, show=True, pdf=True, merge=True):
+    def prepare(self, sides=('front', 'back')):
+        """Generate the SVG code and drawings of the given sides
+        concurrently.
+
+        The sides are rendered by the executor of the meishi:
+
+        - 'thread':  a shared thread pool;
+        - 'process': a shared process pool - the sides are rendered
+                     from the design data in the worker processes;
+        - or any concurrent.futures.Executor (a ProcessPoolExecutor
+          is used like 'process', any other like 'thread').
+
+        Without executor nothing is done here - the sides are then
+        rendered one after the other when needed.
+
+        Sides which have been rendered already or which are found in
+        the render cache are skipped.
+
+        """
+
+        if not self._executor:
+            return
+
+        # Only render sides which are not available yet
+        sides = [side for side in sides
+                 if not side in self._drawings
+                 and not (self._cache 
+                          and self._cache.has(self.get_cache_key(), side + '.pdf'))]
+        if len(sides) < 2:
+            return
+
+        from concurrent.futures import Executor, ProcessPoolExecutor
+
+        executor = self._executor
+        if not isinstance(executor, Executor):
+            executor = get_executor(executor)
+
+        if isinstance(executor, ProcessPoolExecutor):
+            instrument = bool(self._instrumentation)
+            futures = {side: executor.submit(_render_side, self._data, side, instrument,
+                                             self._optimize)
+                       for side in sides}
+
+            # Wait for both sides
+            for side, future in futures.items():
+                svg, drawing, slots, report = future.result()
+                root = etree.fromstring(svg)
+                self.set_svg(side, SVGElement.wrap(root))
+                self._drawings[side] = drawing
+                self._instrumentation.merge(report)
+
+                # The slots in the parsed tree
+                if side == 'front':
+                    self._front_slots = {
+                        name: SVGElement.wrap(find_element(root, path))
+                        for name, path in slots.items()
+                    }
+                else:
+                    self._back_slots = {
+                        name: (SVGElement.wrap(find_element(root, path)), size)
+                        for name, (path, size) in slots.items()
+                    }
+
+        else:
+            # The sides share nothing but the (read-only) design data
+            # - they can be generated in parallel threads
+            futures = [executor.submit(self.get_drawing, side) for side in sides]
+
+            # Wait for both sides
+            for future in futures:
+                future.result()
+
+    def save(self, front=True, back=True, show=True, pdf=True, merge=True,
+             directory=None, svg=True, release=False):
+        """Save the sides of the meishi as SVG and pdf files
+        and - when 'merge' is given - as a single combined pdf.
 
-        frontfile = self.save_front(front=front, show=show, pdf=pdf)
-        backfile  = self.save_back(back=back, show=show, pdf=pdf)
+        With svg='svgz' the SVG code is saved gzip compressed as .svgz
+        files - like SVG files with a name ending in .svgz or .gz.
+
+        With 'release' the SVG trees and drawings are released (see
+        release()) as soon as all files have been written.
+
+        """
+
+        saved = self._save(front=front, back=back, show=show, pdf=pdf, merge=merge,
+                           directory=directory, svg=svg)
+
+        if release:
+            self.release()
+
+        return saved
+
+    def _save(self, front=True, back=True, show=True, pdf=True, merge=True,
+              directory=None, svg=True):
+
+        # Render front and back side concurrently
+        if front and back and pdf:
+            self.prepare()
+
+        frontfile = self.save_front(front=front, show=show, pdf=pdf, 
+                                    directory=directory, svg=svg)
+        backfile  = self.save_back(back=back, show=show, pdf=pdf,
+                                   directory=directory, svg=svg)
 
         # whould I merge the front and back pdfs into one pdf?
         if front and back and pdf and merge:
@@ -550,23 +955,15 @@ class Meishi:
             # Is 'merge' a string?
             # If so use it as pdf file name
             if isinstance(merge, str):
-                mergedfile = pdf
+                mergedfile = merge
 
             else: # Interpreted as True
-                mergedfile = self.get_data('pdffile.merged')
+                mergedfile = self.get_filename('pdffile.merged', directory)
 
             # Print a message
-            print("Saving front and back side combined as {}".format(mergedfile))
+            self.message("Saving front and back side combined as {}".format(mergedfile))
 
-            pdfs = [frontfile, backfile]
-
-            merger = PdfFileMerger()
-
-            for pdf in pdfs:
-                merger.append(pdf)
-            
-            merger.write(mergedfile)
-            merger.close()
+            self.write_file(mergedfile, self.render_merged())
 
             # Should I show the generated pdf?
             if show:
@@ -576,33 +973,40 @@ class Meishi:
 
         return frontfile, backfile
         
-    def save_front(self, front=None, show=False, pdf=True):
-        
-        # Ensure that the svg has been generated
-        if not self._svg_front:
-            self.generate_front()
+    def save_front(self, front=None, show=False, pdf=True, directory=None,
+                   svg=True):
 
-        # When no svgfile has been given
-        # take it from the data
-        if isinstance(front, str):
-            svgfile = front
+        svgfile = None
 
-        else:
-            svgfile = self.get_data('svgfile.front')
+        # Save as SVG file?
+        if svg:
 
-        # Print a message
-        print("Saving front side of meishi as {}".format(svgfile))
+            # When no svgfile has been given
+            # take it from the data
+            if isinstance(front, str):
+                svgfile = front
+
+            else:
+                svgfile = self.get_filename('svgfile.front', directory)
+
+            # Save gzip compressed?
+            if svg == 'svgz' and not is_compressed(svgfile):
+                svgfile = os.path.splitext(svgfile)[0] + '.svgz'
+            fmt = 'svgz' if is_compressed(svgfile) else 'svg'
 
-        # Save as SVG file
-        self._svg_front.save(svgfile)
+            # Print a message
+            self.message("Saving front side of meishi as {}".format(svgfile))
+
+            # Save as SVG file
+            self.write_file(svgfile, self.render('front', fmt))
 
-        # Should I show the generated SVG?
-        if show:
-            application = 'Google Chrome'
-            open_file(svgfile, application=application)
+            # Should I show the generated SVG?
+            if show:
+                application = 'Google Chrome'
+                open_file(svgfile, application=application)
     
-        # Remember last file saved to
-        self._saved_front_as = svgfile
+            # Remember last file saved to
+            self._saved_front_as = svgfile
 
         # Save as pdf?
         if pdf:
@@ -613,13 +1017,14 @@ class Meishi:
                 pdffile = pdf
 
             else:
-                pdffile = self.get_data('pdffile.front')
+                pdffile = self.get_filename('pdffile.front', directory)
 
             # Print a message
-            print("Saving front side of meishi as {}".format(pdffile))
+            self.message("Saving front side of meishi as {}".format(pdffile))
 
-            # Convert saved svg to pdf
-            self.svg2pdf(svgfile, pdffile)
+            # Convert the SVG tree to pdf 
+            # - without reading the saved SVG file again
+            self.write_file(pdffile, self.render('front', 'pdf'))
 
             # Return svg and pdf file name
             return pdffile
@@ -628,33 +1033,40 @@ class Meishi:
         # Return svg file name
         return svgfile
 
-    def save_back(self, back=None, show=False, pdf=True):
-        
-        # Ensure that the svg has been generated
-        if not self._svg_back:
-            self.generate_back()
+    def save_back(self, back=None, show=False, pdf=True, directory=None,
+                   svg=True):
 
-        # When no svgfile has been given
-        # take it from the data
-        if isinstance(back, str):
-            svgfile = back
+        svgfile = None
 
-        else:
-            svgfile = self.get_data('svgfile.back')
+        # Save as SVG file?
+        if svg:
 
-        # Print a message
-        print("Saving back side of meishi as {}".format(svgfile))
+            # When no svgfile has been given
+            # take it from the data
+            if isinstance(back, str):
+                svgfile = back
+
+            else:
+                svgfile = self.get_filename('svgfile.back', directory)
+
+            # Save gzip compressed?
+            if svg == 'svgz' and not is_compressed(svgfile):
+                svgfile = os.path.splitext(svgfile)[0] + '.svgz'
+            fmt = 'svgz' if is_compressed(svgfile) else 'svg'
 
-        # Save as SVG file
-        self._svg_back.save(svgfile)
+            # Print a message
+            self.message("Saving back side of meishi as {}".format(svgfile))
+
+            # Save as SVG file
+            self.write_file(svgfile, self.render('back', fmt))
 
-        # Should I show the generated SVG?
-        if show:
-            application = 'Google Chrome'
-            open_file(svgfile, application=application)
+            # Should I show the generated SVG?
+            if show:
+                application = 'Google Chrome'
+                open_file(svgfile, application=application)
     
-        # Remember last file saved to
-        self._saved_back_as = svgfile
+            # Remember last file saved to
+            self._saved_back_as = svgfile
 
         # Save as pdf?
         if pdf:
@@ -665,13 +1077,14 @@ class Meishi:
                 pdffile = pdf
 
             else:
-                pdffile = self.get_data('pdffile.back')
+                pdffile = self.get_filename('pdffile.back', directory)
 
             # Print a message
-            print("Saving back side of meishi as {}".format(pdffile))
+            self.message("Saving back side of meishi as {}".format(pdffile))
 
-            # Convert saved svg to pdf
-            self.svg2pdf(svgfile, pdffile)
+            # Convert the SVG tree to pdf 
+            # - without reading the saved SVG file again
+            self.write_file(pdffile, self.render('back', 'pdf'))
 
             # Return svg and pdf file name
             return pdffile
@@ -680,11 +1093,229 @@ class Meishi:
         # Return svg file name
         return svgfile
 
-    def svg2pdf(self, svgfile, pdffile):
-        """Convert SVG to pdf"""
+    def write_file(self, filename, data):
+        """Write bytes to a file."""
+
+        with self._instrumentation.stage('write'):
+            with open(filename, 'wb') as fh:
+                fh.write(data)
+
+    def get_cache_key(self):
+        """The key of the meishi in the render cache:
+        a hash over the resolved design including the content,
+        the rendering mode and the versions of the pdf toolchain."""
+
+        if not self._cache_key:
+            from newskylabs.graphics.pdf.pdf import toolchain_version
+
+            # The optimized SVG code is different - and so are the
+            # pdfs rendered from a template sharing the back pattern
+            mode = {
+                'optimize': bool(self._optimize),
+                'template': bool(self._template),
+                'shared':   bool(self._template)
+                            and self._template._pattern_id is not None,
+            }
+            self._cache_key = self._cache.key([self._data, mode, toolchain_version()])
+        return self._cache_key
+
+    def render(self, side='front', fmt='pdf', dpi=None):
+        """Render a side of the meishi as 'svg', 'svgz' (gzip
+        compressed SVG), 'pdf' or 'png'.
+
+        PNG images are rendered with 'dpi' dots per inch
+        (default: newskylabs.graphics.pdf.pdf.DEFAULT_DPI).
+
+        Returns the rendered file content as bytes.  When a render
+        cache is given, the result is taken from the cache if
+        possible - without generating the SVG code at all.
+
+        """
+
+        if fmt == 'png':
+            # Images of different resolutions are cached separately
+            if dpi is None:
+                from newskylabs.graphics.pdf.pdf import DEFAULT_DPI
+                dpi = DEFAULT_DPI
+            name = '{}-{}dpi.png'.format(side, dpi)
+
+        else:
+            name = '{}.{}'.format(side, fmt)
+
+        # Cached?
+        if self._cache:
+            data = self._cache.get(self.get_cache_key(), name)
+            if data is not None:
+                return data
+
+        if fmt == 'svg':
+            svg = self.get_svg(side)
+            with self._instrumentation.stage('serialize'):
+                data = svg.tobytes()
+
+        elif fmt == 'svgz':
+            # Compressed while serializing
+            # - without the uncompressed SVG code in memory
+            svg = self.get_svg(side)
+            buffer = io.BytesIO()
+            with self._instrumentation.stage('serialize'):
+                svg.write(buffer, compresslevel=DEFAULT_COMPRESSLEVEL)
+            data = buffer.getvalue()
+
+        elif fmt == 'png':
+            from newskylabs.graphics.pdf.pdf import drawing2png
+            drawing = self.get_drawing(side)
+            with self._instrumentation.stage('png'):
+                data = drawing2png(drawing, dpi=dpi)
+
+        else: # fmt == 'pdf'
+            from newskylabs.graphics.pdf.pdf import drawing2pdf
+            drawing = self.get_drawing(side)
+            with self._instrumentation.stage('pdf'):
+                data = drawing2pdf(drawing)
+
+        if self._cache:
+            self._cache.put(self.get_cache_key(), name, data)
+
+        return data
+
+    def render_merged(self):
+        """Render the front and back side as a single pdf.
+
+        Returns the pdf as bytes.
+
+        """
+
+        name = 'merged.pdf'
+
+        # Cached?
+        if self._cache:
+            data = self._cache.get(self.get_cache_key(), name)
+            if data is not None:
+                return data
+
+        from newskylabs.graphics.pdf.pdf import PDFWriter
+
+        # Draw both sides into a single pdf
+        # - without writing and re-reading single pdf files
+        drawings = [self.get_drawing(side) for side in ['front', 'back']]
+        with self._instrumentation.stage('merge'):
+            stream = io.BytesIO()
+            with PDFWriter(stream) as writer:
+                for drawing in drawings:
+                    writer.add_page(drawing)
+            data = stream.getvalue()
+
+        if self._cache:
+            self._cache.put(self.get_cache_key(), name, data)
+
+        return data
+
+    def get_filename(self, keychain, directory=None):
+        """Get a file name from the data 
+        and place it into 'directory' when given."""
+
+        filename = self.get_data(keychain)
+        if directory:
+            filename = os.path.join(directory, filename)
+        return filename
+
+    def svg2pdf(self, svg, pdffile=None):
+        """Convert SVG to pdf.
+
+        'svg' is either an SVGElement or the name of an SVG file.
+        When no 'pdffile' is given the pdf is returned as bytes.
+
+        """
+
+        from newskylabs.graphics.pdf.pdf import svg2pdf
+        return svg2pdf(svg, pdffile)
+
+    def set_svg(self, side, svg):
+        """Set the SVG code of a side of the meishi
+        - like rendered by a meishi template."""
+
+        if side == 'front':
+            self._svg_front = svg
+
+        else: # side == 'back'
+            self._svg_back = svg
+
+        self._drawings.pop(side, None)
+
+    def get_svg(self, side='front'):
+        """Get the SVG code of a side of the meishi.
+
+        The side is generated when this has not been done yet.
+
+        """
+
+        if side == 'front':
+            if not self._svg_front:
+                self.generate_front()
+            return self._svg_front
+
+        else: # side == 'back'
+            if not self._svg_back:
+                self.generate_back()
+            return self._svg_back
+
+    def get_drawing(self, side='front'):
+        """Get a side of the meishi as reportlab drawing.
+
+        The drawing is converted from the SVG code only once
+        and shared by all pdfs rendered from it.
+
+        """
+
+        if not side in self._drawings:
+            from newskylabs.graphics.pdf.pdf import svg2drawing
+            svg = self.get_svg(side)
+            with self._instrumentation.stage('svglib'):
+                drawing = None
+
+                # The pattern of a back side generated by a template
+                # is converted only once by the template
+                if self._template and side == 'back':
+                    drawing = self._template.generate_back_drawing(svg)
+
+                if drawing is None:
+                    drawing = svg2drawing(svg)
+
+                self._drawings[side] = drawing
+
+        return self._drawings[side]
+
+    def to_pdf(self, side='front'):
+        """Render a side of the meishi and return it as pdf bytes
+        - without writing any files."""
+
+        return self.render(side, 'pdf')
+
+    def to_png(self, side='front', dpi=None):
+        """Render a side of the meishi and return it as PNG bytes
+        - without writing any files."""
+
+        return self.render(side, 'png', dpi=dpi)
+
+    def save_png(self, side='front', pngfile=None, dpi=None, directory=None):
+        """Save a side of the meishi as PNG image.
+
+        When no 'pngfile' is given, the name of the SVG file of the
+        side is used with the extension '.png'.
+
+        """
+
+        if not pngfile:
+            svgfile = self.get_filename('svgfile.{}'.format(side), directory)
+            pngfile = os.path.splitext(svgfile)[0] + '.png'
+
+        # Print a message
+        self.message("Saving {} side of meishi as {}".format(side, pngfile))
+
+        self.write_file(pngfile, self.render(side, 'png', dpi=dpi))
 
-        drawing = svg2rlg(svgfile)
-        renderPDF.drawToFile(drawing, pdffile)
+        return pngfile
 
     def show(self, side='front'):
 
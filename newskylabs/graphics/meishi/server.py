@@ -0,0 +1,432 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""newskylabs/graphics/meishi/server.py:
+
+A long-running local render service for meishis (name cards).
+
+Rather than starting `nsl-meishi' for every preview, the service
+keeps the designs compiled and all modules imported in a pool of
+worker processes which are started (forked) when the service starts.
+Requests are answered by the workers without any start-up cost.
+
+HTTP interface:
+
+  GET  /designs             the names of the designs served
+  GET  /stats               queue depth, latency etc. as JSON
+  GET  /health              'ok'
+  POST /render/DESIGN?format=svg|svgz|pdf|png&side=front|back|both&dpi=DPI
+
+The body of a render request is a JSON content block (or a mapping
+with the content block as value of 'content').  Like in the rosters
+of the batch mode, only the information differing from the content
+of the design has to be given.
+
+- format=svg returns the SVG code of the given side
+  (default: front);
+- format=svgz returns the same SVG code gzip compressed - sent with
+  `Content-Encoding: gzip' (browsers show it as SVG) when the client
+  accepts gzip encoded answers (`Accept-Encoding: gzip') and as
+  application/gzip file otherwise;
+- format=pdf returns the pdf of the given side or both sides
+  (default: both);
+- format=png returns a PNG preview of the given side (default: front)
+  with the given resolution (default: 96 dpi).  PNG previews need the
+  optional renderPM backend rlPyCairo - without it they are answered
+  with status 501.
+
+The PNG previews are kept in a ThumbnailCache - repeated previews of
+the same card are answered without bothering the workers.
+
+Invalid requests are answered with status 400 and a JSON object with
+the error message as value of 'error'.
+
+The statistics tell how busy the service is:
+
+  - queue_depth: the number of requests submitted to the workers
+                 and not finished yet;
+  - requests, errors: counters;
+  - latency: mean, median (p50), p90, p99 and max of the time to
+             answer the last requests (in seconds);
+  - thumbnails: hits, misses and size of the thumbnail cache.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/11"
+
+import os, json, time, threading, collections
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from newskylabs.graphics.meishi.batch import load_design, merge_content
+from newskylabs.graphics.meishi.design import validate_content
+from newskylabs.graphics.meishi.template import MeishiTemplate
+from newskylabs.graphics.meishi.cache import RenderCache, ThumbnailCache
+from newskylabs.graphics.pdf.pdf import PNGBackendError
+
+## =========================================================
+## Workers
+## ---------------------------------------------------------
+
+# The formats and their content types
+CONTENT_TYPES = {
+    'svg':  'image/svg+xml',
+    'svgz': 'image/svg+xml',
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+}
+
+def accepts_gzip(accept_encoding):
+    """Does the value of an Accept-Encoding header accept gzip?"""
+
+    # The quality of gzip and of any encoding ('*')
+    qualities = {}
+    for coding in (accept_encoding or '').split(','):
+        name, _, params = coding.partition(';')
+        name = name.strip().lower()
+        name = 'gzip' if name == 'x-gzip' else name
+
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        qualities[name] = quality
+
+    # A quality of 0 means `not acceptable'
+    quality = qualities.get('gzip', qualities.get('*', 0.0))
+    return quality > 0
+
+# The compiled designs of the current worker process
+_templates = {}
+_cache = None
+
+def _init_worker(designs, cache_dir=None, cache_size=None):
+    """Compile the designs once per worker process
+    and import the pdf toolchain right away."""
+
+    global _cache
+
+    for name, datafile in designs.items():
+        _templates[name] = MeishiTemplate(load_design(datafile))
+
+    _cache = RenderCache(cache_dir, max_size=cache_size) if cache_dir else None
+
+    import newskylabs.graphics.pdf.pdf
+
+def _warm_up():
+    """Used to start the worker processes when the service starts."""
+    return os.getpid()
+
+def _render(name, content, fmt, side, dpi=None):
+    """Render a meishi in a worker process.
+
+    'content' has been merged and validated already.
+    Returns the rendered file as bytes.
+
+    """
+
+    meishi = _templates[name].meishi(content, cache=_cache)
+
+    if side == 'both':
+        return meishi.render_merged()
+
+    return meishi.render(side, fmt, dpi=dpi)
+
+## =========================================================
+## class MeishiService
+## ---------------------------------------------------------
+
+class MeishiService:
+    """Render meishis with a pool of warm worker processes."""
+
+    def __init__(self, designs, jobs=None, cache_dir=None, cache_size=None,
+                 thumbnail_size=None, latency_window=1000):
+        """
+        - designs:        a dictionary mapping the names of the designs
+                          to their design files;
+        - jobs:           the number of worker processes;
+        - cache_dir:      the directory of a render cache (see
+                          newskylabs.graphics.meishi.cache);
+        - thumbnail_size: the maximal size of the in-memory cache
+                          of PNG previews in bytes;
+        - latency_window: the number of requests the latency
+                          statistics are calculated for.
+
+        """
+
+        # Fail early on invalid designs
+        self._designs = {name: load_design(datafile)
+                         for name, datafile in designs.items()}
+
+        self._jobs = jobs or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers = self._jobs,
+            initializer = _init_worker,
+            initargs    = (dict(designs), cache_dir, cache_size),
+        )
+
+        # The PNG previews
+        # (the workers keep them on disk in their render cache)
+        self._thumbnails = ThumbnailCache(max_size=thumbnail_size)
+
+        # Statistics
+        self._lock = threading.Lock()
+        self._queue_depth = 0
+        self._requests = 0
+        self._errors = 0
+        self._latencies = collections.deque(maxlen=latency_window)
+        self._started = time.time()
+
+        # Start all workers right away
+        # - so that the first requests do not pay for it
+        for future in [self._executor.submit(_warm_up) for _ in range(self._jobs)]:
+            future.result()
+
+    def designs(self):
+        return sorted(self._designs)
+
+    def render(self, name, content, fmt='svg', side=None, dpi=None):
+        """Render the meishi of a content block.
+
+        Raises a ValueError for invalid requests.
+
+        """
+
+        if not name in self._designs:
+            raise ValueError("Unknown design '{}' (expected one of {})"\
+                             .format(name, ', '.join(self.designs())))
+
+        if not fmt in CONTENT_TYPES:
+            raise ValueError("Unknown format '{}' (expected one of {})"\
+                             .format(fmt, ', '.join(CONTENT_TYPES)))
+
+        if side is None:
+            side = 'both' if fmt == 'pdf' else 'front'
+
+        if not side in ('front', 'back', 'both') \
+           or (side == 'both' and fmt != 'pdf'):
+            raise ValueError("Invalid side '{}' for format '{}'".format(side, fmt))
+
+        if dpi is not None and not 10 <= dpi <= 1200:
+            raise ValueError("Invalid resolution {} dpi (expected 10 to 1200)".format(dpi))
+
+        if not isinstance(content, dict):
+            raise ValueError("Expected a JSON object as content")
+
+        if 'content' in content:
+            content = content['content']
+            if not isinstance(content, dict):
+                raise ValueError("Expected a JSON object as value of 'content'")
+
+        # Validate in the service - before submitting the work
+        content = merge_content(self._designs[name]['content'], content)
+        validate_content(content)
+
+        # Previewed before?
+        if fmt == 'png':
+            key = self._thumbnails.key(name, content, side, dpi)
+            image = self._thumbnails.get(key)
+            if image is not None:
+                return image
+
+        with self._lock:
+            self._queue_depth += 1
+        try:
+            future = self._executor.submit(_render, name, content, fmt, side, dpi)
+            data = future.result()
+        finally:
+            with self._lock:
+                self._queue_depth -= 1
+
+        if fmt == 'png':
+            self._thumbnails.put(key, data)
+
+        return data
+
+    def record(self, latency, error=False):
+        """Record a finished request."""
+
+        with self._lock:
+            self._requests += 1
+            if error:
+                self._errors += 1
+            else:
+                self._latencies.append(latency)
+
+    def stats(self):
+        """Statistics for sizing the service."""
+
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'workers':     self._jobs,
+                'queue_depth': self._queue_depth,
+                'requests':    self._requests,
+                'errors':      self._errors,
+                'uptime':      time.time() - self._started,
+            }
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        if latencies:
+            stats['latency'] = {
+                'count': len(latencies),
+                'mean':  sum(latencies) / len(latencies),
+                'p50':   percentile(0.5),
+                'p90':   percentile(0.9),
+                'p99':   percentile(0.99),
+                'max':   latencies[-1],
+            }
+
+        stats['thumbnails'] = self._thumbnails.stats()
+
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+## =========================================================
+## HTTP
+## ---------------------------------------------------------
+
+class MeishiRequestHandler(BaseHTTPRequestHandler):
+    """Answer the HTTP requests of a MeishiServer."""
+
+    # Maximal size of a request body
+    max_content_length = 1024 * 1024
+
+    def send(self, status, body, content_type='application/json', headers=None):
+
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, indent=2).encode('utf-8')
+
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        path = urlparse(self.path).path
+
+        if path == '/designs':
+            self.send(200, service.designs())
+
+        elif path == '/stats':
+            self.send(200, service.stats())
+
+        elif path == '/health':
+            self.send(200, 'ok\n', 'text/plain')
+
+        else:
+            self.send(404, {'error': 'Not found: {}'.format(path)})
+
+    def do_POST(self):
+        service = self.server.service
+        start = time.perf_counter()
+
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'render':
+            self.send(404, {'error': 'Not found: {}'.format(url.path)})
+            return
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        fmt  = query.get('format', 'svg')
+        side = query.get('side')
+        dpi  = query.get('dpi')
+
+        try:
+            if dpi is not None:
+                dpi = int(dpi)
+
+            length = int(self.headers.get('Content-Length', 0))
+            if length > self.max_content_length:
+                self.send(413, {'error': 'Request too large'})
+                service.record(0, error=True)
+                return
+
+            content = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(content, dict):
+                raise ValueError("Expected a JSON object as request body")
+            data = service.render(parts[1], content, fmt, side, dpi)
+
+        except ValueError as error:
+            # Invalid JSON, designs, contents, formats...
+            self.send(400, {'error': str(error)})
+            service.record(0, error=True)
+            return
+
+        except PNGBackendError as error:
+            # PNG previews without renderPM backend
+            self.send(501, {'error': str(error)})
+            service.record(0, error=True)
+            return
+
+        except Exception as error:
+            self.send(500, {'error': '{}: {}'.format(type(error).__name__, error)})
+            service.record(0, error=True)
+            return
+
+        content_type = CONTENT_TYPES[fmt]
+        headers = None
+
+        # Compressed SVG code is sent gzip encoded when possible
+        if fmt == 'svgz':
+            headers = {'Vary': 'Accept-Encoding'}
+            if accepts_gzip(self.headers.get('Accept-Encoding')):
+                headers['Content-Encoding'] = 'gzip'
+            else:
+                content_type = 'application/gzip'
+
+        self.send(200, data, content_type, headers)
+        service.record(time.perf_counter() - start)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class MeishiServer(ThreadingHTTPServer):
+    """An HTTP server answering requests with a MeishiService."""
+
+    daemon_threads = True
+
+    def __init__(self, address, service, verbose=True):
+        super().__init__(address, MeishiRequestHandler)
+        self.service = service
+        self.verbose = verbose
+
+## =========================================================
+## =========================================================
+
+## fin.
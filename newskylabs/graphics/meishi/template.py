@@ -0,0 +1,269 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""newskylabs/graphics/meishi/template.py:
+
+Precompiled meishi (name card) templates.
+
+A design is compiled once into a template: the SVG trees of the front
+side (with CSS, icon and the text elements) and of the back side
+(with its pattern but without QR-Code) are generated a single time.
+The places where the personal data goes are remembered as `slots'.
+
+A meishi for a person is then made by copying the prebuilt lxml trees
+(a fast deep copy done by lxml) and filling the slots: the texts of
+the front side and the QR-Code of the back side.
+
+The pattern of the back side is the same for every meishi of a
+design.  It is defined once as `<defs>' symbol and shown with `<use>'
+- the QR-Code is drawn on top of it.  When the meishis are converted
+to pdf only the QR-Code is converted for every meishi; the drawing of
+the pattern is made once and shared - and a PDFWriter writes it only
+once per pdf as form XObject (see
+newskylabs.graphics.pdf.pdf.LayeredDrawing).
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/07"
+
+import hashlib
+from copy import deepcopy
+
+from lxml import etree
+
+from newskylabs.graphics.meishi.meishi import Meishi, get_element_path, find_element
+from newskylabs.graphics.svg.svg import SVGElement
+from newskylabs.graphics.svg.optimize import optimize
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def copy_element(element):
+    """A copy of an element without its children."""
+    return etree.Element(element.tag, element.attrib, nsmap=element.nsmap)
+
+XLINK_NAMESPACE = 'http://www.w3.org/1999/xlink'
+
+def share_pattern(root, slot):
+    """Move the pattern of a back side into a `<defs>' symbol.
+
+    'root' is the SVG root of the back side and 'slot' the element the
+    QR-Code is added to.  Returns a new root of the form:
+
+      <svg ...>
+        <defs>
+          <g id="pattern-HASH">...the pattern...</g>
+        </defs>
+        <use xlink:href="#pattern-HASH"/>
+        <g ...><g ...>SLOT</g></g>
+      </svg>
+
+    where the slot is reached by copies of its ancestors (with their
+    transformations) - together with the id of the pattern and the
+    new slot.
+
+    The id is made from the SVG code of the pattern - the same
+    pattern always gets the same id.
+
+    """
+
+    nsmap = dict(root.nsmap, xlink=XLINK_NAMESPACE)
+    shared = etree.Element(root.tag, root.attrib, nsmap=nsmap)
+    svg = etree.QName(root.tag).namespace
+
+    # The pattern
+    pattern = etree.Element(etree.QName(svg, 'g'))
+    for child in root:
+        pattern.append(deepcopy(child))
+
+    digest = hashlib.md5(etree.tostring(pattern)).hexdigest()
+    pattern_id = 'pattern-{}'.format(digest[:16])
+    pattern.set('id', pattern_id)
+
+    defs = etree.SubElement(shared, etree.QName(svg, 'defs'))
+    defs.append(pattern)
+
+    # Showing the pattern
+    use = etree.SubElement(shared, etree.QName(svg, 'use'))
+    use.set(etree.QName(XLINK_NAMESPACE, 'href'), '#' + pattern_id)
+
+    # The way to the slot
+    parent = shared
+    for element in reversed(list(slot.iterancestors())[:-1]):
+        parent = etree.SubElement(parent, element.tag, element.attrib)
+    slot = etree.SubElement(parent, slot.tag, slot.attrib)
+
+    return shared, pattern_id, slot
+
+## =========================================================
+## class MeishiTemplate
+## ---------------------------------------------------------
+
+class MeishiTemplate:
+    """A design compiled once for rendering many meishis."""
+
+    def __init__(self, datafile=None, debug=0, share=True, optimize=False):
+        """
+        - datafile: the design;
+        - share:    share the pattern of the back side
+                    (see share_pattern());
+        - optimize: optimize the SVG code (see
+                    newskylabs.graphics.svg.optimize) - the prebuilt
+                    trees are optimized once, only the QR-Code is
+                    optimized for every meishi.
+
+        """
+
+        self._debug = debug
+        self._optimize = optimize
+
+        # Generate the meishi of the design once
+        # - its content is replaced for every person
+        meishi = Meishi(datafile=datafile, debug=debug, verbose=False, optimize=optimize)
+        meishi.generate_front()
+        meishi.generate_back(qrcode=False)
+        self._data = meishi._data
+        self._design = meishi._design
+
+        # The prebuilt trees
+        front = meishi.get_svg('front')
+        back  = meishi.get_svg('back')
+        self._front = front._xml
+        self._back  = back._xml
+
+        # The slots are remembered by their position in the trees
+        # as the elements themselves are different in every copy
+        self._front_slots = {
+            name: get_element_path(front, element)
+            for name, element in meishi._front_slots.items()
+        }
+        self._back_slots = {
+            name: (get_element_path(back, element), size)
+            for name, (element, size) in meishi._back_slots.items()
+        }
+
+        # Without QR-Code slot the back side is rendered for every meishi
+        self._static_back = 'qrcode' in self._back_slots
+
+        # The pattern of the back side
+        # and its drawing - converted when needed
+        self._pattern_id = None
+        self._pattern_drawing = None
+
+        if self._static_back and share:
+            slot, size = meishi._back_slots['qrcode']
+            self._back, self._pattern_id, slot = share_pattern(self._back, slot._xml)
+            self._back_slots['qrcode'] = get_element_path(
+                SVGElement.wrap(self._back), SVGElement.wrap(slot)), size
+
+    def meishi(self, content, cache=None, instrumentation=None):
+        """Make the meishi of a person.
+
+        'content' is a complete content block.  The SVG code of the
+        meishi is generated from the template when needed.
+
+        """
+
+        meishi = Meishi(
+            datafile        = self._design,
+            debug           = self._debug,
+            verbose         = False,
+            cache           = cache,
+            template        = self,
+            instrumentation = instrumentation,
+            optimize        = self._optimize,
+        )
+        meishi.set_content(content)
+
+        return meishi
+
+    def generate_front(self, meishi):
+        """Generate the front side of 'meishi'
+        by filling its texts into a copy of the prebuilt tree."""
+
+        front = deepcopy(self._front)
+        for name, text in meishi.front_texts().items():
+            find_element(front, self._front_slots[name]).text = text
+
+        return SVGElement.wrap(front)
+
+    def generate_back(self, meishi):
+        """Generate the back side of 'meishi'
+        by adding its QR-Code to a copy of the prebuilt pattern.
+
+        Returns None when the back side has no QR-Code slot.
+
+        """
+
+        if not self._static_back:
+            return None
+
+        back = deepcopy(self._back)
+        path, (width, height) = self._back_slots['qrcode']
+        slot = SVGElement.wrap(find_element(back, path))
+        with meishi._instrumentation.stage('qrcode'):
+            slot.addQRCode(meishi.get_data('content'), width=width, height=height)
+
+        # The slot is optimized with the QR-Code - so that the group
+        # wrapping the QR-Code is collapsed like when optimizing the
+        # whole back side
+        if self._optimize:
+            with meishi._instrumentation.stage('optimize'):
+                optimize(slot)
+
+        return SVGElement.wrap(back)
+
+    def generate_back_drawing(self, svg):
+        """Convert the back side of a meishi to a reportlab drawing.
+
+        Only the QR-Code is converted - the drawing of the pattern is
+        converted once and shared by all meishis.
+
+        Returns None when 'svg' does not show the shared pattern.
+
+        """
+
+        root = svg._xml
+        if self._pattern_id is None \
+           or len(root) != 3 \
+           or root[0][0].get('id') != self._pattern_id:
+            return None
+
+        from newskylabs.graphics.pdf.pdf import svg2drawing, LayeredDrawing
+
+        if self._pattern_drawing is None:
+            pattern = copy_element(root)
+            pattern.extend(deepcopy(root[0][0][:]))
+            self._pattern_drawing = svg2drawing(pattern, copy=False)
+
+        qrcode = copy_element(root)
+        qrcode.append(deepcopy(root[2]))
+        qrcode = svg2drawing(qrcode, copy=False)
+
+        return LayeredDrawing(qrcode.width, qrcode.height, [
+            (self._pattern_id, self._pattern_drawing),
+            (None,             qrcode),
+        ])
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,416 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""newskylabs/graphics/pdf/pdf.py:
+
+Converting SVG to pdf.
+
+The SVG code is handed over to svglib directly as lxml tree - without
+writing it to a file and parsing it again.
+
+Multi-page pdfs are written with a PDFWriter drawing every page
+straight into a single reportlab canvas.  The content of every page
+is compressed as soon as the page is finished - so that long pdfs
+only keep the compressed pages in memory until they are saved.
+
+Layers shared by many pages (like the pattern of the back side of
+meishis made from the same design) are given as LayeredDrawing: a
+PDFWriter draws a shared layer only once as form XObject and refers
+to it from every page.
+
+Raster images (PNG) are rendered from the same reportlab drawings with
+reportlab's renderPM - which needs the rlPyCairo backend (`pip
+install rlPyCairo').
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/05"
+
+import os
+from copy import deepcopy
+from lxml import etree
+
+# svg -> pdf
+import svglib
+from svglib.svglib import svg2rlg, SvgRenderer
+import reportlab
+from reportlab.graphics import renderPDF
+from reportlab.graphics.shapes import Drawing, Group
+from reportlab.lib.attrmap import AttrMap, AttrMapValue
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.pdfbase.pdfdoc import PDFStream, PDFArray, PDFName, PDFBase85Encode, PDFZCompress
+from reportlab import rl_config
+
+from newskylabs.graphics.xml.xml import XMLElement
+
+## =========================================================
+## svg -> pdf
+## ---------------------------------------------------------
+
+def toolchain_version():
+    """The versions of svglib and reportlab.
+
+    Other versions might render the same SVG code differently.
+
+    """
+
+    return 'svglib-{} reportlab-{}'.format(svglib.__version__, reportlab.Version)
+
+def svg2drawing(svg, copy=True):
+    """Convert SVG to a reportlab drawing.
+
+    'svg' is either an XMLElement (like an SVGElement), an
+    lxml.etree element or the name of an SVG file.
+
+    Without 'copy' an lxml tree is rendered directly - for trees made
+    only to be converted.
+
+    """
+
+    if isinstance(svg, XMLElement):
+        svg = svg._xml
+
+    if isinstance(svg, etree._Element):
+        # Render the lxml tree directly.
+        # svglib annotates the tree it renders (it applies the CSS
+        # rules as attributes) - render a copy to leave the SVG code
+        # untouched.  Copying is cheap compared to the rendering.
+        drawing = SvgRenderer('').render(deepcopy(svg) if copy else svg)
+
+    else:
+        # Read and parse the SVG file
+        drawing = svg2rlg(svg)
+
+    return drawing
+
+def drawing2pdf(drawing, pdffile=None):
+    """Render a reportlab drawing as pdf.
+
+    When a 'pdffile' is given the pdf is saved to it,
+    otherwise the pdf is returned as bytes.
+
+    """
+
+    if pdffile:
+        renderPDF.drawToFile(drawing, pdffile)
+        return pdffile
+
+    return renderPDF.drawToString(drawing)
+
+def svg2pdf(svg, pdffile=None):
+    """Convert SVG to pdf.
+
+    See svg2drawing() and drawing2pdf().
+
+    """
+
+    drawing = svg2drawing(svg)
+    return drawing2pdf(drawing, pdffile)
+
+## =========================================================
+## svg -> png
+## ---------------------------------------------------------
+
+# The default resolution of raster images
+DEFAULT_DPI = 96
+
+class PNGBackendError(RuntimeError):
+    """Raised when PNG images are rendered without renderPM backend
+    (the optional dependency rlPyCairo)."""
+
+def drawing2png(drawing, pngfile=None, dpi=DEFAULT_DPI):
+    """Render a reportlab drawing as PNG image with 'dpi' dots per inch.
+
+    When a 'pngfile' is given the image is saved to it,
+    otherwise the image is returned as bytes.
+
+    Raises a PNGBackendError when no renderPM backend is installed.
+
+    """
+
+    # renderPM needs a rendering backend
+    # - imported only when raster images are used
+    from reportlab.graphics import renderPM
+    from reportlab.graphics.utils import RenderPMError
+
+    try:
+        data = renderPM.drawToString(drawing, fmt='PNG', dpi=dpi)
+
+    except RenderPMError as error:
+        msg = "Rendering PNG images needs a renderPM backend " \
+            + "(pip install rlPyCairo): {}"
+        raise PNGBackendError(msg.format(error))
+
+    if pngfile:
+        with open(pngfile, 'wb') as fh:
+            fh.write(data)
+        return pngfile
+
+    return data
+
+def svg2png(svg, pngfile=None, dpi=DEFAULT_DPI):
+    """Convert SVG to a PNG image.
+
+    'svg' is either an SVGElement, an lxml.etree element or the name
+    of an SVG file.  When no 'pngfile' is given the image is returned
+    as bytes.
+
+    """
+
+    return drawing2png(svg2drawing(svg), pngfile, dpi=dpi)
+
+## =========================================================
+## class LayeredDrawing
+## ---------------------------------------------------------
+
+class LayeredDrawing(Drawing):
+    """A drawing composed of layers - some of them shared by many
+    drawings.
+
+    'layers' is a list of (name, drawing) pairs - the drawings of the
+    layers have the size of the layered drawing.  Layers with a name
+    are shared: a PDFWriter draws them once as form XObject named
+    'name' and refers to the form on every page.  Layers without name
+    are drawn on the page itself.
+
+    A layer can also be placed somewhere on the page - like the cards
+    on an imposed sheet - by giving it as (name, drawing, placement)
+    triple with the placement (dx, dy, clip): the layer is moved by
+    (dx, dy) and clipped to the rectangle clip = (x, y, width, height)
+    given in page coordinates (None: not clipped).
+
+    Everywhere else a LayeredDrawing is an ordinary drawing showing
+    all layers - without clipping the placed layers.
+
+    """
+
+    _attrMap = AttrMap(BASE=Drawing,
+        layers = AttrMapValue(None, desc="The (name, drawing[, placement]) tuples of the layers."),
+    )
+
+    def __init__(self, width, height, layers):
+        Drawing.__init__(self, width, height)
+        self.layers = layers
+        for _, layer, *placement in layers:
+            if placement:
+                dx, dy, _ = placement[0]
+                self.add(Group(*layer.contents, transform=(1, 0, 0, 1, dx, dy)))
+            else:
+                for node in layer.contents:
+                    self.add(node)
+
+## =========================================================
+## class PDFWriter
+## ---------------------------------------------------------
+
+class PDFWriter:
+    """Write a multi-page pdf in a single pass.
+
+    Every page is drawn straight into a single reportlab canvas:
+    no intermediate pdf files are written and read again, and the
+    SVG tree and drawing of a page can be released as soon as the
+    page has been added.
+
+    Example:
+
+      with PDFWriter('cards.pdf') as writer:
+          for meishi in meishis:
+              writer.add_page(meishi.get_svg('front'))
+              writer.add_page(meishi.get_svg('back'))
+
+    The pdf is only saved when the `with' block is left normally: when
+    it raises an exception the pages are discarded and no pdf is
+    written.
+
+    """
+
+    def __init__(self, pdffile, title=None):
+        """
+        - pdffile: the file name or a binary stream to write the pdf to;
+        - title:   the title of the pdf document.
+
+        """
+
+        self._pdffile = pdffile
+        self._canvas = Canvas(pdffile)
+        if title:
+            self._canvas.setTitle(title)
+        self._pages = 0
+        self._closed = False
+
+        # The names of the shared layers drawn as form XObject so far
+        self._forms = set()
+
+    @property
+    def pages(self):
+        """The number of pages written so far."""
+        return self._pages
+
+    def add_page(self, page):
+        """Add a page.
+
+        'page' is either a reportlab drawing or SVG (see svg2drawing()).
+        The size of the page is the size of the drawing.
+
+        """
+
+        if not isinstance(page, Drawing):
+            page = svg2drawing(page)
+
+        canvas = self._canvas
+        canvas.setPageSize((page.width, page.height))
+
+        if isinstance(page, LayeredDrawing):
+            for name, layer, *placement in page.layers:
+
+                # Shared layers are drawn as form XObject first
+                if name:
+                    self._draw_form(name, layer)
+
+                if placement:
+                    dx, dy, clip = placement[0]
+                    canvas.saveState()
+                    if clip:
+                        path = canvas.beginPath()
+                        path.rect(*clip)
+                        canvas.clipPath(path, stroke=0, fill=0)
+                    canvas.translate(dx, dy)
+
+                if name:
+                    canvas.doForm(name)
+                else:
+                    renderPDF.draw(layer, canvas, 0, 0)
+
+                if placement:
+                    canvas.restoreState()
+
+        else:
+            renderPDF.draw(page, canvas, 0, 0)
+
+        canvas.showPage()
+        self._compress_page()
+
+        self._pages += 1
+
+    def _draw_form(self, name, drawing):
+        """Draw a shared layer as form XObject - once."""
+
+        if name in self._forms:
+            return
+
+        canvas = self._canvas
+        canvas.beginForm(name, 0, 0, drawing.width, drawing.height)
+        renderPDF.draw(drawing, canvas, 0, 0)
+        canvas.endForm()
+
+        self._forms.add(name)
+
+    def _compress_page(self):
+        """Compress the content of the page just finished.
+
+        reportlab keeps the content of all pages uncompressed until
+        the document is saved - 70kB for the back side of a meishi
+        with its QR-Code.  Here the content is encoded right away with
+        the filters reportlab would use when saving (the pdf stays the
+        same) and the uncompressed content is released.
+
+        This relies on the internals of reportlab (checked with
+        reportlab 5.0, see tests/newskylabs/graphics/pdf/test_pdf.py):
+        when they are not found as expected, the page is left alone
+        and compressed by reportlab when saving.
+
+        """
+
+        doc = getattr(self._canvas, '_doc', None)
+        pages = getattr(getattr(doc, 'Pages', None), 'pages', None)
+        if not isinstance(pages, list) or not pages:
+            return
+
+        page = pages[-1]
+        if not all(hasattr(page, name) for name in ('compression', 'stream', 'Contents')) \
+           or not isinstance(page.stream, (str, bytes)):
+            return
+
+        if not page.compression or not page.stream or page.Contents:
+            return
+
+        if rl_config.useA85:
+            filters = [PDFBase85Encode, PDFZCompress]
+        else:
+            filters = [PDFZCompress]
+
+        # The filters are applied in reverse order
+        content = page.stream
+        for f in reversed(filters):
+            content = f.encode(content)
+
+        contents = PDFStream(content=content)
+        contents.dictionary['Filter'] = PDFArray([PDFName(f.pdfname) for f in filters])
+        contents.__Comment__ = "page stream"
+
+        page.Contents = contents
+        page.stream = None
+
+    def close(self):
+        """Finish the pdf document.
+
+        When saving fails the partially written pdf file is removed.
+
+        """
+
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            self._canvas.save()
+        except BaseException:
+            self._remove_file()
+            raise
+
+    def discard(self):
+        """Forget the pages without writing the pdf."""
+
+        if self._closed:
+            return
+        self._closed = True
+
+        # Release the pages
+        self._canvas = None
+
+    def _remove_file(self):
+        """Remove the pdf file - when written to a file name."""
+
+        if isinstance(self._pdffile, str) and os.path.exists(self._pdffile):
+            os.remove(self._pdffile)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -14,7 +14,9 @@ import click
 import os
 
 from newskylabs.graphics.meishi import Meishi
+from newskylabs.graphics.meishi.design import enable_disk_cache
 from newskylabs.graphics.utils.general import get_package_dir
+from newskylabs.graphics.meishi.instrumentation import format_report
 
 ## =========================================================
 ## Utilities
@@ -30,14 +32,62 @@ def get_default_design():
     return defaults_file
 
 ## =========================================================
-## Command: nsl-meishi
+## Command group: nsl-meishi
 ## ---------------------------------------------------------
 
-@click.command(context_settings={'help_option_names': ['-h', '--help']})
-@click.argument('datafile', type=click.File('r'), required=False, default=get_default_design())
-def meishi(datafile):
+class MeishiGroup(click.Group):
+    """A command group falling back to the `render' command.
+
+    This way `nsl-meishi [DATAFILE]' continues to render a single
+    meishi while further commands like `nsl-meishi batch' can be
+    added as subcommands.
+
+    """
+
+    default_command = 'render'
+
+    def parse_args(self, ctx, args):
+        if not args \
+           or (args[0] not in self.commands
+               and args[0] not in ctx.help_option_names):
+            args = [self.default_command] + list(args)
+        return super().parse_args(ctx, args)
+
+@click.group(cls=MeishiGroup,
+             context_settings={'help_option_names': ['-h', '--help']})
+def meishi():
     """A program to generate meishis (name cards).
 
+    Without command the meishi described by the optional DATAFILE is
+    rendered (see `nsl-meishi render --help').
+
+    """
+
+    # Parse a design only once over many runs
+    # (see newskylabs.graphics.meishi.design)
+    enable_disk_cache()
+
+## =========================================================
+## Command: nsl-meishi render
+## ---------------------------------------------------------
+
+@meishi.command()
+@click.argument('datafile', type=click.File('r'), required=False, default=get_default_design())
+@click.option('-p', '--parallel', type=click.Choice(['none', 'thread', 'process']),
+              default='none', show_default=True,
+              help='Render the front and back side concurrently '
+              'in threads or processes.')
+@click.option('--png', is_flag=True, default=False,
+              help='Also save PNG previews of both sides.')
+@click.option('--dpi', type=click.IntRange(min=10, max=1200), default=96, show_default=True,
+              help='Resolution of the PNG previews.')
+@click.option('--timings', is_flag=True, default=False,
+              help='Print the time spent in every stage of rendering.')
+@click.option('--optimize', is_flag=True, default=False,
+              help='Optimize the generated SVG code (smaller files, same rendering).')
+def render(datafile, parallel, png, dpi, timings, optimize):
+    """Generate a single meishi (name card).
+
     Rather than using the default design, a yaml DATAFILE can be
     specified on the command line defining the information to be
     written on the meishi and the design parameters which should be
@@ -45,8 +95,14 @@ def meishi(datafile):
 
     """
 
-    meishi = Meishi(datafile=datafile)
-    meishi.generate()
+    executor = None if parallel == 'none' else parallel
+    meishi = Meishi(datafile=datafile, executor=executor, instrumentation=timings,
+                    optimize=optimize)
+
+    # Without executor generate the sides right away;
+    # otherwise they are generated concurrently when saving
+    if not executor:
+        meishi.generate()
 
     # DEBUG
     #| meishi.print()
@@ -54,6 +110,217 @@ def meishi(datafile):
     show = True
     meishi.save(show=show)
 
+    if png:
+        from newskylabs.graphics.pdf.pdf import PNGBackendError
+        try:
+            for side in ['front', 'back']:
+                meishi.save_png(side, dpi=dpi)
+
+        except PNGBackendError as error:
+            raise click.ClickException(str(error))
+
+    if timings:
+        click.echo(format_report(meishi.report()))
+
+## =========================================================
+## Command: nsl-meishi batch
+## ---------------------------------------------------------
+
+@meishi.command()
+@click.argument('design', type=click.Path(exists=True, dir_okay=False))
+@click.argument('roster', type=click.Path(exists=True, dir_okay=False))
+@click.option('-o', '--output', default=None, 
+              type=click.Path(file_okay=False),
+              help='Directory to save the cards in (one sub-directory per card; '
+              'default: meishis unless --merge is given).')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=None,
+              help='Number of worker processes (default: number of CPUs).')
+@click.option('-m', '--merge', type=click.Path(dir_okay=False), default=None,
+              help='Combine all cards into a single pdf file.')
+@click.option('--svg/--no-svg', default=False, show_default=True,
+              help='Also save the SVG code of every card.')
+@click.option('--svgz', is_flag=True, default=False,
+              help='Save the SVG code gzip compressed as .svgz files (implies --svg).')
+@click.option('--cache', 'cache_dir', type=click.Path(file_okay=False), default=None,
+              help='Directory of a render cache reusing the files of unchanged cards.')
+@click.option('--cache-size', type=click.IntRange(min=1), default=256, show_default=True,
+              help='Maximal size of the render cache in MB.')
+@click.option('--stream', is_flag=True, default=False,
+              help='Stream the roster with bounded memory (for very long rosters).')
+@click.option('--timings', is_flag=True, default=False,
+              help='Print the time spent in every stage of rendering.')
+@click.option('--optimize', is_flag=True, default=False,
+              help='Optimize the generated SVG code (smaller files, same rendering).')
+def batch(design, roster, output, jobs, merge, svg, svgz, cache_dir, cache_size, stream,
+          timings, optimize):
+    """Generate the meishis of everybody in a ROSTER.
+
+    All meishis are rendered with the same DESIGN (a yaml file like
+    the ones given to `nsl-meishi render').  The ROSTER is a CSV,
+    YAML or NDJSON file with one `content' block per person;
+    information missing in the roster is taken from the content of
+    the DESIGN.  The column names of a CSV roster are keychains like
+    `name.family' or `contact.work.adr.street'.
+
+    With --stream CSV and NDJSON rosters of any length are rendered
+    with bounded memory.
+
+    """
+
+    from newskylabs.graphics.meishi.batch import MeishiBatch
+
+    # Without merged pdf the cards are saved in a directory
+    if not output and not merge:
+        output = 'meishis'
+
+    try:
+        batch = MeishiBatch(
+            design, 
+            jobs       = jobs,
+            cache_dir  = cache_dir,
+            cache_size = cache_size * 1024 * 1024,
+            instrumentation = timings,
+            optimize   = optimize,
+        )
+        batch.render(roster, output, merge=merge, svg='svgz' if svgz else svg, stream=stream)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+
+    if timings:
+        click.echo(format_report(batch.report()))
+
+## =========================================================
+## Command: nsl-meishi impose
+## ---------------------------------------------------------
+
+@meishi.command()
+@click.argument('design', type=click.Path(exists=True, dir_okay=False))
+@click.argument('roster', type=click.Path(exists=True, dir_okay=False))
+@click.option('-o', '--output', default='meishi-sheets.pdf', show_default=True,
+              type=click.Path(dir_okay=False),
+              help='The pdf file to save the sheets in.')
+@click.option('-s', '--sheet', default='A4', show_default=True,
+              help='Sheet size: A4, A3, SRA3, letter, ... or WIDTHxHEIGHT in mm.')
+@click.option('--orientation', default='auto', show_default=True,
+              type=click.Choice(['auto', 'portrait', 'landscape']),
+              help='Sheet orientation (auto: the one fitting more cards).')
+@click.option('-b', '--bleed', type=float, default=None,
+              help='Bleed around every card in mm (default: the margin of the design).')
+@click.option('--sheet-margin', type=float, default=10, show_default=True,
+              help='Non-printable margin of the sheet in mm.')
+@click.option('--gutter', type=float, default=0, show_default=True,
+              help='Space between the cards in mm.')
+@click.option('--crop-marks/--no-crop-marks', default=True, show_default=True,
+              help='Draw crop marks around the cards.')
+@click.option('--flip', default='long-edge', show_default=True,
+              type=click.Choice(['long-edge', 'short-edge']),
+              help='How the sheets are flipped when printing duplex.')
+def impose(design, roster, output, sheet, orientation, bleed, sheet_margin,
+           gutter, crop_marks, flip):
+    """Impose the meishis of everybody in a ROSTER on print-ready sheets.
+
+    The front and back sides of the cards are placed on alternating
+    pages of a single pdf file; the back sides are mirrored to be
+    aligned with the front sides when printed duplex.  See `nsl-meishi
+    batch --help' for the DESIGN and ROSTER files.
+
+    """
+
+    from newskylabs.graphics.meishi.batch import load_design, load_roster, iter_meishis
+    from newskylabs.graphics.meishi.imposition import Imposition
+
+    try:
+        data = load_design(design)
+        imposition = Imposition.from_design(
+            data,
+            bleed        = bleed,
+            sheet        = sheet,
+            orientation  = orientation,
+            sheet_margin = sheet_margin,
+            gutter       = gutter,
+            crop_marks   = crop_marks,
+            flip         = flip,
+        )
+        meishis = iter_meishis(data, load_roster(roster))
+        nsheets = imposition.save(meishis, output)
+
+    except ValueError as error:
+        raise click.ClickException(str(error))
+
+    print("Saved {} sheets with {} cards each as {}"\
+          .format(nsheets, imposition.cards_per_sheet, output))
+
+## =========================================================
+## Command: nsl-meishi serve
+## ---------------------------------------------------------
+
+@meishi.command()
+@click.argument('designs', nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option('--host', default='127.0.0.1', show_default=True,
+              help='The address to listen on.')
+@click.option('-p', '--port', type=click.IntRange(min=0, max=65535), 
+              default=8080, show_default=True,
+              help='The port to listen on.')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=None,
+              help='Number of worker processes (default: number of CPUs).')
+@click.option('--cache', 'cache_dir', type=click.Path(file_okay=False), default=None,
+              help='Directory of a render cache reusing the files of unchanged cards.')
+@click.option('--cache-size', type=click.IntRange(min=1), default=256, show_default=True,
+              help='Maximal size of the render cache in MB.')
+@click.option('--thumbnail-size', type=click.IntRange(min=1), default=32, show_default=True,
+              help='Maximal size of the in-memory cache of PNG previews in MB.')
+@click.option('-q', '--quiet', is_flag=True, default=False,
+              help='Do not log the requests.')
+def serve(designs, host, port, jobs, cache_dir, cache_size, thumbnail_size, quiet):
+    """Serve meishi previews over HTTP.
+
+    The DESIGNS (default: the designs coming with nsl-meishi) are
+    compiled once by a pool of worker processes which stay alive
+    between requests.  A design is addressed by its file name
+    without extension:
+
+    \b
+      curl -d '{"name": {"family": "Body"}}' \\
+        'http://localhost:8080/render/example-design?format=pdf'
+
+    GET /designs lists the designs, GET /stats reports the queue
+    depth and the latency of the service.
+
+    """
+
+    from newskylabs.graphics.meishi.server import MeishiService, MeishiServer
+
+    if not designs:
+        designs = [get_default_design(),
+                   os.path.join(get_package_dir(), 'meishi', 'designs', 'example-design.yaml')]
+
+    designs = {os.path.splitext(os.path.basename(design))[0]: design
+               for design in designs}
+
+    try:
+        service = MeishiService(
+            designs,
+            jobs       = jobs,
+            cache_dir  = cache_dir,
+            cache_size = cache_size * 1024 * 1024,
+            thumbnail_size = thumbnail_size * 1024 * 1024,
+        )
+    except ValueError as error:
+        raise click.ClickException(str(error))
+
+    server = MeishiServer((host, port), service, verbose=not quiet)
+
+    click.echo("Serving {} on http://{}:{}/ with {} workers"\
+               .format(', '.join(service.designs()), host, server.server_port,
+                       service.stats()['workers']))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
 ## =========================================================
 ## Main
 ## ---------------------------------------------------------
@@ -76,7 +76,7 @@ class CircleIcon():
             print("")
             
         # A circle at the center
-        self._icon.addCircle(cx=fx, cy=fy, r=radius, fill=color)
+        self._icon.addLeaf('circle', cx=fx, cy=fy, r=radius, fill=color)
 
     def toSVG(self):
         return self._icon
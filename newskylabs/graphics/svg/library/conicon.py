@@ -173,9 +173,8 @@ class CONIcon():
                 path.append(vertex)
 
             # Add the path
-            parent.addPath(
-                path           = path, 
-                close_path     = close_path,
+            parent.addLeaf('path',
+                d              = parent.formatPath(path, close_path=close_path), 
                 stroke         = color,
                 stroke_width   = stroke_width, 
                 stroke_linecap = 'miter',
@@ -193,11 +192,9 @@ class CONIcon():
             return
 
         l = len(circlepat)
-        for vi in range(len(vertices)):
-            if vi < l and circlepat[vi] == 'o':
-                x, y = vertices[vi]
-                parent.addCircle(cx=x, cy=y, r=circle_radius, fill=color)
-            vi += 1
+        centers = [vertices[vi] for vi in range(len(vertices))
+                   if vi < l and circlepat[vi] == 'o']
+        parent.addCircles(centers, r=circle_radius, fill=color)
 
 ## =========================================================
 ## =========================================================
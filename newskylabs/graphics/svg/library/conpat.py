@@ -30,13 +30,13 @@ __license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.
 __date__        = "2019/12/23"
 
 from newskylabs.graphics.svg.svg import SVGElement
-from newskylabs.graphics.svg.library.plugin import SVGPlugin
+from newskylabs.graphics.svg.library.plugin import BackSidePlugin
 
 ## =========================================================
 ## class ConPat
 ## ---------------------------------------------------------
 
-class ConPat(SVGPlugin):
+class ConPat(BackSidePlugin):
 
     def __init__(self, 
                  *args, 
@@ -46,9 +46,11 @@ class ConPat(SVGPlugin):
         # DEBUG
         # When a debug level has been given in kwargs
         # overwrite the debug level.
-        if 'debug' in kwargs \
-           and 'level' in kwargs['debug']:
-            debug = kwargs['debug']['level']
+        # The debug level is given either directly 
+        # or as 'level' of a debug section.
+        debug = kwargs.get('debug', 0)
+        if isinstance(debug, dict):
+            debug = debug.get('level', 0)
         self._debug = debug
 
         self._geometry = x, y, width, height
@@ -66,7 +68,7 @@ class ConPat(SVGPlugin):
 
         super().__init__(*args, **kwargs)
         
-    def toSVG(self):
+    def toPatternSVG(self):
 
         # Retrive parameters
         args   = self._args
@@ -148,7 +150,7 @@ class ConPat(SVGPlugin):
         # When a background color is given add a background rectangle;
         # 'None' results in a transparent background.
         if background != None:
-            plugin.addRect(
+            plugin.addLeaf('rect',
                 width  = width_with_margin,
                 height = height_with_margin,
                 fill   = background
@@ -161,7 +163,7 @@ class ConPat(SVGPlugin):
         # meishi with a frame.  The margin outside the frame is
         # intended to be cut off after printing the meishis.
         if self._debug > 0:
-            e.addRect(
+            e.addLeaf('rect',
                 width        = width, 
                 height       = height,
                 stroke       = 'gray',
@@ -189,11 +191,7 @@ class ConPat(SVGPlugin):
             y += iy
         
         # Draw vertices
-        for row in range(ny):
-            n = nx if row % 2 else nx - 1
-            for col in range(n):
-                x, y = vertices[row][col]
-                e.addCircle(cx=x, cy=y, r=r, fill=color)
+        e.addCircles([vertex for row in vertices for vertex in row], r=r, fill=color)
         
         # Connect vertices
         for row in range(1, ny):
@@ -219,8 +217,8 @@ class ConPat(SVGPlugin):
                         v2 = row  , collow
         
                         path = [vertices[v1[0]][v1[1]], vertices[v2[0]][v2[1]]]
-                        e.addPath(
-                            path           = path, 
+                        e.addLeaf('path',
+                            d              = e.formatPath(path), 
                             stroke         = color, 
                             stroke_width   = strokewidth,
                             stroke_linecap = 'miter'
@@ -244,7 +242,7 @@ class ConPat(SVGPlugin):
         e = e.addTranslate(x=rx, y=ry)
         
         # Add a white background for the QR-Code
-        rect = e.addRect(
+        e.addLeaf('rect',
             width  = size_x, 
             height = size_y,
             fill   = 'white'
@@ -255,7 +253,7 @@ class ConPat(SVGPlugin):
         if background == None \
            or background == 'none' \
            or background == 'white':
-            rect = e.addRect(
+            e.addLeaf('rect',
                 width        = size_x,
                 height       = size_y,
                 stroke       = color,
@@ -263,17 +261,8 @@ class ConPat(SVGPlugin):
                 fill         = 'none'
             )
         
-        # Append the QR-Code
-        # Retrive the personal data
-        # necessary to generate the QR-Code
-        vcard_data = kwargs['content']
-        e.addQRCode(
-            vcard_data,
-            width  = size_x,
-            height = size_y,
-        )
-
-        return plugin
+        # The QR-Code is added to 'e'
+        return plugin, e, (size_x, size_y)
 
 ## =========================================================
 ## =========================================================
@@ -31,13 +31,13 @@ __license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.
 __date__        = "2019/12/28"
 
 from newskylabs.graphics.svg.svg import SVGElement
-from newskylabs.graphics.svg.library.plugin import SVGPlugin
+from newskylabs.graphics.svg.library.plugin import BackSidePlugin
 
 ## =========================================================
 ## class Dots
 ## ---------------------------------------------------------
 
-class Dots(SVGPlugin):
+class Dots(BackSidePlugin):
 
     def __init__(self, 
                  *args, 
@@ -47,9 +47,11 @@ class Dots(SVGPlugin):
         # DEBUG
         # When a debug level has been given in kwargs
         # overwrite the debug level.
-        if 'debug' in kwargs \
-           and 'level' in kwargs['debug']:
-            debug = kwargs['debug']['level']
+        # The debug level is given either directly 
+        # or as 'level' of a debug section.
+        debug = kwargs.get('debug', 0)
+        if isinstance(debug, dict):
+            debug = debug.get('level', 0)
         self._debug = debug
 
         self._geometry = x, y, width, height
@@ -67,7 +69,7 @@ class Dots(SVGPlugin):
 
         super().__init__(*args, **kwargs)
         
-    def toSVG(self):
+    def toPatternSVG(self):
 
         # Retrive parameters
         args   = self._args
@@ -141,7 +143,7 @@ class Dots(SVGPlugin):
         # When a background color is given add a background rectangle;
         # 'None' results in a transparent background.
         if background != None:
-            plugin.addRect(
+            plugin.addLeaf('rect',
                 width  = width_with_margin,
                 height = height_with_margin,
                 fill   = background
@@ -154,7 +156,7 @@ class Dots(SVGPlugin):
         # meishi with a gray frame.  The margin outside the frame is
         # intended to be cut off after the meishis have been printed.
         if self._debug > 0:
-            e.addRect(
+            e.addLeaf('rect',
                 width        = width, 
                 height       = height,
                 stroke       = 'gray',
@@ -182,11 +184,7 @@ class Dots(SVGPlugin):
             y += iy
         
         # Draw vertices
-        for row in range(ny):
-            n = nx - 1 if row % 2 else nx
-            for col in range(n):
-                x, y = vertices[row][col]
-                e.addCircle(cx=x, cy=y, r=r, fill=color)
+        e.addCircles([vertex for row in vertices for vertex in row], r=r, fill=color)
         
         # Some more padding to show a little bit more of the vertices
         # touching the border of the QR-Code.  
@@ -206,7 +204,7 @@ class Dots(SVGPlugin):
         e = e.addTranslate(x=rx, y=ry)
         
         # Add a white background for the QR-Code
-        rect = e.addRect(
+        e.addLeaf('rect',
             width  = size_x, 
             height = size_y,
             fill   = 'white'
@@ -217,7 +215,7 @@ class Dots(SVGPlugin):
         if background == None \
            or background == 'none' \
            or background == 'white':
-            rect = e.addRect(
+            e.addLeaf('rect',
                 width        = size_x,
                 height       = size_y,
                 stroke       = color,
@@ -225,17 +223,8 @@ class Dots(SVGPlugin):
                 fill         = 'none'
             )
         
-        # Append the QR-Code
-        # Retrive the personal data
-        # necessary to generate the QR-Code
-        vcard_data = kwargs['content']
-        e.addQRCode(
-            vcard_data,
-            width  = size_x,
-            height = size_y,
-        )
-
-        return plugin
+        # The QR-Code is added to 'e'
+        return plugin, e, (size_x, size_y)
 
 ## =========================================================
 ## =========================================================
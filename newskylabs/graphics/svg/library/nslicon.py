@@ -103,11 +103,10 @@ class NSLIcon():
                      (ll, ur),
                     ]:
                 
-            self._icon.addPath(
-                path            = path,
+            self._icon.addLeaf('path',
+                d               = self._icon.formatPath(path),
                 stroke          = color, 
                 stroke_width    = stroke_width,
-                close_path      = False,
                 stroke_linejoin = 'miter',
                 stroke_linecap  = 'round',
                 fill            = None,
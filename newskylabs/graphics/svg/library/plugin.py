@@ -28,6 +28,8 @@ __copyright__   = "Copyright 2019 Dietrich Bollmann"
 __license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
 __date__        = "2019/12/15"
 
+from abc import ABCMeta, abstractmethod
+
 from newskylabs.graphics.svg.svg import SVGElement
 
 ## =========================================================
@@ -68,6 +70,53 @@ class SVGPlugin:
 
         return plugin
 
+## =========================================================
+## class BackSidePlugin
+## ---------------------------------------------------------
+
+class BackSidePlugin(SVGPlugin, metaclass=ABCMeta):
+    """Parent class for back-side plugins.
+
+    A back side consists of a pattern which is the same for every
+    meishi with the same design and a QR-Code encoding the personal
+    data written on the meishi.
+
+    Subclasses have to implement toPatternSVG() returning the pattern
+    and the place where the QR-Code has to be added.
+
+    """
+
+    @abstractmethod
+    def toPatternSVG(self):
+        """Assemble the pattern of the back side.
+
+        Returns a tuple (pattern, slot, (width, height)) with the root
+        element of the pattern, the element the QR-Code has to be
+        appended to and the size of the QR-Code.
+
+        """
+
+    def addQRCode(self, slot, size):
+        """Append the QR-Code encoding the personal data to 'slot'."""
+
+        width, height = size
+        vcard_data = self._kwargs['content']
+        return slot.addQRCode(
+            vcard_data,
+            width  = width,
+            height = height,
+        )
+
+    def toSVG(self):
+
+        # Assemble the pattern
+        plugin, slot, size = self.toPatternSVG()
+
+        # Append the QR-Code
+        self.addQRCode(slot, size)
+
+        return plugin
+
 ## =========================================================
 ## =========================================================
 
@@ -85,7 +85,7 @@ class SevenCirclesIcon():
             print("")
             
         # A circle at the center
-        self._icon.addCircle(cx=fx, cy=fy, r=r, fill=color)
+        self._icon.addLeaf('circle', cx=fx, cy=fy, r=r, fill=color)
 
         # 6 satellite circles
         segments = 6
@@ -93,7 +93,7 @@ class SevenCirclesIcon():
             angle = i * 2 * pi / segments
             x = fx + cos(angle) * radius
             y = fy + sin(angle) * radius
-            self._icon.addCircle(cx=x, cy=y, r=r, fill=color)
+            self._icon.addLeaf('circle', cx=x, cy=y, r=r, fill=color)
         
     def toSVG(self):
         return self._icon
@@ -30,13 +30,13 @@ __license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.
 __date__        = "2019/12/24"
 
 from newskylabs.graphics.svg.svg import SVGElement
-from newskylabs.graphics.svg.library.plugin import SVGPlugin
+from newskylabs.graphics.svg.library.plugin import BackSidePlugin
 
 ## =========================================================
 ## class Simple
 ## ---------------------------------------------------------
 
-class SimpleBackside(SVGPlugin):
+class SimpleBackside(BackSidePlugin):
 
     def __init__(self, 
                  *args, 
@@ -46,8 +46,11 @@ class SimpleBackside(SVGPlugin):
         # DEBUG
         # When a debug level has been given in kwargs
         # overwrite the debug level.
-        if 'debug' in kwargs:
-            debug = kwargs['debug']
+        # The debug level is given either directly 
+        # or as 'level' of a debug section.
+        debug = kwargs.get('debug', 0)
+        if isinstance(debug, dict):
+            debug = debug.get('level', 0)
         self._debug = debug
 
         self._geometry = x, y, width, height
@@ -65,7 +68,7 @@ class SimpleBackside(SVGPlugin):
 
         super().__init__(*args, **kwargs)
         
-    def toSVG(self):
+    def toPatternSVG(self):
 
         # Retrive parameters
         args   = self._args
@@ -103,7 +106,7 @@ class SimpleBackside(SVGPlugin):
         # When a background has been given add a background rectangle;
         # 'None' results in a transparent background.
         if background != None:
-            plugin.addRect(
+            plugin.addLeaf('rect',
                 width  = width_with_margin,
                 height = height_with_margin,
                 fill   = background
@@ -116,7 +119,7 @@ class SimpleBackside(SVGPlugin):
         # meishi with a frame.  The margin outside the frame is
         # intended to be cut off after printing the meishis.
         if self._debug > 0:
-            e.addRect(
+            e.addLeaf('rect',
                 width        = width, 
                 height       = height,
                 stroke       = 'gray',
@@ -130,7 +133,7 @@ class SimpleBackside(SVGPlugin):
         e = e.addTranslate(x=qr_x, y=qr_y)
 
         # Add a white background for the QR-Code
-        rect = e.addRect(
+        e.addLeaf('rect',
             width  = qrcode_size, 
             height = qrcode_size,
             fill   = 'white'
@@ -141,7 +144,7 @@ class SimpleBackside(SVGPlugin):
         if background == None \
            or background == 'none' \
            or background == 'white':
-            rect = e.addRect(
+            e.addLeaf('rect',
                 width        = qrcode_size,
                 height       = qrcode_size,
                 stroke       = color,
@@ -149,17 +152,8 @@ class SimpleBackside(SVGPlugin):
                 fill         = 'none'
             )
         
-        # Append the QR-Code
-        # Retrive the personal data
-        # necessary to generate the QR-Code
-        vcard_data = kwargs['content']
-        e.addQRCode(
-            vcard_data,
-            width  = qrcode_size,
-            height = qrcode_size,
-        )
-
-        return plugin
+        # The QR-Code is added to 'e'
+        return plugin, e, (qrcode_size, qrcode_size)
 
 ## =========================================================
 ## =========================================================
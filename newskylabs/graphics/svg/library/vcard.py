@@ -64,13 +64,13 @@ class VCard:
         name = data['name']
         given  = name['given']
         family = name['family']
-        suffix = name['suffix']
+        suffix = name.get('suffix') or ''
 
         # Render suffix with or without comma?
         # Examples:
         # - with comma:    'Given Name, PhD'
         # - without comma: 'Given Name Jr.'
-        with_comma = suffix[0] == ','
+        with_comma = suffix.startswith(',')
         suffix = re.sub('^, *', '', suffix)
         
         # Add name
@@ -86,7 +86,9 @@ class VCard:
         if 'fn' in name:
             vcard.fn.value = name['fn']
         else:
-            if with_comma:
+            if not suffix:
+                vcard.fn.value = '{} {}'.format(given, family)
+            elif with_comma:
                 vcard.fn.value = '{} {}, {}'.format(given, family, suffix)
             else:
                 vcard.fn.value = '{} {} {}'.format(given, family, suffix)
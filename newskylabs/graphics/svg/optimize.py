@@ -0,0 +1,614 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+
+"""newskylabs/graphics/svg/optimize.py:
+
+An optimizer for generated SVG documents.
+
+The SVG code assembled with SVGElement is simple but verbose: every
+addTranslate() adds a group of its own, paths are written with
+absolute `M/L' commands and every one of the hundreds of circles of
+a pattern repeats the same style.  optimize() rewrites a tree in
+place - without changing what is drawn:
+
+  - redundant attributes are dropped: presentation attributes with
+    the value inherited from the parent (like `fill="none"' inside a
+    group with `fill="none"') and attributes with their default value
+    (like `x="0"' of a rect);
+  - groups without attributes are replaced by their children and
+    groups with only a transform and a single child move their
+    transform to the child; adjacent translations are combined;
+  - the style shared by a run of siblings is hoisted into their group
+    (or into a new group around them);
+  - path data is rewritten with relative or absolute commands -
+    whatever is shorter - using H/V for horizontal and vertical
+    lines and leaving out repeated commands and separators.
+
+The optimizer is careful with things it does not know about:
+
+  - inherited values are not tracked below elements with a `class'
+    or `style' attribute and in documents with CSS rules that do not
+    only use class selectors;
+  - elements with an `id' (which might be referenced) are not moved
+    into new groups and do not get the transform of their parent;
+  - the content of `defs', `clipPath', `mask', `pattern', `marker'
+    and `symbol' elements inherits from where it is used - only its
+    paths and transforms are optimized there;
+  - paths with curves or arcs are left unchanged.
+
+A single walk over the tree does all of it - cheap enough to be run
+on every card of a batch:
+
+  report = optimize(svg, report=True)
+  print("Saved {} bytes".format(report['saved']))
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/15"
+
+import re
+
+from lxml import etree
+
+from newskylabs.graphics.utils.general import formatNumber
+
+## =========================================================
+## Settings
+## ---------------------------------------------------------
+
+_SVG = '{http://www.w3.org/2000/svg}'
+
+# Presentation attributes inherited by the children
+# - with their initial values
+INHERITED = {
+    'fill':              'black',
+    'fill-opacity':      '1',
+    'fill-rule':         'nonzero',
+    'stroke':            'none',
+    'stroke-width':      '1',
+    'stroke-opacity':    '1',
+    'stroke-linecap':    'butt',
+    'stroke-linejoin':   'miter',
+    'stroke-miterlimit': '4',
+    'stroke-dasharray':  'none',
+    'stroke-dashoffset': '0',
+    'clip-rule':         'nonzero',
+    'font-family':       None,
+    'font-size':         None,
+    'font-style':        'normal',
+    'font-weight':       'normal',
+    'text-anchor':       'start',
+    'visibility':        'visible',
+}
+
+# Attributes which are not inherited - with their default values
+DEFAULTS = {
+    'opacity': '1',
+}
+
+DEFAULTS_BY_TAG = {
+    _SVG + 'rect':    {'x': '0', 'y': '0'},
+    _SVG + 'circle':  {'cx': '0', 'cy': '0'},
+    _SVG + 'ellipse': {'cx': '0', 'cy': '0'},
+    _SVG + 'use':     {'x': '0', 'y': '0'},
+}
+
+# Elements whose content inherits from where it is used
+_REFERENCED = {_SVG + tag for tag in
+               ('defs', 'clipPath', 'mask', 'pattern', 'marker', 'symbol')}
+
+# Elements which can get the transform of their parent group
+_TRANSFORMABLE = {_SVG + tag for tag in
+                  ('g', 'path', 'rect', 'circle', 'ellipse', 'line',
+                   'polyline', 'polygon', 'text', 'use', 'image')}
+
+# Attributes whose meaning depends on the transform of the element
+_TRANSFORM_DEPENDENT = ('clip-path', 'mask', 'filter')
+
+# The minimal number of siblings sharing a style
+# to hoist the style into a new group
+HOIST_MIN = 3
+
+## =========================================================
+## Numbers
+## ---------------------------------------------------------
+
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+def _decimals(token):
+    """The number of decimals of a number token."""
+    point = token.find('.')
+    return len(token) - point - 1 if point >= 0 else 0
+
+def _compact(value, decimals):
+    """The shortest form of a number: '0.5' -> '.5', '-0.5' -> '-.5'."""
+
+    string = formatNumber(value, decimals)
+    if string.startswith('0.'):
+        string = string[1:]
+    elif string.startswith('-0.'):
+        string = '-' + string[2:]
+
+    return string
+
+def _same(value, default):
+    """Is the attribute value the same as the default value?"""
+
+    if value == default:
+        return True
+
+    try:
+        return float(value) == float(default)
+    except (TypeError, ValueError):
+        return False
+
+## =========================================================
+## Paths
+## ---------------------------------------------------------
+
+_PATH_TOKEN = re.compile(r'[MmLlHhVvZz]|' + _NUMBER.pattern)
+_PATH_CURVE = re.compile(r'[^MmLlHhVvZz\d\s,.+-]')
+_FRACTION = re.compile(r'\.(\d+)')
+
+def _parse_path(d):
+    """Parse path data with only moveto, lineto and closepath
+    commands into a list of ('M', x, y), ('L', x, y) and ('Z',)
+    with absolute coordinates.
+
+    Returns None for other path data (like curves or arcs).
+
+    """
+
+    if _PATH_CURVE.search(d):
+        return None
+
+    tokens = _PATH_TOKEN.findall(d)
+    decimals = max(map(len, _FRACTION.findall(d)), default=0)
+
+    ops = []
+    x = y = 0.0
+    sx = sy = 0.0
+    cmd = None
+    i = 0
+    n = len(tokens)
+
+    try:
+        while i < n:
+
+            token = tokens[i]
+            if token.isalpha():
+                cmd = token
+                i += 1
+                if cmd in 'Zz':
+                    ops.append(('Z',))
+                    x, y = sx, sy
+                    continue
+
+            elif cmd is None or cmd in 'Zz':
+                return None
+
+            relative = cmd.islower()
+            kind = cmd.upper()
+
+            if kind in 'ML':
+                dx, dy = float(tokens[i]), float(tokens[i+1])
+                i += 2
+                if relative:
+                    x, y = round(dx + x, decimals), round(dy + y, decimals)
+                else:
+                    x, y = dx, dy
+
+                if kind == 'M':
+                    ops.append(('M', x, y))
+                    sx, sy = x, y
+                    # Further coordinate pairs are lineto commands
+                    cmd = 'l' if relative else 'L'
+                else:
+                    ops.append(('L', x, y))
+
+            elif kind == 'H':
+                value = float(tokens[i])
+                i += 1
+                x = round(value + x, decimals) if relative else value
+                ops.append(('L', x, y))
+
+            else: # kind == 'V'
+                value = float(tokens[i])
+                i += 1
+                y = round(value + y, decimals) if relative else value
+                ops.append(('L', x, y))
+
+    except (IndexError, ValueError):
+        return None
+
+    return ops, decimals
+
+def _implicit(command, last):
+    """Can 'command' following the command 'last' be left out?
+    Repeated commands are implicit (but movetos, as the coordinates
+    following a moveto are linetos) - and the linetos following a
+    moveto."""
+
+    return (command == last and not command in 'Mm') \
+        or (command == 'L' and last == 'M') \
+        or (command == 'l' and last == 'm')
+
+def compact_path(d):
+    """Rewrite path data in its shortest form.
+
+    Every command is written with relative or absolute coordinates -
+    whatever is shorter; horizontal and vertical lines use H/V,
+    repeated commands and unneeded separators are left out:
+
+      'M10 10 L20 10 L20 20 Z' -> 'M10 10H20V20z'
+
+    Path data with other commands than M, L, H, V and Z is returned
+    unchanged.
+
+    """
+
+    parsed = _parse_path(d)
+    if parsed is None:
+        return d
+    ops, decimals = parsed
+
+    # The numbers are formatted once
+    strings = {}
+    def fmt(value):
+        string = strings.get(value)
+        if string is None:
+            string = strings[value] = _compact(value, decimals)
+        return string
+
+    parts = []
+    last = ''        # the last command written
+    number = ''      # the last number written
+    x = y = 0.0
+    sx = sy = 0.0
+
+    for op in ops:
+
+        if op[0] == 'Z':
+            candidates = (('z', ()),)
+            x, y = sx, sy
+
+        else:
+            kind, nx, ny = op
+            if decimals:
+                dx, dy = round(nx - x, decimals), round(ny - y, decimals)
+            else:
+                dx, dy = nx - x, ny - y
+
+            if kind == 'M':
+                candidates = (('M', (fmt(nx), fmt(ny))), ('m', (fmt(dx), fmt(dy))))
+                sx, sy = nx, ny
+            elif ny == y:
+                candidates = (('H', (fmt(nx),)), ('h', (fmt(dx),)))
+            elif nx == x:
+                candidates = (('V', (fmt(ny),)), ('v', (fmt(dy),)))
+            else:
+                candidates = (('L', (fmt(nx), fmt(ny))), ('l', (fmt(dx), fmt(dy))))
+
+            x, y = nx, ny
+
+        # The shortest candidate
+        best = None
+        for command, values in candidates:
+            implicit = _implicit(command, last)
+            length = len(''.join(values)) + (not implicit)
+            if best is None or length < best[0]:
+                best = length, command, values, implicit
+        _, command, values, implicit = best
+
+        if not implicit:
+            parts.append(command)
+            last = command
+            number = ''
+
+        for string in values:
+            # A separator is needed between two numbers
+            # unless the second one starts with a sign
+            # or a point following a number with a point
+            if number and not string[0] == '-' \
+               and not (string[0] == '.' and '.' in number):
+                parts.append(' ')
+            parts.append(string)
+            number = string
+
+    return ''.join(parts)
+
+## =========================================================
+## Transforms
+## ---------------------------------------------------------
+
+_TRANSFORM = re.compile(r'\s*(\w+)\s*\(([^)]*)\)\s*,?')
+_TRANSLATE = re.compile(r'^\s*translate\s*\(([^)]*)\)\s*$')
+
+def _combine_transforms(transform):
+    """Combine adjacent translations in a transform list
+    and drop translations by (0, 0)."""
+
+    # Leave transforms which can not be parsed as they are
+    items = _TRANSFORM.findall(transform)
+    if not items or _TRANSFORM.sub('', transform).strip():
+        return transform
+
+    combined = []
+    for name, args in items:
+        if name == 'translate':
+            values = _NUMBER.findall(args)
+            if len(values) == 1:
+                values.append('0')
+            if len(values) != 2 or 'e' in args.lower():
+                return transform
+            decimals = max(_decimals(v) for v in values)
+            tx, ty = float(values[0]), float(values[1])
+
+            if combined and combined[-1][0] == 'translate':
+                _, (px, py), pd = combined.pop()
+                decimals = max(decimals, pd)
+                tx, ty = round(px + tx, decimals), round(py + ty, decimals)
+
+            combined.append(('translate', (tx, ty), decimals))
+
+        else:
+            combined.append((name, args, None))
+
+    parts = []
+    for name, args, decimals in combined:
+        if name == 'translate':
+            tx, ty = args
+            if tx == 0 and ty == 0:
+                continue
+            parts.append('translate({}, {})'.format(formatNumber(tx, decimals), 
+                                                    formatNumber(ty, decimals)))
+        else:
+            parts.append('{}({})'.format(name, args))
+
+    return ' '.join(parts)
+
+## =========================================================
+## optimize()
+## ---------------------------------------------------------
+
+_SELECTORS = re.compile(r'([^{}]+)\{')
+_CLASS_SELECTOR = re.compile(r'^\s*\.[\w-]+\s*$')
+
+def _only_class_selectors(root):
+    """Do the CSS rules of the document only use class selectors?"""
+
+    for style in root.iter(_SVG + 'style'):
+        for selectors in _SELECTORS.findall(style.text or ''):
+            for selector in selectors.split(','):
+                if not _CLASS_SELECTOR.match(selector):
+                    return False
+
+    return True
+
+def _inherited_values(element):
+    """The values 'element' inherits from its ancestors
+    - or None when they are not known."""
+
+    inherited = dict(INHERITED)
+    for ancestor in reversed(list(element.iterancestors())):
+        attrib = ancestor.attrib
+        if ancestor.tag in _REFERENCED or 'class' in attrib or 'style' in attrib:
+            return None
+        for name in INHERITED:
+            if name in attrib:
+                inherited[name] = attrib[name]
+
+    return inherited
+
+def optimize(svg, report=False, keep=()):
+    """Optimize an SVG tree (an SVGElement or lxml element) in place.
+
+    'svg' can also be a part of a document - like the QR-Code added
+    to a copy of an already optimized template.
+
+    When 'report' is set the size of the SVG code before and after
+    optimizing is measured and returned as dictionary with the keys
+    'before', 'after' and 'saved' (in bytes).
+
+    The elements in 'keep' - like the slots of a template which are
+    filled later - are not replaced when groups are collapsed.
+
+    """
+
+    element = getattr(svg, '_xml', svg)
+
+    if report:
+        before = len(etree.tostring(element))
+
+    # Inherited values can only be tracked and styles only be
+    # hoisted when CSS rules do not change them
+    hoist = _only_class_selectors(element.getroottree().getroot())
+    inherited = _inherited_values(element) if hoist else None
+
+    keep = set(getattr(kept, '_xml', kept) for kept in keep)
+
+    _optimize(element, inherited, hoist, keep)
+
+    if report:
+        after = len(etree.tostring(element))
+        return {'before': before, 'after': after, 'saved': before - after}
+
+def _optimize(element, inherited, hoist, keep):
+    """Optimize 'element' whose parent has the 'inherited' values
+    (None: unknown) - and its subtree.  Styles are hoisted into
+    groups when 'hoist' is set, the elements in 'keep' stay in the
+    tree."""
+
+    tag = element.tag
+    attrib = element.attrib
+
+    # Drop redundant attributes
+    defaults = DEFAULTS_BY_TAG.get(tag)
+    for name in list(attrib):
+        value = attrib[name]
+        if inherited is not None and name in INHERITED \
+           and inherited.get(name) is not None \
+           and _same(value, inherited[name]):
+            del attrib[name]
+        elif name in DEFAULTS and _same(value, DEFAULTS[name]):
+            del attrib[name]
+        elif defaults and name in defaults and _same(value, defaults[name]):
+            del attrib[name]
+
+    if tag == _SVG + 'path' and 'd' in attrib:
+        attrib['d'] = compact_path(attrib['d'])
+
+    if 'transform' in attrib:
+        transform = _combine_transforms(attrib['transform'])
+        if transform:
+            attrib['transform'] = transform
+        else:
+            del attrib['transform']
+
+    # Styles set by CSS are not known
+    styled = 'class' in attrib or 'style' in attrib
+
+    # The values inherited by the children
+    if inherited is None or styled or tag in _REFERENCED:
+        inherited = None
+    else:
+        inherited = dict(inherited)
+        for name in INHERITED:
+            if name in attrib:
+                inherited[name] = attrib[name]
+
+    for child in element:
+        if isinstance(child.tag, str):
+            _optimize(child, inherited, hoist, keep)
+
+    if tag in (_SVG + 'g', _SVG + 'svg'):
+        _collapse_groups(element, keep)
+        if hoist and not styled:
+            _hoist_styles(element)
+
+def _collapse_groups(element, keep=()):
+    """Replace the child groups of 'element' without attributes by
+    their children and move the transform of groups with a single
+    child to the child - except for the groups in 'keep'."""
+
+    i = 0
+    while i < len(element):
+
+        child = element[i]
+
+        if child.tag != _SVG + 'g' \
+           or child in keep \
+           or (child.text and child.text.strip()):
+            i += 1
+            continue
+
+        attrib = child.attrib
+
+        if len(attrib) == 0:
+            # Replace the group by its children
+            tail = child.tail
+            children = list(child)
+            element.remove(child)
+            for n, grandchild in enumerate(children):
+                element.insert(i + n, grandchild)
+            if children:
+                children[-1].tail = tail
+            continue
+
+        if len(attrib) == 1 and 'transform' in attrib and len(child) == 1:
+            grandchild = child[0]
+            if grandchild.tag in _TRANSFORMABLE \
+               and not 'id' in grandchild.attrib \
+               and not any(name in grandchild.attrib for name in _TRANSFORM_DEPENDENT):
+
+                transform = attrib['transform']
+                if 'transform' in grandchild.attrib:
+                    transform += ' ' + grandchild.attrib['transform']
+                transform = _combine_transforms(transform)
+                if transform:
+                    grandchild.set('transform', transform)
+                elif 'transform' in grandchild.attrib:
+                    del grandchild.attrib['transform']
+
+                # Replace the group by its child
+                grandchild.tail = child.tail
+                element.replace(child, grandchild)
+                continue
+
+        i += 1
+
+def _style_key(element):
+    """The inherited presentation attributes of an element
+    - or None when its style can not be hoisted."""
+
+    attrib = element.attrib
+    if not isinstance(element.tag, str) \
+       or 'id' in attrib or 'class' in attrib or 'style' in attrib:
+        return None
+
+    return tuple(sorted((name, value) for name, value in attrib.items()
+                        if name in INHERITED)) or None
+
+def _hoist_styles(element):
+    """Hoist the style shared by runs of children of 'element'
+    into 'element' or into new groups."""
+
+    children = list(element)
+    keys = [_style_key(child) for child in children]
+
+    # All children share the style
+    # - hoist it into the element itself when it is a group
+    if element.tag == _SVG + 'g' and len(children) > 1 \
+       and keys[0] is not None and all(key == keys[0] for key in keys):
+        for name, value in keys[0]:
+            element.set(name, value)
+            for child in children:
+                del child.attrib[name]
+        return
+
+    # Runs of children sharing a style
+    # are moved into a new group
+    i = 0
+    while i < len(children):
+
+        key = keys[i]
+        j = i + 1
+        while j < len(children) and keys[j] == key:
+            j += 1
+
+        if key is not None and j - i >= HOIST_MIN:
+            run = children[i:j]
+            group = etree.Element(_SVG + 'g', dict(key))
+            run[0].addprevious(group)
+            for child in run:
+                for name, _ in key:
+                    del child.attrib[name]
+                group.append(child)
+            group.tail = run[-1].tail
+            for child in run:
+                child.tail = None
+
+        i = j
+
+## =========================================================
+## =========================================================
+
+## fin.
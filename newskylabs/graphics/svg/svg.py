@@ -16,7 +16,8 @@
 
 """newskylabs/graphics/svg/svg.py:
 
-A class for assembling SVG files.
+A class for assembling SVG files - and a writer for writing large SVG
+files incrementally.
 
 """
 
@@ -26,20 +27,29 @@ __copyright__   = "Copyright 2019 Dietrich Bollmann"
 __license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
 __date__        = "2019/12/14"
 
-import importlib
+import importlib, numbers
+from functools import partial
+from lxml import etree
 
-from newskylabs.graphics.xml.xml import XMLElement
+from newskylabs.graphics.xml.xml import XMLElement, XMLWriter, qname
 from newskylabs.graphics.css.css import CSSRule
+from newskylabs.graphics.utils.general import formatNumber, formatKwargs, get_precision
 
 ## =========================================================
 ## class SVGElement
 ## ---------------------------------------------------------
 
+# The tags of the elements added by the add* methods of
+# SVGElement.__getattr__() - by method name
+_add_tags = {}
+
 class SVGElement(XMLElement):
     """
     SVGElement
     """
 
+    __slots__ = ()
+
     _namespace = 'http://www.w3.org/2000/svg'
     _root_tag = 'svg'
 
@@ -47,29 +57,29 @@ class SVGElement(XMLElement):
         super().__init__(tag, *args, **kwargs)
 
     @classmethod
-    def root(cls, 
-             *args, 
-             x=0, y=0, width=100, height=100,
-             version='1.1', 
-             **kwargs
+    def root(cls, *args, **kwargs):
+        root = super().root(*args, **cls.root_attributes(**kwargs))
+        return root
+
+    @staticmethod
+    def root_attributes(x=0, y=0, width=100, height=100,
+                        version='1.1', 
+                        **kwargs
     ):
-        viewBox = '{} {} {} {}'.format(x, y, width, height)
+        """The attributes of the root element of an SVG document
+        with the given geometry."""
+
+        viewBox = ' '.join(formatNumber(n) for n in (x, y, width, height))
 
         if 'absolute' in kwargs:
             absolute = kwargs['absolute']
             del kwargs['absolute']
 
             if absolute:
-                kwargs['width']  = '{}mm'.format(width)
-                kwargs['height'] = '{}mm'.format(height)
-        
-        root = super().root(
-            *args, 
-            version = version, 
-            viewBox = viewBox,
-            **kwargs
-        )
-        return root
+                kwargs['width']  = '{}mm'.format(formatNumber(width))
+                kwargs['height'] = '{}mm'.format(formatNumber(height))
+
+        return dict(version=version, viewBox=viewBox, **kwargs)
 
     def addTransform(self, transform):
         child = SVGElement('g', transform=transform)
@@ -77,12 +87,15 @@ class SVGElement(XMLElement):
         return child
 
     def addTranslate(self, x=0, y=0):
-        transform = 'translate({}, {})'.format(x, y)
+        transform = 'translate({}, {})'.format(formatNumber(x), formatNumber(y))
         child = self.addTransform(transform)
         return child
 
     def addScale(self, x=None, y=None):
 
+        # The scaling factors are not rounded to the precision of
+        # the document - they are no lengths but multiply them.
+
         # When no scaling factor is given 
         # use 1 to scale both dimensions
         if not x:
@@ -99,22 +112,183 @@ class SVGElement(XMLElement):
         child = self.addTransform(transform)
         return child
 
-    def _format_path(self, path, close_path=False):
+    @staticmethod
+    def _coordinates(path):
+        """The coordinates of a path as flat list [x0, y0, x1, y1, ...].
+
+        The path can be given as
+
+        - a sequence of points: [(x0, y0), (x1, y1), ...];
+        - a flat coordinate buffer: [x0, y0, x1, y1, ...]
+          (like array.array('d', ...));
+        - a NumPy array of shape (n, 2) or (2n,).
+
+        The same works for tuples with more values - like the
+        (x, y, width, height) geometry of rectangles.
+
+        NumPy arrays are recognized by their ravel() method
+        - NumPy itself is not needed.
+
+        """
+
+        if hasattr(path, 'ravel'):
+            # A NumPy array - converted in a single pass
+            return path.ravel().tolist()
+
+        if hasattr(path, 'tolist'):
+            # A flat buffer like array.array or memoryview
+            return path.tolist()
+
+        # Numbers of any type (like NumPy scalars) are coordinates
+        path = list(path)
+        if path and not isinstance(path[0], numbers.Number):
+            # A sequence of points
+            return [c for point in path for c in point]
+
+        # A flat list of coordinates
+        return path
+
+    def formatPath(self, path, close_path=False, precision=None):
+        """Format the path data of a single (sub)path:
+
+          'M{x0} {y0} L{x1} {y1} ...' + 'Z' when closed
+
+        The coordinates are rounded to 'precision' decimals - by
+        default to the precision set for the document (see
+        newskylabs.graphics.utils.general.precision()).
+
+        Used with addLeaf() to add paths without SVGElement wrapper:
+
+          e.addLeaf('path', d=e.formatPath(points), stroke='black')
 
-        p = path[0]
-        pathstr = 'M{} {}'.format(p[0], p[1])
-        for p in path[1:]:
-            pathstr += ' L{} {}'.format(p[0], p[1])
+        """
+
+        coordinates = self._coordinates(path)
+        if len(coordinates) % 2:
+            msg = "A path needs an even number of coordinates - not {}"
+            raise ValueError(msg.format(len(coordinates)))
+
+        npoints = len(coordinates) // 2
+        if npoints == 0:
+            return ''
+
+        # Rounded to the precision given or set for the document
+        if precision is None:
+            precision = get_precision()
+
+        if precision is not None:
+            coordinates = [formatNumber(c, precision) for c in coordinates]
+
+        # Format all points at once
+        template = 'M{} {}' + ' L{} {}' * (npoints - 1)
+        pathstr = template.format(*coordinates)
 
         pathstr += 'Z' if close_path else ''
     
         return pathstr
 
-    def addPath(self, path=[], *args, close_path=False, **kwargs):
+    def addPath(self, path=[], *args, close_path=False, precision=None, **kwargs):
+        tag = 'path'
+        pathstr = self.formatPath(path, close_path=close_path, precision=precision)
+        return self.addElement(tag, *args, d=pathstr, **kwargs)
+
+    def addPaths(self, paths, *args, close_path=False, precision=None, **kwargs):
+        """Add a single path element with a subpath for every path in
+        'paths' - all sharing the same style.
+
+        'paths' is a sequence of paths (as accepted by addPath()) or a
+        NumPy array of shape (m, n, 2).
+
+        """
+
         tag = 'path'
-        pathstr = self._format_path(path, close_path=close_path)
+        pathstr = ' '.join(self.formatPath(path, close_path=close_path, precision=precision)
+                           for path in paths)
         return self.addElement(tag, *args, d=pathstr, **kwargs)
     
+    def _addElements(self, tag, names, values, precision=None, **kwargs):
+        """Add an element for every row of 'values' - with the
+        attributes 'names' set to the values of the row and the
+        attributes given in 'kwargs' shared by all elements.
+
+        The elements are created directly as lxml elements without
+        SVGElement wrappers; the shared attributes are formatted only
+        once.
+
+        """
+
+        size = len(names)
+        values = self._coordinates(values)
+        if len(values) % size:
+            msg = "The number of values ({}) is not a multiple of {}"
+            raise ValueError(msg.format(len(values), size))
+
+        if precision is None:
+            precision = get_precision()
+
+        values = [formatNumber(value, precision) for value in values]
+
+        tag = qname(self._namespace, tag)
+        shared = formatKwargs(kwargs)
+        parent = self._xml
+
+        for i in range(0, len(values), size):
+            attrib = dict(zip(names, values[i:i+size]))
+            attrib.update(shared)
+            etree.SubElement(parent, tag, attrib)
+
+        # Return the parent for method chaining
+        return self
+
+    def addCircles(self, centers, r, precision=None, **kwargs):
+        """Add a circle for every center in 'centers' - all sharing the
+        style given in 'kwargs':
+
+          e.addCircles(centers, r=0.5, fill='black')
+
+        'centers' is a sequence of points, a flat coordinate buffer or
+        a NumPy array (see _coordinates()); 'r' is a radius shared by
+        all circles or a sequence with a radius for every circle.
+
+        The circles are the same as when added one by one with
+        addCircle() - but no SVGElement is made for them.
+
+        """
+
+        centers = self._coordinates(centers)
+
+        if isinstance(r, numbers.Number):
+            # A shared radius - following the center
+            values = centers
+            names = ('cx', 'cy')
+            kwargs = {'r': formatNumber(r, precision), **kwargs}
+
+        else:
+            radii = self._coordinates(r)
+            if len(radii) * 2 != len(centers):
+                msg = "{} radii given for {} circles"
+                raise ValueError(msg.format(len(radii), len(centers) // 2))
+
+            values = [v for i, radius in enumerate(radii)
+                      for v in (centers[2*i], centers[2*i+1], radius)]
+            names = ('cx', 'cy', 'r')
+
+        return self._addElements('circle', names, values, precision=precision, **kwargs)
+
+    def addRects(self, rects, precision=None, **kwargs):
+        """Add a rectangle for every (x, y, width, height) in 'rects'
+        - all sharing the style given in 'kwargs':
+
+          e.addRects([(0, 0, 10, 5), (20, 0, 10, 5)], fill='gray')
+
+        'rects' is a sequence of 4-tuples, a flat buffer or a NumPy
+        array of shape (n, 4) (see _coordinates()).
+
+        """
+
+        names = ('x', 'y', 'width', 'height')
+        return self._addElements('rect', names, rects, precision=precision, **kwargs)
+
     def addText(self, *args, **kwargs):
         
         # Convert 'css-class' etc. to 'class'
@@ -127,12 +301,47 @@ class SVGElement(XMLElement):
         tag = 'text'
         return self.addElement(tag, *args, **kwargs)
     
+    # The elements added most often have their own add* methods
+    # - all other elements are added by __getattr__()
+
+    def addG(self, *args, **kwargs):
+        return self.addElement('g', *args, **kwargs)
+
+    def addRect(self, *args, **kwargs):
+        return self.addElement('rect', *args, **kwargs)
+
+    def addCircle(self, *args, **kwargs):
+        return self.addElement('circle', *args, **kwargs)
+
+    def addLine(self, *args, **kwargs):
+        return self.addElement('line', *args, **kwargs)
+
+    def addStyle(self, *args, **kwargs):
+        return self.addElement('style', *args, **kwargs)
+
+    def addClipPath(self, *args, **kwargs):
+        return self.addElement('clipPath', *args, **kwargs)
+
     def addElement(self, tag, *args, **kwargs):
 
         child = SVGElement(tag, *args, **kwargs)
         self.append(child)
         return child
 
+    def addLeaf(self, tag, *args, **kwargs):
+        """Add a child element which is not touched again - like a
+        path, circle or rectangle - and return it as lxml element.
+
+        The element is the same as made by addElement() - but without
+        SVGElement wrapper:
+
+          e.addLeaf('path', d='M0 0 L10 10', stroke='black')
+
+        """
+
+        tag = qname(self._namespace, tag)
+        return etree.SubElement(self._xml, tag, *args, **formatKwargs(kwargs))
+
     def addQRCode(self, 
                   data,
                   x      = 0,
@@ -179,12 +388,29 @@ class SVGElement(XMLElement):
         # Add it to the parent as text
         self._xml.text += rulestr
 
-    def addPlugin(self, plugin, *args, debug=0, **kwargs):
+    def addStylesheet(self, stylesheet):
+        """Add a <style> element with the rules of a compiled
+        Stylesheet (see newskylabs.graphics.css.css) and return it."""
+
+        style = self.addStyle()
+        style._xml.text = stylesheet.tostring(level=style.depth())
+        return style
+
+    @staticmethod
+    def loadPlugin(plugin, *args, debug=0, **kwargs):
+        """Load and instantiate a plugin.
+
+        'plugin' is a plugin specification - a dictionary with the
+        path of the plugin class as value of 'class' and the plugin
+        parameters.
 
-        # Get plugin class and parameters
-        plugin_class = plugin['class']
-        del plugin['class']
-        plugin_params = plugin
+        """
+
+        # Get plugin class and parameters.
+        # Work on a copy to leave the plugin specification untouched
+        # so that it can be used again for rendering further meishis.
+        plugin_params = dict(plugin)
+        plugin_class = plugin_params.pop('class')
 
         # Overwrite parameters given in kwargs
         for param, value in kwargs.items():
@@ -192,7 +418,7 @@ class SVGElement(XMLElement):
                 plugin_params[param] = value
             
         if debug > 0:
-            print("DEBUG SVGElement.addPlugin(): plugin_params:", plugin_params)
+            print("DEBUG SVGElement.loadPlugin(): plugin_params:", plugin_params)
 
         # Load plugin class dynamically 
         plugin_class_path = plugin_class.split('.')
@@ -201,8 +427,13 @@ class SVGElement(XMLElement):
         module = importlib.import_module(module_name)
         plugin_class = getattr(module, class_name)
         
+        # Instantiate the plugin
+        return plugin_class(**plugin_params)
+
+    def addPlugin(self, plugin, *args, debug=0, **kwargs):
+
         # Assemble the plugin
-        plugin = plugin_class(**plugin_params)
+        plugin = self.loadPlugin(plugin, *args, debug=debug, **kwargs)
         child = plugin.toSVG()
 
         # Append the plugin
@@ -214,21 +445,50 @@ class SVGElement(XMLElement):
     def __getattr__(self, name):
         
         # When `name' starts with 'add' add a child
-        if name[:3] == 'add':
+        # - only used for rarely added elements
+        #   (see addG(), addRect() etc. for the frequent ones)
+        if name[:3] == 'add' and len(name) > 3:
         
             # addSomeClass -> someClass
-            name = name[3].lower() + name[4:]
-        
-            def addElement(*args, **kwargs):
-                return self.addElement(name, *args, **kwargs)
+            # (the tags are cached - the class is left untouched)
+            try:
+                tag = _add_tags[name]
+
+            except KeyError:
+                tag = _add_tags[name] = name[3].lower() + name[4:]
         
-            return addElement
+            return partial(self.addElement, tag)
 
         # No idea what to do with the attribute
         className = type(self).__name__
         raise AttributeError("An {} has no attribute '{}'"\
                              .format(className, name))
 
+## =========================================================
+## class SVGWriter
+## ---------------------------------------------------------
+
+class SVGWriter(XMLWriter):
+    """Write an SVG document incrementally to a binary stream
+    (see XMLWriter).
+
+    Example:
+
+      with SVGWriter('poster.svg') as writer:
+          with writer.root(width=841, height=1189, absolute=True):
+              for tile in tiles:
+                  writer.write(tile)
+
+    """
+
+    _namespace = SVGElement._namespace
+    _root_tag  = SVGElement._root_tag
+
+    def root(self, **kwargs):
+        """Open the root element - with the same attributes as
+        SVGElement.root()."""
+        return super().root(**SVGElement.root_attributes(**kwargs))
+
 ## =========================================================
 ## =========================================================
 
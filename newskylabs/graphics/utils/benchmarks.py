@@ -0,0 +1,218 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""newskylabs/graphics/utils/benchmarks.py:
+
+Utilities for running the benchmarks in the 'benchmarks' dir.
+
+The benchmarks are organized like the examples: a benchmark script
+`some_class_benchmarks.py' defines functions named
+`some_class_benchmark_<name>()' which measure something and return
+the results as (possibly nested) dictionary.  The script ends with
+
+  if __name__ == '__main__':
+      main(globals())
+
+and is called with the names of the benchmarks to run (default: all
+of them).  The results are written as JSON - to stdout or to the file
+given with `--output' - so that they can be compared between
+releases.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/08"
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+
+from newskylabs.graphics.__about__ import __version__
+from newskylabs.graphics.utils.examples import get_examples
+
+## =========================================================
+## Settings
+## ---------------------------------------------------------
+
+# The settings of the current run
+# - can be changed on the command line
+settings = {
+    'repeat': 5,                 # repetitions of every measurement
+    'repeat_max': 1000,          # larger sizes are measured only once
+    'sizes':  [1, 100, 10000],   # problem sizes (like roster sizes)
+    'memory': True,              # also measure the peak memory?
+}
+
+## =========================================================
+## Measuring
+## ---------------------------------------------------------
+
+def measure(fn, *args, repeat=None, setup=None, memory=False, **kwargs):
+    """Measure the time 'fn(*args, **kwargs)' takes.
+
+    - repeat: how often to call the function
+              (default: settings['repeat']);
+    - setup:  a function called before every call of 'fn'
+              - not counted in the time;
+    - memory: also measure the peak memory allocated by a call
+              (in an additional call traced by tracemalloc).
+
+    Returns the best, mean and total time in seconds
+    (and the peak memory in bytes).
+
+    """
+
+    if repeat is None:
+        repeat = settings['repeat']
+
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+
+    result = {
+        'best':  min(times),
+        'mean':  sum(times) / len(times),
+        'total': sum(times),
+        'runs':  repeat,
+    }
+
+    if memory:
+        result['peak_memory'] = peak_memory(fn, *args, setup=setup, **kwargs)
+
+    return result
+
+def peak_memory(fn, *args, setup=None, **kwargs):
+    """The peak memory in bytes allocated by 'fn(*args, **kwargs)'."""
+
+    if setup:
+        setup()
+
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+def measure_sizes(fn, prepare=None):
+    """Measure 'fn' for every problem size in settings['sizes'].
+
+    'fn' is called with the arguments returned by 'prepare(size)'
+    (default: the size itself) - the preparation is not measured.
+    Sizes up to settings['repeat_max'] are measured settings['repeat']
+    times, larger ones once.  The peak memory is measured when
+    settings['memory'] is set.
+
+    Returns the results keyed by size.
+
+    """
+
+    results = {}
+    for size in settings['sizes']:
+
+        args = prepare(size) if prepare else (size,)
+        repeat = settings['repeat'] if size <= settings['repeat_max'] else 1
+
+        result = measure(fn, *args, repeat=repeat, memory=settings['memory'])
+        results[str(size)] = throughput(result, size)
+
+    return results
+
+def throughput(result, items):
+    """Add the throughput in items per second to a measure() result."""
+
+    result['items'] = items
+    result['items_per_second'] = items / result['best'] if result['best'] > 0 else 0.0
+    return result
+
+## =========================================================
+## main()
+## ---------------------------------------------------------
+
+def main(symbols):
+
+    # Get the benchmark functions - named like examples
+    benchmarks = get_examples(symbols)
+
+    parser = argparse.ArgumentParser(
+        description="Run benchmarks and print the results as JSON.")
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help='the benchmarks to run (default: all): {}'\
+                        .format(', '.join(benchmarks)))
+    parser.add_argument('-o', '--output', 
+                        help='save the results in this file')
+    parser.add_argument('-r', '--repeat', type=int, default=settings['repeat'],
+                        help='how often to repeat every measurement')
+    parser.add_argument('--repeat-max', type=int, default=settings['repeat_max'],
+                        help='measure larger sizes only once')
+    parser.add_argument('-s', '--sizes', 
+                        default=','.join(str(size) for size in settings['sizes']),
+                        help='comma separated problem sizes (like roster sizes)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not measure the peak memory')
+    args = parser.parse_args()
+
+    settings['repeat'] = args.repeat
+    settings['repeat_max'] = args.repeat_max
+    settings['sizes']  = [int(size) for size in args.sizes.split(',')]
+    settings['memory'] = not args.no_memory
+
+    names = args.benchmarks or list(benchmarks)
+    for name in names:
+        if not name in benchmarks:
+            parser.error("Unknown benchmark: {}".format(name))
+
+    results = {
+        'script':   os.path.basename(sys.argv[0]),
+        'version':  __version__,
+        'python':   platform.python_version(),
+        'platform': platform.platform(),
+        'date':     time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': dict(settings),
+        'results':  {},
+    }
+
+    # Run the benchmarks
+    for name in names:
+        print(">>> {}()".format(name), file=sys.stderr)
+        results['results'][name] = benchmarks[name]()
+
+    output = json.dumps(results, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+
+    else:
+        print(output)
+
+## =========================================================
+## =========================================================
+
+## fin.
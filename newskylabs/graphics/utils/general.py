@@ -26,7 +26,8 @@ __copyright__   = "Copyright 2019 Dietrich Bollmann"
 __license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
 __date__        = "2019/12/23"
 
-import os, re
+import os, re, threading
+from contextlib import contextmanager
 from subprocess import Popen
 
 ## =========================================================
@@ -50,19 +51,31 @@ def camelToHyphen(s):
                   lambda match: '-{}'.format(match.group(1).lower()), 
                   s)
 
+# Cache of the translated keys
+# - the same few attribute names are translated again and again
+_formatted_keys = {}
+
 def formatKwargsKey(key):
     """
     'fooBar_baz' -> 'foo-bar-baz'
     """
-    key = re.sub(r'_', '-', key)
-    return key
+
+    try:
+        return _formatted_keys[key]
+
+    except KeyError:
+        formatted = _formatted_keys[key] = key.replace('_', '-')
+        return formatted
 
 def formatKwargsValue(value):
 
     if value == None:
         value = 'none'
 
-    elif isinstance(value, (int, float)):
+    elif isinstance(value, float):
+        value = formatNumber(value)
+
+    elif isinstance(value, int):
         value = str(value)
 
     return value
@@ -70,6 +83,66 @@ def formatKwargsValue(value):
 def formatKwargs(kwargs):
     return {formatKwargsKey(key): formatKwargsValue(value) for key, value in kwargs.items()}
 
+## =========================================================
+## Precision
+## 
+## The number of decimals the numbers in generated documents are
+## rounded to - set for the current thread:
+## 
+##   with precision(2):
+##       ... # coordinates are written with at most 2 decimals
+## ---------------------------------------------------------
+
+_settings = threading.local()
+
+def get_precision():
+    """The number of decimals numbers are rounded to
+    (None: numbers are not rounded)."""
+    return getattr(_settings, 'precision', None)
+
+def set_precision(decimals):
+    """Round numbers to 'decimals' decimals (None: do not round)."""
+    _settings.precision = decimals
+
+@contextmanager
+def precision(decimals):
+    """Round numbers to 'decimals' decimals in the `with' block."""
+
+    previous = get_precision()
+    set_precision(decimals)
+    try:
+        yield
+
+    finally:
+        set_precision(previous)
+
+def formatNumber(value, precision=None):
+    """Format a number with at most 'precision' decimals
+    (default: the precision set with set_precision()).
+
+    23.157894736842106 -> '23.16' (precision 2)
+    3.0                -> '3'     (precision 2)
+
+    Trailing zeros are dropped.  Without precision the number is
+    formatted like str() does.
+
+    """
+
+    if precision is None:
+        precision = get_precision()
+
+        if precision is None:
+            return str(value)
+
+    string = '%.*f' % (precision, value)
+    if '.' in string:
+        string = string.rstrip('0').rstrip('.')
+
+    if string == '-0':
+        string = '0'
+
+    return string
+
 ## =========================================================
 ## Utilities
 ## ---------------------------------------------------------
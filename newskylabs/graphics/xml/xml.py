@@ -16,7 +16,12 @@
 
 """newskylabs/graphics/xml/xml.py:
 
-A class wrapping lxml.etree.
+A class wrapping lxml.etree - and a writer for writing large XML
+documents incrementally.
+
+Both can write gzip compressed documents (like .svgz files): the
+document is compressed while it is written - without building the
+uncompressed document in memory.
 
 """
 
@@ -26,10 +31,74 @@ __copyright__   = "Copyright 2019 Dietrich Bollmann"
 __license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
 __date__        = "2019/12/12"
 
-import os
+import os, gzip
+from contextlib import contextmanager, ExitStack
 from lxml import etree
 from newskylabs.graphics.utils.general import formatKwargs
 
+## =========================================================
+## Qualified names
+## ---------------------------------------------------------
+
+# Cache of the qualified names of the tags
+_qnames = {}
+
+def qname(namespace, tag):
+    """The qualified name of 'tag' in 'namespace' in the
+    {namespace}tag notation of lxml - cached so that it is not built
+    again for every element."""
+
+    try:
+        return _qnames[namespace, tag]
+
+    except KeyError:
+        name = _qnames[namespace, tag] = etree.QName(namespace, tag).text
+        return name
+
+## =========================================================
+## Compressed output
+## ---------------------------------------------------------
+
+# Files with these extensions are written gzip compressed
+GZIP_EXTENSIONS = ('.svgz', '.gz')
+
+# The default compression level (1: fastest ... 9: smallest)
+# - zlib's default, nearly as small as 9 and a lot faster
+DEFAULT_COMPRESSLEVEL = 6
+
+def is_compressed(filename):
+    """Is 'filename' the name of a gzip compressed file?"""
+    return filename.lower().endswith(GZIP_EXTENSIONS)
+
+@contextmanager
+def open_output(stream, compresslevel=None):
+    """Open a binary stream (or a file given by its name) for writing.
+
+    With 'compresslevel' (0 to 9) the data written is gzip compressed
+    on the fly.  Files with a name ending in .svgz or .gz are always
+    compressed (default level: DEFAULT_COMPRESSLEVEL).
+
+    The gzip header does not contain a time stamp - writing the same
+    document twice gives the same bytes.
+
+    """
+
+    if isinstance(stream, str):
+        if compresslevel is None and is_compressed(stream):
+            compresslevel = DEFAULT_COMPRESSLEVEL
+        with open(stream, 'wb') as fh:
+            with open_output(fh, compresslevel) as output:
+                yield output
+        return
+
+    if compresslevel is None:
+        yield stream
+        return
+
+    with gzip.GzipFile(filename='', mode='wb', fileobj=stream,
+                       compresslevel=compresslevel, mtime=0) as output:
+        yield output
+
 ## =========================================================
 ## class XMLElement 
 ## 
@@ -39,13 +108,19 @@ from newskylabs.graphics.utils.general import formatKwargs
 class XMLElement():
     """
     XMLElement - a class wrapping lxml.etree.
+
+    The wrapper only holds the lxml element - it has no instance
+    dictionary (see __slots__), so that the many elements of a
+    document do not need more memory than necessary.
     """
 
+    __slots__ = ('_xml',)
+
     _namespace = None
     _root_tag = 'xml'
 
     def __init__(self, tag, *args, **kwargs):
-        tag = etree.QName(self._namespace, tag)
+        tag = qname(self._namespace, tag)
         kwargs = formatKwargs(kwargs)
         xml = etree.Element(tag, *args, **kwargs)
         self._xml = xml
@@ -59,6 +134,13 @@ class XMLElement():
         root = cls(tag, *args, **kwargs)
         return root
 
+    @classmethod
+    def wrap(cls, xml):
+        """Wrap an existing lxml.etree element."""
+        element = cls.__new__(cls)
+        element._xml = xml
+        return element
+
     def append(self, element):
 
         if isinstance(element, XMLElement):
@@ -93,8 +175,7 @@ class XMLElement():
 
     def tostring(self, pretty_print=True, xml_declaration=True, encoding='utf-8'):
 
-        string = etree.tostring(
-            self._xml, 
+        string = self.tobytes(
             pretty_print    = pretty_print,
             xml_declaration = xml_declaration, 
             encoding        = encoding,
@@ -102,6 +183,46 @@ class XMLElement():
 
         return string
 
+    def tobytes(self, pretty_print=True, xml_declaration=True, encoding='utf-8'):
+        """Serialize the element - without decoding it to a string."""
+
+        return etree.tostring(
+            self._xml, 
+            pretty_print    = pretty_print,
+            xml_declaration = xml_declaration, 
+            encoding        = encoding,
+        )
+
+    def write(self, stream, pretty_print=True, xml_declaration=True, encoding='utf-8',
+              compresslevel=None):
+        """Write the element to a binary stream (or a file given by
+        its name) - without building the document as string first.
+
+        The bytes written are the same as returned by tobytes() -
+        gzip compressed with the given 'compresslevel' and when
+        writing to a .svgz or .gz file (see open_output()).
+
+        """
+
+        if isinstance(stream, str) or compresslevel is not None:
+            with open_output(stream, compresslevel) as output:
+                self.write(output, pretty_print=pretty_print,
+                           xml_declaration=xml_declaration, encoding=encoding)
+            return
+
+        # Write the declaration like tostring() does
+        # - lxml would write the name of the encoding in upper case
+        if xml_declaration:
+            declaration = "<?xml version='1.0' encoding='{}'?>\n".format(encoding)
+            stream.write(declaration.encode(encoding))
+
+        etree.ElementTree(self._xml).write(
+            stream,
+            pretty_print    = pretty_print,
+            xml_declaration = False,
+            encoding        = encoding,
+        )
+
     def print(self, pretty_print=True, xml_declaration=True, encoding='utf-8'):
 
         string = self.tostring(
@@ -113,16 +234,170 @@ class XMLElement():
         print(string)
 
     def save(self, filename, 
-             pretty_print=True, xml_declaration=True, encoding='utf-8'):
+             pretty_print=True, xml_declaration=True, encoding='utf-8',
+             compresslevel=None):
 
-        string = self.tostring(
+        # Write straight to the file
+        # - without building the document as string
+        # (compressed when the file is a .svgz or .gz file)
+        self.write(
+            filename,
             pretty_print    = pretty_print, 
             xml_declaration = xml_declaration, 
-            encoding        = encoding
+            encoding        = encoding,
+            compresslevel   = compresslevel,
         )
 
-        with open(filename, 'w') as stream:
-            stream.write(string)
+## =========================================================
+## class XMLWriter
+## 
+## Writing XML incrementally
+## ---------------------------------------------------------
+
+class XMLWriter:
+    """Write an XML document incrementally to a binary stream.
+
+    The elements enclosing the document (like the root element) are
+    opened with element() and closed when leaving its `with' block;
+    complete elements (XMLElements or lxml elements) are written with
+    write() and can be forgotten right away.  This way only the
+    element written at a time is kept in memory - however large the
+    document gets.
+
+    Example:
+
+      with SVGWriter(stream) as writer:
+          with writer.root(width=210, height=297):
+              for card in cards:
+                  writer.write(card)
+
+    Note that the elements written are serialized independently from
+    the enclosing elements - their namespace declarations are
+    repeated.
+
+    The document is gzip compressed while it is written when a
+    'compresslevel' is given or the name of a .svgz or .gz file (see
+    open_output()).
+
+    """
+
+    _namespace = None
+    _root_tag = 'xml'
+
+    def __init__(self, stream, pretty_print=True, xml_declaration=True, encoding='utf-8',
+                 compresslevel=None):
+        """
+        - stream:        a binary stream (or the name of a file)
+                         the document is written to;
+        - compresslevel: gzip compress the document with this level
+                         (0 to 9).
+
+        """
+
+        self._stream          = stream
+        self._pretty_print    = pretty_print
+        self._xml_declaration = xml_declaration
+        self._encoding        = encoding
+        self._compresslevel   = compresslevel
+
+        self._output  = None
+        self._outputs = None
+        self._xmlfile = None
+        self._writer  = None
+        self._depth   = 0
+        self._newline = True
+
+    def __enter__(self):
+
+        # The file (or gzip stream) written to
+        self._outputs = ExitStack()
+        stream = self._output = self._outputs.enter_context(
+            open_output(self._stream, self._compresslevel))
+
+        # Write the declaration like XMLElement.tostring() does
+        # - lxml would write the name of the encoding in upper case
+        if self._xml_declaration:
+            declaration = "<?xml version='1.0' encoding='{}'?>".format(self._encoding)
+            if self._pretty_print:
+                declaration += '\n'
+            stream.write(declaration.encode(self._encoding))
+
+        self._xmlfile = etree.xmlfile(stream, encoding=self._encoding)
+        self._writer = self._xmlfile.__enter__()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        try:
+            self._xmlfile.__exit__(exc_type, exc_value, traceback)
+
+            # End with a newline like XMLElement.tostring()
+            if self._pretty_print and exc_type is None:
+                self._output.write(b'\n')
+
+        finally:
+            # Close the file - and finish the gzip stream
+            self._outputs.close()
+
+    def _indent(self):
+        """Start a new indented line when pretty printing."""
+
+        if self._pretty_print:
+            if not self._newline:
+                self._writer.write('\n')
+            if self._depth > 0:
+                self._writer.write('  ' * self._depth)
+            self._newline = False
+
+    @contextmanager
+    def element(self, tag, nsmap=None, **kwargs):
+        """Open an element - which is closed when leaving the
+        `with' block."""
+
+        tag = qname(self._namespace, tag)
+
+        self._indent()
+        with self._writer.element(tag, formatKwargs(kwargs), nsmap=nsmap):
+            self._depth += 1
+            yield self
+            self._depth -= 1
+            self._indent()
+
+    def root(self, **kwargs):
+        """Open the root element."""
+
+        nsmap = {None: self._namespace} if self._namespace else None
+        return self.element(self._root_tag, nsmap=nsmap, **kwargs)
+
+    def write(self, element):
+        """Write a complete element (an XMLElement or lxml element)."""
+
+        if isinstance(element, XMLElement):
+            element = element._xml
+
+        # An element made on its own does not know the default
+        # namespace and would be written with a prefix like
+        # <ns0:g xmlns:ns0="...">.  It is added to a root element with
+        # the default namespace while it is written.
+        carrier = None
+        if self._namespace \
+           and element.getparent() is None \
+           and element.nsmap.get(None) != self._namespace:
+            carrier = etree.Element(qname(self._namespace, self._root_tag),
+                                    nsmap={None: self._namespace})
+            carrier.append(element)
+
+        # Indent the element to the current depth
+        # (the whitespace of the element is changed in place)
+        if self._pretty_print:
+            etree.indent(element, level=self._depth)
+
+        self._indent()
+        self._writer.write(element, with_tail=False)
+
+        if carrier is not None:
+            carrier.remove(element)
 
 ## =========================================================
 ## =========================================================
@@ -86,6 +86,10 @@ setuptools.setup(
     include_package_data=True,
     install_requires=[
     ],
+    extras_require={
+        # Rendering PNG previews with reportlab's renderPM
+        'png': ['rlPyCairo'],
+    },
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Environment :: Console',
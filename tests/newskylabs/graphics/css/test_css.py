@@ -0,0 +1,109 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""tests/newskylabs/graphics/css/test_css.py:
+
+Tests of CSS rules and compiled stylesheets.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/17"
+
+from newskylabs.graphics.css.css import CSSRule, Stylesheet
+from newskylabs.graphics.svg.svg import SVGElement
+
+## =========================================================
+## CSSRule
+## ---------------------------------------------------------
+
+def test_rule_key():
+    rule = CSSRule('.name', font_size='5.75px', fill='black')
+
+    assert rule.key() == ('.name', (('font-size', '5.75px'), ('fill', 'black')))
+    assert rule.key() == CSSRule('.name', font_size='5.75px', fill='black').key()
+    assert rule.key() != CSSRule('.name', font_size='5.75px', fill='gray').key()
+    assert rule.key() != CSSRule('.title', font_size='5.75px', fill='black').key()
+
+def test_rule_minified():
+    rule = CSSRule('.name', font_size='5.75px', fill='black')
+    assert rule.tominified() == '.name{font-size:5.75px;fill:black}'
+
+## =========================================================
+## Stylesheet
+## ---------------------------------------------------------
+
+def test_stylesheet_dedup():
+    stylesheet = Stylesheet(minify=True)
+    stylesheet.addRule('.name', fill='black')
+    stylesheet.addRule('.title', fill='gray')
+    stylesheet.addRule('.name', fill='black')
+
+    # Repeated rules are kept at their last place
+    assert [rule.key()[0] for rule in stylesheet.rules()] == ['.title', '.name']
+    assert stylesheet.tostring() == '.title{fill:gray}.name{fill:black}'
+
+def test_stylesheet_different_rules_kept():
+    stylesheet = Stylesheet(minify=True)
+    stylesheet.addRule('.name', fill='black')
+    stylesheet.addRule('.name', fill='gray')
+
+    # Same selector, different declarations - the cascade matters
+    assert stylesheet.tostring() == '.name{fill:black}.name{fill:gray}'
+
+def test_stylesheet_cached():
+    stylesheet = Stylesheet()
+    stylesheet.addRule('.name', fill='black')
+
+    assert stylesheet.tostring(2) is stylesheet.tostring(2)
+
+    # Adding a rule serializes the stylesheet again
+    before = stylesheet.tostring(2)
+    stylesheet.addRule('.title', fill='gray')
+    after = stylesheet.tostring(2)
+
+    assert '.title' not in before
+    assert '.title' in after and '.name' in after
+
+def test_stylesheet_empty():
+    assert Stylesheet().tostring() is None
+
+def test_stylesheet_like_css_rules():
+    rules = [('.name', {'font_size': '5.75px', 'fill': 'black'}),
+             ('.title', {'font_size': '3px', 'fill': 'gray'})]
+
+    # Rules added one by one...
+    svg1 = SVGElement.root(width=85, height=55)
+    style = svg1.addStyle()
+    for selector, declarations in rules:
+        style.addCSSRule(selector, **declarations)
+
+    # ...and as compiled stylesheet
+    stylesheet = Stylesheet()
+    for selector, declarations in rules:
+        stylesheet.addRule(selector, **declarations)
+    svg2 = SVGElement.root(width=85, height=55)
+    svg2.addStylesheet(stylesheet)
+
+    assert svg2.tobytes() == svg1.tobytes()
+
+## =========================================================
+## =========================================================
+
+## fin.
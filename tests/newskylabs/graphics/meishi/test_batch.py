@@ -0,0 +1,111 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+
+"""tests/newskylabs/graphics/meishi/test_batch.py:
+
+Tests of rendering the meishis of a roster.
+
+Usage:
+
+  PYTHONPATH=. python -m pytest tests
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/17"
+
+import os
+import pytest
+
+from newskylabs.graphics.utils.general import get_package_dir
+from newskylabs.graphics.meishi.design import DesignError
+from newskylabs.graphics.meishi.batch import MeishiBatch, load_design, merge_roster, load_roster
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def get_design_file():
+    return os.path.join(get_package_dir(), 'meishi', 'designs', 'default-design.yaml')
+
+def make_roster(size):
+    """A roster of 'size' different people."""
+    return [{'name': {'family': 'Family{}'.format(n), 'given': 'Given{}'.format(n)}}
+            for n in range(size)]
+
+def count_pages(pdffile):
+    with open(pdffile, 'rb') as fh:
+        return fh.read().count(b'/Type /Page\n')
+
+## =========================================================
+## Roster
+## ---------------------------------------------------------
+
+@pytest.mark.parametrize('entry', ['Some Body', None, ['x'], 42])
+def test_merge_roster_invalid_entry(entry):
+    design = load_design(get_design_file())
+    roster = make_roster(2) + [entry]
+
+    with pytest.raises(DesignError, match=r'^roster\[2\]: expected a content block'):
+        merge_roster(design, roster)
+
+@pytest.mark.parametrize('entries', ['- Some Body\n', '- null\n', '- content: x\n'])
+def test_load_roster_invalid_entry(tmp_path, entries):
+    rosterfile = tmp_path / 'roster.yaml'
+    rosterfile.write_text(entries)
+    design = load_design(get_design_file())
+
+    with pytest.raises(DesignError, match=r'^roster\[0\]: expected a content block'):
+        merge_roster(design, load_roster(str(rosterfile)))
+
+## =========================================================
+## Streaming
+## ---------------------------------------------------------
+
+@pytest.mark.parametrize('make_iterable', [
+    lambda roster: (content for content in roster),
+    iter,
+    list,
+], ids=['generator', 'iterator', 'list'])
+def test_stream_roster(tmp_path, make_iterable):
+    merged = str(tmp_path / 'stream.pdf')
+    batch = MeishiBatch(get_design_file(), jobs=1, verbose=False)
+
+    summary = batch.render(make_iterable(make_roster(2)), merge=merged, stream=True)
+
+    assert summary['cards'] == 2
+    assert count_pages(merged) == 4
+
+def test_stream_invalid_entry_no_pdf(tmp_path):
+    merged = str(tmp_path / 'stream.pdf')
+    batch = MeishiBatch(get_design_file(), jobs=1, verbose=False)
+    roster = iter(make_roster(2) + ['Some Body'])
+
+    # The entries of an iterator are validated while rendering
+    with pytest.raises(DesignError):
+        batch.render(roster, merge=merged, stream=True)
+
+    # ...and the cards rendered so far are not saved
+    assert not os.path.exists(merged)
+
+## =========================================================
+## =========================================================
+
+## fin.
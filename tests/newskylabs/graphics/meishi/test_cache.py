@@ -0,0 +1,203 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""tests/newskylabs/graphics/meishi/test_cache.py:
+
+Tests of the caches for rendered meishis.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/17"
+
+import os, time
+import pytest
+
+from newskylabs.graphics.meishi.cache import RenderCache, ThumbnailCache
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def cached_files(directory):
+    """The names of all files in a cache directory."""
+    return sorted(filename for _, _, filenames in os.walk(str(directory))
+                  for filename in filenames)
+
+def touch(cache, key, name, seconds_ago):
+    """Pretend that a cached file has last been used some time ago."""
+    t = time.time() - seconds_ago
+    os.utime(cache._path(key, name), (t, t))
+
+## =========================================================
+## RenderCache
+## ---------------------------------------------------------
+
+def test_render_cache_hit_and_miss(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    key = cache.key({'name': 'x'})
+
+    assert cache.get(key, 'front.svg') is None
+    assert not cache.has(key, 'front.svg')
+
+    cache.put(key, 'front.svg', b'<svg/>')
+    assert cache.has(key, 'front.svg')
+    assert cache.get(key, 'front.svg') == b'<svg/>'
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+def test_render_cache_key(tmp_path):
+    cache = RenderCache(str(tmp_path), version='1.0')
+
+    # Independent of the order of the keys
+    assert cache.key({'a': 1, 'b': 2}) == cache.key({'b': 2, 'a': 1})
+    assert cache.key({'a': 1}) != cache.key({'a': 2})
+
+    # ...but not of the version
+    other = RenderCache(str(tmp_path), version='2.0')
+    assert cache.key({'a': 1}) != other.key({'a': 1})
+
+def test_render_cache_overwrite_size(tmp_path):
+    cache = RenderCache(str(tmp_path), max_size=25)
+    for _ in range(5):
+        cache.put('key', 'front.svg', b'x' * 10)
+
+    # Replaced files are not counted again
+    assert cache._size == cache.size() == 10
+    assert cache.stats()['evictions'] == 0
+
+def test_render_cache_lru_eviction(tmp_path):
+    cache = RenderCache(str(tmp_path), max_size=100)
+    for n, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, 'front.pdf', b'x' * 30)
+        touch(cache, key, 'front.pdf', 100 - n)
+
+    # 'a' is used more recently than 'b' and 'c' now
+    assert cache.get('a', 'front.pdf')
+
+    # 120 bytes: the least recently used files are removed
+    # until the cache is filled to 90% (90 bytes)
+    cache.put('d', 'front.pdf', b'x' * 30)
+
+    assert [key for key in 'abcd' if cache.has(key, 'front.pdf')] == ['a', 'c', 'd']
+    assert cache.size() == 90
+    assert cache.stats()['evictions'] == 1
+
+def test_render_cache_clear(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    cache.put('a', 'front.pdf', b'x')
+    cache.put('b', 'front.pdf', b'x')
+    cache.clear()
+
+    assert cache.size() == 0
+    assert cached_files(tmp_path) == []
+
+def test_render_cache_atomic_write(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path))
+    cache.put('a', 'front.pdf', b'old')
+
+    # No temporary files are left
+    assert cached_files(tmp_path) == ['front.pdf']
+
+    # A failing write leaves the cached file untouched
+    def replace(src, dst):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(os, 'replace', replace)
+
+    with pytest.raises(OSError):
+        cache.put('a', 'front.pdf', b'new')
+
+    monkeypatch.undo()
+    assert cached_files(tmp_path) == ['front.pdf']
+    assert cache.get('a', 'front.pdf') == b'old'
+
+## =========================================================
+## ThumbnailCache
+## ---------------------------------------------------------
+
+def test_thumbnail_hit_and_miss():
+    thumbnails = ThumbnailCache()
+    key = thumbnails.key('default', {'name': 'x'}, 'front', 96)
+
+    assert thumbnails.get(key) is None
+    thumbnails.put(key, b'image')
+    assert thumbnails.get(key) == b'image'
+
+    stats = thumbnails.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+    assert (stats['images'], stats['size']) == (1, 5)
+
+def test_thumbnail_key():
+    thumbnails = ThumbnailCache()
+
+    # Independent of the order of the keys
+    assert thumbnails.key({'a': 1, 'b': 2}, 96) == thumbnails.key({'b': 2, 'a': 1}, 96)
+    assert thumbnails.key({'a': 1}, 96) != thumbnails.key({'a': 1}, 300)
+
+def test_thumbnail_lru_eviction_by_bytes():
+    thumbnails = ThumbnailCache(max_size=10)
+    thumbnails.put('a', b'aaaa')
+    thumbnails.put('b', b'bbbb')
+
+    # 'a' is used more recently than 'b' now
+    assert thumbnails.get('a') == b'aaaa'
+
+    # ...so that 'b' is forgotten to make room for 'c'
+    thumbnails.put('c', b'cccc')
+    assert thumbnails.get('b') is None
+    assert thumbnails.get('a') == b'aaaa'
+    assert thumbnails.get('c') == b'cccc'
+
+    stats = thumbnails.stats()
+    assert (stats['evictions'], stats['images'], stats['size']) == (1, 2, 8)
+
+def test_thumbnail_replace():
+    thumbnails = ThumbnailCache(max_size=10)
+    thumbnails.put('a', b'aaaa')
+    thumbnails.put('a', b'aaaaaa')
+
+    stats = thumbnails.stats()
+    assert (stats['evictions'], stats['images'], stats['size']) == (0, 1, 6)
+
+def test_thumbnail_larger_than_cache():
+    # The last image is kept even when larger than the cache
+    thumbnails = ThumbnailCache(max_size=2)
+    thumbnails.put('a', b'aaaa')
+    assert thumbnails.get('a') == b'aaaa'
+
+def test_thumbnail_disk_fallback(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    ThumbnailCache(cache=cache).put('a', b'aaaa')
+
+    # A new thumbnail cache (like after a restart)
+    # finds the image on disk
+    thumbnails = ThumbnailCache(cache=cache)
+    assert thumbnails.get('a') == b'aaaa'
+    assert thumbnails.stats()['hits'] == 1
+    assert cache.stats()['hits'] == 1
+
+    # ...and keeps it in memory afterwards
+    assert thumbnails.get('a') == b'aaaa'
+    assert cache.stats()['hits'] == 1
+
+## =========================================================
+## =========================================================
+
+## fin.
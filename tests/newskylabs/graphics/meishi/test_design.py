@@ -0,0 +1,112 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+
+"""tests/newskylabs/graphics/meishi/test_design.py:
+
+Tests of loading meishi designs.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/17"
+
+import os
+
+from newskylabs.graphics.utils.general import get_package_dir
+from newskylabs.graphics.meishi import design
+from newskylabs.graphics.meishi.design import load_design_file, load_design_stream
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def get_design_file():
+    return os.path.join(get_package_dir(), 'meishi', 'designs', 'default-design.yaml')
+
+## =========================================================
+## Disk cache
+## ---------------------------------------------------------
+
+def test_disk_cache(tmp_path):
+    cache_dir = str(tmp_path)
+
+    parsed = load_design_file(get_design_file(), cache_dir=False)
+    design._designs.clear()
+
+    # Written as JSON...
+    assert load_design_file(get_design_file(), cache_dir=cache_dir) == parsed
+    files = os.listdir(cache_dir)
+    assert len(files) == 1 and files[0].endswith('.json')
+
+    # ...and read again
+    path = os.path.join(cache_dir, files[0])
+    with open(path, 'w') as fh:
+        fh.write('{"from": "cache"}')
+    with open(get_design_file(), 'rb') as fh:
+        assert load_design_stream(fh, cache_dir=cache_dir) == {'from': 'cache'}
+
+def test_disk_cache_broken_file(tmp_path):
+    cache_dir = str(tmp_path)
+    with open(get_design_file(), 'rb') as fh:
+        source = fh.read()
+
+    # A broken (or pickled) cache file is parsed again
+    path = design._cache_path(cache_dir, source)
+    with open(path, 'wb') as fh:
+        fh.write(b'\x80\x04garbage')
+
+    with open(get_design_file(), 'rb') as fh:
+        loaded = load_design_stream(fh, cache_dir=cache_dir)
+
+    assert loaded == load_design_file(get_design_file(), cache_dir=False)
+
+def test_disk_cache_not_json(tmp_path):
+    # Dates can not be represented in JSON
+    designfile = tmp_path / 'design.yaml'
+    designfile.write_text('date: 2020-01-17\n')
+    cache_dir = tmp_path / 'cache'
+
+    assert str(load_design_file(str(designfile), cache_dir=str(cache_dir))['date']) == '2020-01-17'
+    assert not cache_dir.exists() or os.listdir(str(cache_dir)) == []
+
+def test_disk_cache_opt_in(tmp_path, monkeypatch):
+    monkeypatch.delenv('NSL_MEISHI_DESIGN_CACHE', raising=False)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.setattr(design, '_default_cache_dir', None)
+    cache_dir = tmp_path / 'nsl-meishi' / 'designs'
+
+    # Without explicit cache directory nothing is written...
+    design._designs.clear()
+    load_design_file(get_design_file())
+    assert not cache_dir.exists()
+
+    # ...unless the disk cache has been enabled
+    design.enable_disk_cache()
+    design._designs.clear()
+    load_design_file(get_design_file())
+    assert len(os.listdir(str(cache_dir))) == 1
+
+    design.enable_disk_cache(None)
+    assert design._get_cache_dir(None) is None
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,242 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""tests/newskylabs/graphics/meishi/test_imposition.py:
+
+Tests of placing meishis on print-ready sheets.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/17"
+
+import os, re
+import pytest
+
+from click.testing import CliRunner
+
+from newskylabs.graphics.utils.general import get_package_dir, precision
+from newskylabs.graphics.meishi import design
+from newskylabs.graphics.meishi.batch import load_design, iter_meishis
+from newskylabs.graphics.meishi.imposition import Imposition, get_sheet_size
+from newskylabs.graphics.scripts.meishi import meishi as meishi_command
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def get_design_file():
+    return os.path.join(get_package_dir(), 'meishi', 'designs', 'default-design.yaml')
+
+def make_meishis(size):
+    """'size' meishis made from a template."""
+
+    roster = [{'name': {'family': 'Family{}'.format(n)}} for n in range(size)]
+    return list(iter_meishis(load_design(get_design_file()), roster))
+
+def card_translations(sheet):
+    """The translations of the cards on an SVG sheet."""
+
+    svg = sheet.tobytes().decode()
+    return re.findall(r'<g transform="translate\(([^,]*), ([^)]*)\)">\s*<g clip-path', svg)
+
+def crop_mark_lines(imposition):
+    """The crop marks as (x1, y1, x2, y2) lines."""
+
+    d = imposition.crop_marks()._xml[0].get('d')
+    return [tuple(float(n) for n in re.split(r'[ ,L]+', line.strip()))
+            for line in d.split('M')[1:]]
+
+## =========================================================
+## Grid
+## ---------------------------------------------------------
+
+def test_sheet_size():
+    assert get_sheet_size('a4') == (210, 297)
+    assert get_sheet_size('320x450mm') == (320, 450)
+    assert get_sheet_size((100, 200)) == (100, 200)
+
+    with pytest.raises(ValueError, match='Unknown sheet size'):
+        get_sheet_size('B52')
+
+def test_grid():
+    # Cards of 87x57mm including the bleed:
+    # 3x3 in landscape, 2x4 in portrait orientation
+    imposition = Imposition()
+    assert imposition.sheet_size == (297, 210)
+    assert imposition.cards_per_sheet == 9
+
+    portrait = Imposition(orientation='portrait')
+    assert portrait.sheet_size == (210, 297)
+    assert portrait.cards_per_sheet == 8
+
+    # The grid is centered on the sheet
+    assert imposition.position(0) == (18, 19.5)
+    assert imposition.position(4) == (105, 76.5)
+    assert imposition.position(8) == (192, 133.5)
+
+def test_grid_gutter():
+    imposition = Imposition(gutter=5)
+    assert imposition.cards_per_sheet == 9
+    assert imposition.position(1)[0] - imposition.position(0)[0] == 87 + 5
+    assert imposition.position(3)[1] - imposition.position(0)[1] == 57 + 5
+
+def test_grid_too_small():
+    with pytest.raises(ValueError, match='does not fit'):
+        Imposition(sheet='80x50')
+
+    with pytest.raises(ValueError, match='do not fit'):
+        Imposition(sheet='107x77').sheet(make_meishis(2))
+
+## =========================================================
+## Back sides
+## ---------------------------------------------------------
+
+def test_back_long_edge():
+    imposition = Imposition(flip='long-edge')
+
+    # Sheets flipped at the long edge: the columns are mirrored
+    assert imposition.position(0, 'back') == (192, 19.5)
+    for index in range(imposition.cards_per_sheet):
+        row, col = divmod(index, 3)
+        assert imposition.position(index, 'back') \
+            == imposition.position(row * 3 + 2 - col, 'front')
+
+def test_back_short_edge():
+    imposition = Imposition(flip='short-edge')
+
+    # Sheets flipped at the short edge: the rows are mirrored
+    assert imposition.position(0, 'back') == (18, 133.5)
+    for index in range(imposition.cards_per_sheet):
+        row, col = divmod(index, 3)
+        assert imposition.position(index, 'back') \
+            == imposition.position((2 - row) * 3 + col, 'front')
+
+@pytest.mark.parametrize('flip, expected', [
+    ('long-edge',  (192, 19.5)),
+    ('short-edge', (18, 133.5)),
+])
+def test_back_sheet(flip, expected):
+    imposition = Imposition(flip=flip)
+
+    # A single card - in the first slot of the front sheet
+    def position(side):
+        [(x, y)] = card_translations(imposition.sheet(make_meishis(1), side))
+        return float(x), float(y)
+
+    assert position('front') == (18, 19.5)
+    assert position('back') == expected
+
+def test_unknown_flip():
+    with pytest.raises(ValueError, match='Unknown flip'):
+        Imposition(flip='no-edge')
+
+## =========================================================
+## Crop marks
+## ---------------------------------------------------------
+
+def test_crop_marks():
+    imposition = Imposition()
+    lines = crop_mark_lines(imposition)
+
+    # Two marks at both trim lines of every column and row
+    assert len(lines) == 4 * 3 + 4 * 3
+
+    # The marks are placed at the trim lines
+    # outside of the grid of cards (18, 19.5) - (279, 190.5)
+    xs = sorted({x1 for x1, y1, x2, y2 in lines if x1 == x2})
+    ys = sorted({y1 for x1, y1, x2, y2 in lines if y1 == y2})
+    assert xs == [19, 104, 106, 191, 193, 278]
+    assert ys == [20.5, 75.5, 77.5, 132.5, 134.5, 189.5]
+
+    for x1, y1, x2, y2 in lines:
+        assert not (18 < x1 < 279 and 19.5 < y1 < 190.5)
+
+def test_no_crop_marks():
+    imposition = Imposition(crop_marks=False)
+    parts = list(imposition.sheet_parts(make_meishis(1)))
+
+    # The definitions and the card only
+    assert len(parts) == 2
+
+## =========================================================
+## Sheets
+## ---------------------------------------------------------
+
+def test_sheet_precision():
+    # A gutter giving positions like 17.900000000000006
+    imposition = Imposition(gutter=0.1)
+
+    with precision(2):
+        translations = card_translations(imposition.sheet(make_meishis(3)))
+
+    assert translations == [('17.9', '19.4'), ('105', '19.4'), ('192.1', '19.4')]
+
+def test_sheet_without_precision():
+    imposition = Imposition(gutter=0.1)
+    translations = card_translations(imposition.sheet(make_meishis(3)))
+
+    assert translations == [(str(x), str(y))
+                            for x, y in (imposition.position(n) for n in range(3))]
+
+## =========================================================
+## nsl-meishi impose
+## ---------------------------------------------------------
+
+@pytest.fixture
+def design_cache(tmp_path, monkeypatch):
+    """The design cache enabled by nsl-meishi - in a temporary directory."""
+    monkeypatch.setenv('NSL_MEISHI_DESIGN_CACHE', str(tmp_path / 'cache'))
+    monkeypatch.setattr(design, '_default_cache_dir', None)
+
+def test_impose_command(tmp_path, design_cache):
+    roster = tmp_path / 'roster.csv'
+    roster.write_text('name.family,name.given\n'
+                      + ''.join('Family{0},Given{0}\n'.format(n) for n in range(10)))
+    output = tmp_path / 'sheets.pdf'
+
+    result = CliRunner().invoke(meishi_command, [
+        'impose', get_design_file(), str(roster), '-o', str(output),
+    ])
+
+    assert result.exit_code == 0, result.output
+    assert 'Saved 2 sheets with 9 cards each' in result.output
+
+    # A front and a back page for every sheet
+    pdf = output.read_bytes()
+    assert pdf.startswith(b'%PDF')
+    assert len(re.findall(rb'/Type /Page\b', pdf)) == 4
+
+def test_impose_command_invalid_sheet(tmp_path, design_cache):
+    roster = tmp_path / 'roster.csv'
+    roster.write_text('name.family\nFamily\n')
+
+    result = CliRunner().invoke(meishi_command, [
+        'impose', get_design_file(), str(roster), '--sheet', 'B52',
+        '-o', str(tmp_path / 'sheets.pdf'),
+    ])
+
+    assert result.exit_code == 1
+    assert 'Unknown sheet size' in result.output
+    assert not (tmp_path / 'sheets.pdf').exists()
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,124 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+"""tests/newskylabs/graphics/meishi/test_meishi.py:
+
+Tests of rendering single meishis.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/17"
+
+import os, struct
+import pytest
+
+from reportlab.graphics.shapes import Drawing
+
+from newskylabs.graphics.utils.general import get_package_dir
+from newskylabs.graphics.meishi.meishi import Meishi
+from newskylabs.graphics.meishi.template import MeishiTemplate
+from newskylabs.graphics.meishi.cache import RenderCache
+from newskylabs.graphics.pdf import pdf
+from newskylabs.graphics.pdf.pdf import drawing2png, PNGBackendError
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def get_design_file():
+    return os.path.join(get_package_dir(), 'meishi', 'designs', 'default-design.yaml')
+
+def has_png_backend():
+    """Is a renderPM backend (rlPyCairo) installed?"""
+    try:
+        drawing2png(Drawing(1, 1))
+        return True
+    except PNGBackendError:
+        return False
+
+needs_png_backend = pytest.mark.skipif(not has_png_backend(),
+                                       reason='no renderPM backend (rlPyCairo) installed')
+
+def png_size(data):
+    """The width and height of a PNG image."""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    return struct.unpack('>II', data[16:24])
+
+## =========================================================
+## PNG
+## ---------------------------------------------------------
+
+@needs_png_backend
+def test_render_png():
+    meishi = Meishi(datafile=get_design_file(), verbose=False)
+
+    width, height = png_size(meishi.render('front', 'png', dpi=96))
+    assert width > height
+
+    # Twice the resolution - twice the size
+    width2, height2 = png_size(meishi.render('front', 'png', dpi=192))
+    assert abs(width2 - 2 * width) <= 2
+    assert abs(height2 - 2 * height) <= 2
+
+@pytest.mark.skipif(has_png_backend(), reason='a renderPM backend is installed')
+def test_render_png_without_backend():
+    meishi = Meishi(datafile=get_design_file(), verbose=False)
+
+    with pytest.raises(PNGBackendError, match='rlPyCairo'):
+        meishi.render('front', 'png')
+
+## =========================================================
+## Render cache
+## ---------------------------------------------------------
+
+def test_cache_key_rendering_mode(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    designfile = get_design_file()
+
+    def cache_key(**kwargs):
+        return Meishi(datafile=designfile, verbose=False, cache=cache,
+                      **kwargs).get_cache_key()
+
+    shared   = MeishiTemplate(datafile=designfile)
+    unshared = MeishiTemplate(datafile=designfile, share=False)
+    keys = [
+        cache_key(),
+        cache_key(optimize=True),
+        cache_key(template=shared),
+        cache_key(template=unshared),
+    ]
+
+    # Every rendering mode has its own cache entries
+    assert len(set(keys)) == len(keys)
+    assert cache_key() == keys[0]
+
+def test_cache_key_toolchain_version(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path))
+    key = Meishi(datafile=get_design_file(), verbose=False, cache=cache).get_cache_key()
+
+    # Other versions of svglib or reportlab - other pdfs
+    monkeypatch.setattr(pdf, 'toolchain_version', lambda: 'svglib-0 reportlab-0')
+    other = Meishi(datafile=get_design_file(), verbose=False, cache=cache).get_cache_key()
+    assert key != other
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,129 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+
+"""tests/newskylabs/graphics/meishi/test_server.py:
+
+Tests of the HTTP interface of the meishi service.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/17"
+
+import os, json, gzip, threading
+import urllib.request, urllib.error
+import pytest
+
+from newskylabs.graphics.utils.general import get_package_dir
+from newskylabs.graphics.meishi.server import MeishiService, MeishiServer, accepts_gzip
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def get_design_file():
+    return os.path.join(get_package_dir(), 'meishi', 'designs', 'default-design.yaml')
+
+@pytest.fixture(scope='module')
+def url():
+    """The URL of a meishi server running in a thread."""
+
+    service = MeishiService({'default': get_design_file()}, jobs=1)
+    server = MeishiServer(('127.0.0.1', 0), service, verbose=False)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+def post(url, body, headers={}):
+    """POST 'body' and return the status, headers and body of the answer."""
+
+    request = urllib.request.Request(url, data=body, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+## =========================================================
+## Render requests
+## ---------------------------------------------------------
+
+def test_render_png(url):
+    status, headers, answer = post(url + '/render/default?format=png', b'{}')
+
+    # Depends on the optional renderPM backend rlPyCairo
+    if status == 200:
+        assert headers['Content-Type'] == 'image/png'
+        assert answer.startswith(b'\x89PNG')
+
+    else:
+        assert status == 501
+        assert 'rlPyCairo' in json.loads(answer)['error']
+
+@pytest.mark.parametrize('body', [b'"foo"', b'[1]', b'null', b'{"content": "x"}'])
+def test_render_invalid_body(url, body):
+    status, _, answer = post(url + '/render/default', body)
+
+    assert status == 400
+    assert 'error' in json.loads(answer)
+
+@pytest.mark.parametrize('accept_encoding, content_type, content_encoding', [
+    ('gzip, deflate', 'image/svg+xml',    'gzip'),
+    ('identity',      'application/gzip', None),
+    (None,            'application/gzip', None),
+])
+def test_render_svgz(url, accept_encoding, content_type, content_encoding):
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    status, headers, answer = post(url + '/render/default?format=svgz', b'{}', headers)
+
+    assert status == 200
+    assert headers['Content-Type'] == content_type
+    assert headers.get('Content-Encoding') == content_encoding
+    assert gzip.decompress(answer).startswith(b"<?xml version='1.0'")
+
+## =========================================================
+## Accept-Encoding
+## ---------------------------------------------------------
+
+@pytest.mark.parametrize('accept_encoding, accepted', [
+    ('gzip',                True),
+    ('deflate, gzip;q=0.5', True),
+    ('*',                   True),
+    ('x-gzip',              True),
+    ('gzip;q=0',            False),
+    ('*;q=0, gzip',         True),
+    ('gzip;q=0, *',         False),
+    ('identity',            False),
+    ('',                    False),
+    (None,                  False),
+])
+def test_accepts_gzip(accept_encoding, accepted):
+    assert accepts_gzip(accept_encoding) == accepted
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,171 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+
+"""tests/newskylabs/graphics/pdf/test_pdf.py:
+
+Tests of writing multi-page pdfs.
+
+PDFWriter compresses every page as soon as it is finished - relying
+on the internals of reportlab.  These tests notice when a reportlab
+version handles the pages differently.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/17"
+
+import io, os, types
+import pytest
+
+from reportlab import rl_config
+
+from newskylabs.graphics.utils.general import get_package_dir
+from newskylabs.graphics.meishi.meishi import Meishi
+from newskylabs.graphics.meishi.batch import load_design, iter_meishis
+from newskylabs.graphics.meishi.imposition import Imposition
+from newskylabs.graphics.pdf.pdf import PDFWriter, LayeredDrawing
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+def get_design_file():
+    return os.path.join(get_package_dir(), 'meishi', 'designs', 'default-design.yaml')
+
+@pytest.fixture(scope='module')
+def drawings():
+    meishi = Meishi(datafile=get_design_file(), verbose=False)
+    return meishi.get_drawing('front'), meishi.get_drawing('back')
+
+@pytest.fixture
+def invariant(monkeypatch):
+    """Write pdfs without time stamps and random ids."""
+    monkeypatch.setattr(rl_config, 'invariant', 1)
+
+def write_pdf(drawings, compress=True):
+    stream = io.BytesIO()
+    with PDFWriter(stream) as writer:
+        if not compress:
+            writer._compress_page = lambda: None
+        for drawing in drawings * 2:
+            writer.add_page(drawing)
+    return stream.getvalue()
+
+## =========================================================
+## Compressing pages
+## ---------------------------------------------------------
+
+def test_compress_page_same_pdf(drawings, invariant):
+    # The pages are compressed like reportlab does when saving
+    assert write_pdf(drawings) == write_pdf(drawings, compress=False)
+
+def test_compress_page_releases_content(drawings):
+    writer = PDFWriter(io.BytesIO())
+    writer.add_page(drawings[1])
+
+    page = writer._canvas._doc.Pages.pages[-1]
+    assert page.stream is None
+    assert page.Contents is not None
+
+def test_compress_page_unknown_internals(drawings):
+    writer = PDFWriter(io.BytesIO())
+    writer._canvas = types.SimpleNamespace()
+
+    # Nothing is done when the internals are not found
+    writer._compress_page()
+
+## =========================================================
+## Shared layers
+## ---------------------------------------------------------
+
+def make_meishis(size):
+    """'size' meishis made from a template - sharing the pattern of
+    the back side."""
+
+    roster = [{'name': {'family': 'Family{}'.format(n)}} for n in range(size)]
+    return list(iter_meishis(load_design(get_design_file()), roster))
+
+def count_forms(pdf):
+    return pdf.count(b'/Subtype /Form')
+
+def test_shared_layer_drawn_once():
+    meishis = make_meishis(3)
+    assert all(isinstance(meishi.get_drawing('back'), LayeredDrawing) for meishi in meishis)
+
+    stream = io.BytesIO()
+    with PDFWriter(stream) as writer:
+        for meishi in meishis:
+            writer.add_page(meishi.get_drawing('front'))
+            writer.add_page(meishi.get_drawing('back'))
+
+    assert writer.pages == 6
+    assert count_forms(stream.getvalue()) == 1
+
+def test_imposed_sheets_share_pattern():
+    # A full sheet and a sheet with a single card
+    imposition = Imposition(sheet='A4')
+    meishis = make_meishis(imposition.cards_per_sheet + 1)
+
+    stream = io.BytesIO()
+    assert imposition.save(meishis, stream) == 2
+    assert count_forms(stream.getvalue()) == 1
+
+## =========================================================
+## Saving
+## ---------------------------------------------------------
+
+def test_save_on_exit(tmp_path, drawings):
+    pdffile = str(tmp_path / 'cards.pdf')
+    # Closing in the block and on exit saves the pdf once
+    with PDFWriter(pdffile) as writer:
+        writer.add_page(drawings[0])
+        writer.close()
+
+    assert os.path.getsize(pdffile) > 0
+
+def test_discard_on_error(tmp_path, drawings):
+    pdffile = str(tmp_path / 'cards.pdf')
+    with pytest.raises(RuntimeError):
+        with PDFWriter(pdffile) as writer:
+            writer.add_page(drawings[0])
+            raise RuntimeError("Failed to render a card")
+
+    assert not os.path.exists(pdffile)
+
+def test_remove_partial_file(tmp_path, drawings):
+    pdffile = str(tmp_path / 'cards.pdf')
+    writer = PDFWriter(pdffile)
+    writer.add_page(drawings[0])
+
+    def save():
+        with open(pdffile, 'wb') as fh:
+            fh.write(b'%PDF-1.4')
+        raise OSError("No space left on device")
+    writer._canvas.save = save
+
+    with pytest.raises(OSError):
+        writer.close()
+
+    assert not os.path.exists(pdffile)
+
+## =========================================================
+## =========================================================
+
+## fin.
@@ -0,0 +1,161 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+
+"""tests/newskylabs/graphics/svg/test_optimize.py:
+
+Tests of the SVG optimizer.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/17"
+
+import pytest
+from lxml import etree
+
+from newskylabs.graphics.svg.optimize import \
+    optimize, compact_path, _combine_transforms, _collapse_groups, _hoist_styles
+
+## =========================================================
+## Utilities
+## ---------------------------------------------------------
+
+SVG = 'http://www.w3.org/2000/svg'
+
+def parse(code):
+    """Parse SVG code given without namespace declaration."""
+    return etree.fromstring(code.replace('<svg', '<svg xmlns="{}"'.format(SVG), 1))
+
+def tostring(element):
+    return etree.tostring(element).decode().replace(' xmlns="{}"'.format(SVG), '')
+
+## =========================================================
+## compact_path()
+## ---------------------------------------------------------
+
+@pytest.mark.parametrize('d, compacted', [
+    # Horizontal and vertical lines, closed path
+    ('M0 0 L10 0 L10 10 L0 10 Z', 'M0 0H10V10H0z'),
+    ('M10.5 20 L10.5 30',         'M10.5 20V30'),
+    # Leading zeros and separators are dropped
+    ('M 0.50 0.25 L 0.75 -0.25',  'M.5.25.75-.25'),
+    # Repeated linetos are implicit - movetos are not
+    ('M0 0 L1 1 M5 5 L6 6',       'M0 0 1 1M5 5 6 6'),
+    # Relative coordinates when they are shorter
+    ('M100 100 L101 101',         'M100 100l1 1'),
+])
+def test_compact_path(d, compacted):
+    assert compact_path(d) == compacted
+
+@pytest.mark.parametrize('d', [
+    # Curves and exponents are left as they are
+    'M0 0 C1 1 2 2 3 3',
+    'M1e3 0 L0 0',
+])
+def test_compact_path_unchanged(d):
+    assert compact_path(d) == d
+
+## =========================================================
+## _combine_transforms()
+## ---------------------------------------------------------
+
+@pytest.mark.parametrize('transform, combined', [
+    ('translate(1, 2) translate(3, 4)', 'translate(4, 6)'),
+    ('translate(0, 0)',                 ''),
+    ('translate(1,2) scale(2)',         'translate(1, 2) scale(2)'),
+    ('rotate(45) translate(1 2)',       'rotate(45) translate(1, 2)'),
+    # Exponents and unknown syntax are left as they are
+    ('translate(1e3, 0)',               'translate(1e3, 0)'),
+])
+def test_combine_transforms(transform, combined):
+    assert _combine_transforms(transform) == combined
+
+## =========================================================
+## _collapse_groups()
+## ---------------------------------------------------------
+
+def test_collapse_groups_without_attributes():
+    root = parse('<svg><g><rect/><circle/></g></svg>')
+    _collapse_groups(root)
+    assert tostring(root) == '<svg><rect/><circle/></svg>'
+
+def test_collapse_groups_moves_transform():
+    root = parse('<svg><g transform="translate(1, 2)">'
+                 '<rect transform="translate(3, 4)"/></g></svg>')
+    _collapse_groups(root)
+    assert tostring(root) == '<svg><rect transform="translate(4, 6)"/></svg>'
+
+def test_collapse_groups_keeps_dependent_transform():
+    # The clip path is given in the coordinates of the group
+    code = '<svg><g transform="translate(1, 2)"><rect clip-path="url(#c)"/></g></svg>'
+    root = parse(code)
+    _collapse_groups(root)
+    assert tostring(root) == code
+
+def test_collapse_groups_keeps_slots():
+    root = parse('<svg><g/></svg>')
+    slot = root[0]
+    _collapse_groups(root, keep={slot})
+    assert slot.getparent() is root
+
+## =========================================================
+## _hoist_styles()
+## ---------------------------------------------------------
+
+def test_hoist_styles_into_group():
+    root = parse('<svg><g><rect fill="red"/><rect fill="red"/></g></svg>')
+    _hoist_styles(root[0])
+    assert tostring(root) == '<svg><g fill="red"><rect/><rect/></g></svg>'
+
+def test_hoist_styles_into_new_group():
+    root = parse('<svg><rect fill="red"/><rect fill="red"/><rect fill="red"/>'
+                 '<circle fill="blue"/></svg>')
+    _hoist_styles(root)
+    assert tostring(root) == \
+        '<svg><g fill="red"><rect/><rect/><rect/></g><circle fill="blue"/></svg>'
+
+def test_hoist_styles_short_run():
+    code = '<svg><rect fill="red"/><rect fill="red"/><circle fill="blue"/></svg>'
+    root = parse(code)
+    _hoist_styles(root)
+    assert tostring(root) == code
+
+## =========================================================
+## optimize()
+## ---------------------------------------------------------
+
+def test_optimize_drops_redundant_attributes():
+    root = parse('<svg fill="red"><g fill="red" opacity="1">'
+                 '<rect x="0" y="0" width="1" height="1"/></g></svg>')
+    report = optimize(root, report=True)
+    assert tostring(root) == '<svg fill="red"><rect width="1" height="1"/></svg>'
+    assert report['saved'] == report['before'] - report['after'] > 0
+
+def test_optimize_with_css():
+    # Inherited values are unknown when CSS rules use other selectors
+    code = '<svg fill="red"><style>rect { fill: blue }</style><rect fill="red"/></svg>'
+    root = parse(code)
+    optimize(root)
+    assert tostring(root) == code
+
+## =========================================================
+## =========================================================
+
+## fin.
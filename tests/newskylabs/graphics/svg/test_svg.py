@@ -0,0 +1,244 @@
+## =========================================================
+## Copyright 2019 Dietrich Bollmann
+## 
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+## 
+##      http://www.apache.org/licenses/LICENSE-2.0
+## 
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+## ---------------------------------------------------------
+
+
+"""tests/newskylabs/graphics/svg/test_svg.py:
+
+Tests of assembling SVG documents with SVGElement.
+
+"""
+
+__author__      = "Dietrich Bollmann"
+__email__       = "dietrich@formgames.org"
+__copyright__   = "Copyright 2019 Dietrich Bollmann"
+__license__     = "Apache License 2.0, http://www.apache.org/licenses/LICENSE-2.0"
+__date__        = "2020/01/17"
+
+import array
+import pytest
+from fractions import Fraction
+from lxml import etree
+
+from newskylabs.graphics.utils.general import precision
+from newskylabs.graphics.svg.svg import SVGElement
+from newskylabs.graphics.svg.library.plugin import BackSidePlugin
+
+## =========================================================
+## Wrappers
+## ---------------------------------------------------------
+
+def test_wrapper_without_dict():
+    assert not hasattr(SVGElement('g'), '__dict__')
+
+def test_add_returns_wrapper():
+    e = SVGElement('g')
+    assert isinstance(e.addRect(width=1, height=1), SVGElement)
+    assert isinstance(e.addPath([(0, 0), (1, 1)]), SVGElement)
+    assert isinstance(e.addCircle(r=1), SVGElement)
+
+def test_add_methods_leave_class_untouched():
+    e = SVGElement('g')
+    assert hasattr(e, 'addressBook')
+    assert not 'addressBook' in SVGElement.__dict__
+
+    e.addFeGaussianBlur(stdDeviation=2)
+    assert e._xml[0].tag == '{http://www.w3.org/2000/svg}feGaussianBlur'
+    assert not 'addFeGaussianBlur' in SVGElement.__dict__
+
+@pytest.mark.parametrize('name, tag', [
+    ('addG', 'g'), ('addRect', 'rect'), ('addCircle', 'circle'), ('addLine', 'line'),
+    ('addStyle', 'style'), ('addClipPath', 'clipPath'), ('addEllipse', 'ellipse'),
+])
+def test_add_methods(name, tag):
+    explicit = SVGElement('g')
+    child = getattr(explicit, name)(id='x', stroke_width=0.5)
+    assert isinstance(child, SVGElement)
+
+    added = SVGElement('g')
+    added.addElement(tag, id='x', stroke_width=0.5)
+    assert explicit.tobytes() == added.tobytes()
+
+def test_add_leaf():
+    wrapped = SVGElement('g')
+    wrapped.addElement('path', d='M0 0 L1 1', stroke_width=0.5)
+
+    unwrapped = SVGElement('g')
+    leaf = unwrapped.addLeaf('path', d='M0 0 L1 1', stroke_width=0.5)
+
+    assert isinstance(leaf, etree._Element)
+    assert leaf.getparent() is unwrapped._xml
+    assert unwrapped.tobytes() == wrapped.tobytes()
+
+## =========================================================
+## Precision
+## ---------------------------------------------------------
+
+def make_numbers():
+    """A group with paths, circles and a transform
+    - all with numbers having many decimals."""
+
+    e = SVGElement('g')
+    t = e.addTranslate(1/3, 0.1 + 0.2)
+    t.addPath([(1/3, 2/3), (1.0, 0.1 + 0.2)], stroke_width=1/7)
+    t.addPaths([[(1/3, 2/3), (1.0, 0.1 + 0.2)]])
+    t.addCircle(cx=1/3, cy=2/3, r=0.5)
+    t.addCircles([(1/3, 2/3)], r=1/7)
+    return e.tobytes().decode()
+
+def test_precision_rounds():
+    with precision(2):
+        svg = make_numbers()
+
+    assert 'transform="translate(0.33, 0.3)"' in svg
+    assert svg.count('d="M0.33 0.67 L1 0.3"') == 2
+    assert 'stroke-width="0.14"' in svg
+    assert 'cx="0.33" cy="0.67" r="0.5"' in svg
+    assert 'cx="0.33" cy="0.67" r="0.14"' in svg
+
+def test_precision_none():
+    with precision(None):
+        svg = make_numbers()
+
+    assert 'transform="translate({}, {})"'.format(1/3, 0.1 + 0.2) in svg
+    assert svg.count('d="M{} {} L1.0 {}"'.format(1/3, 2/3, 0.1 + 0.2)) == 2
+    assert 'cx="{}" cy="{}" r="0.5"'.format(1/3, 2/3) in svg
+    assert 'r="{}"'.format(1/7) in svg
+
+## =========================================================
+## Coordinates
+## ---------------------------------------------------------
+
+@pytest.mark.parametrize('path', [
+    [(0, 0.5), (1, 2)],
+    [[0, 0.5], [1, 2]],
+    ((x, y) for x, y in [(0, 0.5), (1, 2)]),
+    [0, 0.5, 1, 2],
+    array.array('d', [0, 0.5, 1, 2]),
+    [Fraction(0), Fraction(1, 2), Fraction(1), Fraction(2)],
+])
+def test_path_formats(path):
+    with precision(3):
+        assert SVGElement('g').formatPath(path) == 'M0 0.5 L1 2'
+
+def test_path_odd_coordinates():
+    with pytest.raises(ValueError, match='even number'):
+        SVGElement('g').formatPath([0, 1, 2])
+
+def test_path_numpy():
+    numpy = pytest.importorskip('numpy')
+    points = numpy.array([(0, 0.5), (1, 2)])
+    e = SVGElement('g')
+
+    with precision(3):
+        assert e.formatPath(points) == 'M0 0.5 L1 2'
+        assert e.formatPath(points.ravel()) == 'M0 0.5 L1 2'
+        assert e.formatPath(list(points)) == 'M0 0.5 L1 2'
+
+        # NumPy scalars are not (all) Python floats
+        for dtype in ['float32', 'float64', 'int64']:
+            scalars = list(numpy.array([0, 1, 1, 2], dtype=dtype))
+            assert e.formatPath(scalars) == 'M0 1 L1 2'
+
+## =========================================================
+## Bulk primitives
+## ---------------------------------------------------------
+
+CENTERS = [(1/3, 2/3), (1.5, 2), (0, 0.1 + 0.2)]
+RADII   = [0.5, 1/7, 2]
+
+def add_one_by_one(e, radii):
+    for (cx, cy), r in zip(CENTERS, radii):
+        e.addCircle(cx=cx, cy=cy, r=r, fill='black')
+
+@pytest.mark.parametrize('digits', [None, 2])
+def test_add_circles_shared_radius(digits):
+    with precision(digits):
+        e1 = SVGElement('g')
+        add_one_by_one(e1, [1/7] * len(CENTERS))
+
+        e2 = SVGElement('g')
+        e2.addCircles(CENTERS, r=1/7, fill='black')
+
+    assert e2.tobytes() == e1.tobytes()
+
+@pytest.mark.parametrize('digits', [None, 2])
+def test_add_circles_radii(digits):
+    with precision(digits):
+        e1 = SVGElement('g')
+        add_one_by_one(e1, RADII)
+
+        e2 = SVGElement('g')
+        e2.addCircles([c for center in CENTERS for c in center], r=RADII, fill='black')
+
+    assert e2.tobytes() == e1.tobytes()
+
+def test_add_circles_wrong_radii():
+    with pytest.raises(ValueError, match='2 radii given for 3 circles'):
+        SVGElement('g').addCircles(CENTERS, r=[1, 2])
+
+def test_add_circles_numpy():
+    numpy = pytest.importorskip('numpy')
+
+    e1 = SVGElement('g')
+    e1.addCircles(CENTERS, r=0.5)
+
+    e2 = SVGElement('g')
+    e2.addCircles(numpy.array(CENTERS), r=numpy.float64(0.5))
+
+    assert e2.tobytes() == e1.tobytes()
+
+def test_add_rects():
+    rects = [(0, 0, 10, 5), (20, 1/3, 10, 5)]
+
+    with precision(2):
+        e1 = SVGElement('g')
+        for x, y, width, height in rects:
+            e1.addRect(x=x, y=y, width=width, height=height, fill='gray')
+
+        e2 = SVGElement('g')
+        e2.addRects(rects, fill='gray')
+
+    assert e2.tobytes() == e1.tobytes()
+
+    with pytest.raises(ValueError, match='not a multiple of 4'):
+        e2.addRects([0, 0, 10])
+
+## =========================================================
+## Plugins
+## ---------------------------------------------------------
+
+def test_back_side_plugin_needs_pattern():
+
+    class NoPattern(BackSidePlugin):
+        pass
+
+    class Pattern(BackSidePlugin):
+        def toPatternSVG(self):
+            pattern = SVGElement('g')
+            return pattern, pattern, (10, 10)
+
+    with pytest.raises(TypeError):
+        BackSidePlugin()
+    with pytest.raises(TypeError):
+        NoPattern()
+
+    pattern, slot, size = Pattern(content='BEGIN:VCARD').toPatternSVG()
+    assert slot is pattern
+
+## =========================================================
+## =========================================================
+
+## fin.